@@ -1,48 +1,29 @@
 #!/usr/bin/env python3
-import csv, json
+import sys
 from pathlib import Path
-import matplotlib.pyplot as plt
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from utils import latest_run_id, run_rows, write_text_atomic, savefig_atomic
 
 ROOT = Path(__file__).resolve().parent.parent
 DATA = ROOT / "data"
 FIGS = ROOT / "figures"
 
-SPIKES_CSV = DATA / "spikes.csv"
+STORE = DATA / "run_store.sqlite"
 RUNS_DIR = DATA / "runs"
 
-def last_run_id_from_manifests():
-    # data/runs/*/manifest.json 중 가장 최근 디렉터리 선택
-    runs = sorted(RUNS_DIR.glob("*"), reverse=True)
-    for d in runs:
-        mf = d / "manifest.json"
-        if mf.exists():
-            try:
-                j = json.loads(mf.read_text(encoding="utf-8"))
-                return j.get("run_id"), d
-            except Exception:
-                pass
-    return None, None
-
-def rows_for_run(csv_path: Path, run_id: str):
-    out = []
-    with csv_path.open("r", newline="") as f:
-        r = csv.reader(f)
-        header = next(r, None)
-        for row in r:
-            if row and row[0] == run_id:
-                out.append(row)
-    return out
-
 def main():
-    run_id, run_dir = last_run_id_from_manifests()
+    run_id = latest_run_id(STORE)
     if not run_id:
-        raise SystemExit("최근 run_id를 찾지 못했습니다. 먼저 `make summarize`를 실행하세요.")
+        raise SystemExit("최근 run_id를 찾지 못했습니다. 먼저 시뮬레이션을 실행하세요.")
+    run_dir = RUNS_DIR / run_id
+    run_dir.mkdir(parents=True, exist_ok=True)
 
-    rows = rows_for_run(SPIKES_CSV, run_id)
+    rows = run_rows(run_id, STORE)
     if not rows:
-        raise SystemExit(f"spikes.csv에 run_id={run_id} 데이터가 없습니다.")
+        raise SystemExit(f"실행 저장소에 run_id={run_id} 데이터가 없습니다.")
 
-    # rows: [run_id, timestamp, alpha, spikes]
+    # rows: (run_id, timestamp, alpha, spikes, energy_proxy)
     alphas = [float(r[2]) for r in rows]
     spikes = [int(r[3]) for r in rows]
 
@@ -52,19 +33,21 @@ def main():
 
     # 표 저장
     out_csv = run_dir / "summary_table.csv"
-    out_csv.write_text(
+    write_text_atomic(
+        out_csv,
         "alpha,spikes\n" + "\n".join(f"{a},{s}" for a, s in pairs) + "\n",
         encoding="utf-8"
     )
 
     # 그래프 저장
+    import matplotlib.pyplot as plt
     fig_out = run_dir / "spikes_line.png"
-    plt.figure(figsize=(5,3))
+    fig = plt.figure(figsize=(5,3))
     plt.plot(alphas, spikes, marker="o")
     plt.xlabel("alpha"); plt.ylabel("spikes")
     plt.title(f"Run {run_id} — spikes vs. alpha (line)")
     plt.tight_layout()
-    plt.savefig(fig_out, dpi=140)
+    savefig_atomic(fig, fig_out, dpi=140)
     plt.close()
 
     print(f"[OK] table  → {out_csv}")
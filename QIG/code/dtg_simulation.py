@@ -1,39 +1,20 @@
 # dtg_simulation.py
 import os
 import numpy as np
-# --- 헤드리스 환경 안전 ---
-import matplotlib
-matplotlib.use("Agg")
-import matplotlib.pyplot as plt
 from datetime import datetime, UTC
 
-from lif_model import LIFNeuron, dynamic_threshold
-from utils import ensure_dir, write_csv_append, save_json, new_run_id
+from lif_model import (dynamic_threshold, simulate_lif, simulate_population,
+                       exact_spike_times, exact_trace, KERNEL_VERSION)
+from utils import (write_csv_append, save_json, new_run_id, store_results, savefig_atomic,
+                   LOD_POINTS, add_plot_args, lod_indices, plot_mode, submit,
+                   add_cache_args, cache_from_args, cache_key,
+                   METRICS, add_profile_arg, count, profiled, timer, add_backend_arg)
 
 # ====== 추가 (자동화 지원) ======
 import argparse
 from pathlib import Path
 import json
 
-# ---- 명령줄 인자 파싱 ----
-ap = argparse.ArgumentParser(add_help=False)
-ap.add_argument("--alpha", type=float, default=None, help="단일 alpha만 실행 (예: --alpha 0.7)")
-ap.add_argument("--outdir", type=str, default=None, help="그림 저장 폴더 오버라이드 (예: --outdir figures/run_123)")
-ap.add_argument("--seed", type=int, default=None, help="난수 시드 고정(옵션)")
-try:
-    _cli_args, _ = ap.parse_known_args()
-except SystemExit:
-    class _Dummy: ...
-    _cli_args = _Dummy()
-    _cli_args.alpha = None
-    _cli_args.outdir = None
-    _cli_args.seed = None
-
-# ---- 외부 제어 변수 ----
-ALPHA_OVERRIDE = _cli_args.alpha
-OUTDIR_OVERRIDE = Path(_cli_args.outdir) if _cli_args.outdir else None
-SEED_OVERRIDE = _cli_args.seed
-
 # ===== 고정 파라미터(재현성) =====
 DT          = 1e-3       # 1 ms
 T_END       = 1.0        # 1 s
@@ -47,99 +28,247 @@ REFRACT_MS  = 2.0        # 2 ms 불응기 (0이면 비활성)
 FIG_DIR     = "figures"
 SPIKE_CSV   = "data/spikes.csv"
 ENERGY_CSV  = "data/energy.csv"
+RUN_DB      = "data/run_store.sqlite"   # run_id/alpha 인덱스 저장소 (요약/분석 조회용)
 CONFIG_JSON = "data/config.json"
+CONFIG_DIR  = "data/configs"       # run_id별 스냅샷 (병렬 실행에도 덮어쓰지 않음)
+
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="LIF + Dynamic Threshold Gating 시뮬레이션")
+    ap.add_argument("--alpha", type=float, default=None, help="단일 alpha만 실행 (예: --alpha 0.7)")
+    ap.add_argument("--outdir", type=str, default=None, help="그림 저장 폴더 오버라이드 (예: --outdir figures/run_123)")
+    ap.add_argument("--seed", type=int, default=None, help="난수 시드 고정(옵션)")
+    add_backend_arg(ap, help="LIF 루프 백엔드 (기본: SIM_BACKEND 환경변수, 없으면 auto)")
+    ap.add_argument("--solver", choices=["euler", "exact"], default="euler",
+                    help="euler: DT 격자 시간 루프 / exact: 스파이크 사이 닫힌 꼴 점프(이산화 오차 없음)")
+    add_plot_args(ap)   # --no-plot (exact면 V(t) 궤적도 계산 안 함) / --defer-plots
+    ap.add_argument("--plot-points", type=int, default=LOD_POINTS,
+                    help="막전위 그림 최대 점 수 (min/max 보존 다운샘플, 0이면 전체)")
+    add_cache_args(ap)
+    add_profile_arg(ap)   # data/configs/<run_id>.prof (+ .txt)
+    return ap.parse_args(argv)
+
 
+def run_one(alpha: float, run_id: str, save_dir: str | Path,
+            seed: int | None = None, backend: str | None = None, record: bool = True,
+            solver: str = "euler", plot: str = "inline", plot_points: int = LOD_POINTS,
+            cache=None):
+    """alpha 하나에 대해 시뮬레이션 1회 실행 및 저장.
 
-def run_one(alpha: float, run_id: str, save_dir: str | Path):
-    """alpha 하나에 대해 시뮬레이션 1회 실행 및 저장."""
+    record=False면 CSV 누적을 건너뛴다(스윕에서 결과를 모아 record_results로 한 번에 기록).
+    solver="exact"면 스파이크 시각을 닫힌 꼴로 직접 구하고, V(t)는 그림을 그릴 때만 재구성.
+    plot: inline | defer(.fig.npz만 저장) | off
+    cache: SimCache면 같은 파라미터 + KERNEL_VERSION의 스파이크/궤적을 재사용
+    """
     # (옵션) 시드 고정 — 지금은 난수 사용 안하지만 향후 대비
-    if SEED_OVERRIDE is not None:
-        np.random.seed(SEED_OVERRIDE)
+    if seed is not None:
+        np.random.seed(seed)
 
     t = np.arange(0.0, T_END, DT)
     th = dynamic_threshold(t, v_th_base=V_TH_BASE, alpha=alpha)
 
-    neuron = LIFNeuron(
-        dt=DT, tau=TAU, v_rest=0.0, v_reset=0.0,
-        v_th_base=V_TH_BASE, refractory_ms=REFRACT_MS
-    )
+    key = _cache_key(alpha, solver)
+    hit = cache.get(key) if cache is not None else None
+    if cache is not None:
+        count("cache.hits" if hit is not None else "cache.misses")
+    if hit is not None:
+        spike_t = hit["spike_t"]
+        v_trace = hit["v"] if solver == "euler" else None
+        if solver == "exact" and plot != "off":
+            with timer("dtg.exact_trace"):
+                v_trace = exact_trace(spike_t, t, I_CONST, tau=TAU, v_rest=0.0, v_reset=0.0,
+                                      refractory_ms=REFRACT_MS)
+    elif solver == "exact":
+        with timer("dtg.simulate.exact"):
+            spike_t = exact_spike_times(
+                alpha, T_END, I_CONST, tau=TAU, v_rest=0.0, v_reset=0.0,
+                v_th_base=V_TH_BASE, refractory_ms=REFRACT_MS,
+            )
+        if plot != "off":
+            with timer("dtg.exact_trace"):
+                v_trace = exact_trace(spike_t, t, I_CONST, tau=TAU, v_rest=0.0, v_reset=0.0,
+                                      refractory_ms=REFRACT_MS)
+        else:
+            v_trace = None
+        count("dtg.events", int(spike_t.size))
+    elif solver == "euler":
+        with timer("dtg.simulate.euler"):
+            v_trace, spikes_mask = simulate_lif(
+                th, I_CONST, dt=DT, tau=TAU, v_rest=0.0, v_reset=0.0,
+                refractory_ms=REFRACT_MS, backend=backend,
+            )
+        spike_t = t[spikes_mask]
+        count("lif.steps", int(t.size))
+    else:
+        raise ValueError(f"solver must be 'euler' or 'exact', got {solver!r}")
+    if cache is not None and hit is None:
+        cache.put(key, spike_t=spike_t, v=v_trace if solver == "euler" else [])
+    return save_results(alpha, t, th, v_trace, spike_t, run_id, save_dir, record, plot,
+                        plot_points)
+
 
-    v_trace = np.empty_like(t)
-    spikes_mask = np.zeros_like(t, dtype=bool)
+def run_population(alphas, run_id: str, save_dir: str | Path,
+                   seed: int | None = None, record: bool = True, plot: str = "inline",
+                   plot_points: int = LOD_POINTS, cache=None):
+    """alpha 전체를 LIFPopulation 한 번의 시간 루프로 시뮬레이션하고 alpha별로 저장.
 
-    for i, v_th in enumerate(th):
-        v, spiked = neuron.step(I=I_CONST, v_th=v_th)
-        v_trace[i] = v
-        if spiked:
-            spikes_mask[i] = True
+    cache가 있으면 alpha별(euler) 항목을 조회하고, 하나라도 없으면 전체를 다시 돌려 채운다.
+    """
+    if seed is not None:
+        np.random.seed(seed)
+
+    t = np.arange(0.0, T_END, DT)
+    keys = [_cache_key(a, "euler") for a in alphas]
+    hits = [cache.get(k) for k in keys] if cache is not None else [None]
+    if all(h is not None for h in hits):
+        v = [h["v"] for h in hits]
+        spikes = [h["spike_t"] for h in hits]
+    else:
+        with timer("dtg.simulate.population"):
+            res = simulate_population(
+                alphas, t, I_CONST, n_neurons=1, dt=DT, tau=TAU, v_rest=0.0, v_reset=0.0,
+                v_th_base=V_TH_BASE, refractory_ms=REFRACT_MS,
+            )
+        count("lif.steps", int(t.size) * len(alphas))
+        v = [res["v"][:, 0, j] for j in range(len(alphas))]
+        spikes = [t[res["mask"][:, 0, j]] for j in range(len(alphas))]
+        if cache is not None:
+            for k, vj, sj in zip(keys, v, spikes):
+                cache.put(k, spike_t=sj, v=vj)
+    return [
+        save_results(alpha, t, dynamic_threshold(t, V_TH_BASE, alpha), v[j], spikes[j],
+                     run_id, save_dir, record, plot, plot_points)
+        for j, alpha in enumerate(alphas)
+    ]
 
-    total_spikes = int(spikes_mask.sum())
+
+def _cache_key(alpha, solver):
+    return cache_key("dtg_simulation.run_one", {
+        "alpha": alpha, "DT": DT, "T_END": T_END, "TAU": TAU, "V_TH_BASE": V_TH_BASE,
+        "I_CONST": I_CONST, "REFRACT_MS": REFRACT_MS, "solver": solver,
+    }, KERNEL_VERSION)
+
+
+def save_results(alpha, t, th, v_trace, spike_t, run_id: str, save_dir: str | Path,
+                 record: bool = True, plot: str = "inline", plot_points: int = LOD_POINTS):
+    """막전위 그림 + (record=True면) spikes/energy CSV 누적 저장. spike_t: 스파이크 시각 배열"""
+    spike_t = np.asarray(spike_t)
+    total_spikes = int(spike_t.size)
     energy_proxy = float(total_spikes)  # 단순 근사: 스파이크 수
+    count("spikes", total_spikes)
 
     # ----- 그림 저장 -----
     # outdir 오버라이드가 있으면 거기로, 없으면 기본 figures
     save_dir = Path(save_dir)
     fig_path = save_dir / f"membrane_alpha_{alpha}.png"
-    ensure_dir(str(fig_path))  # 파일 경로를 넣어도 상위 폴더를 만들어주는 유틸(주석에 명시됨)
+    if plot != "off":
+        # 그림에는 V/V_th의 min/max 보존 LOD만 (리셋 직전 피크 유지), 스파이크 점은 전부
+        i = lod_indices(np.vstack([v_trace, th]), plot_points)
+        t, th, v_trace = t[i], th[i], v_trace[i]
+    with timer("dtg.plot"):
+        out = submit("dtg_simulation:render_membrane", fig_path, plot, meta={"alpha": alpha},
+                     t=t, th=th, v=v_trace if v_trace is not None else [], spike_t=spike_t)
+    fig_path = None if plot == "off" else out or f"{fig_path} (unchanged)"
+
+    # ----- CSV 누적 저장 -----
+    if record:
+        with timer("dtg.record"):
+            record_results(run_id, [(alpha, total_spikes, energy_proxy)])
+
+    print(f"[alpha={alpha}] spikes={total_spikes}, energy_proxy={energy_proxy}, fig={fig_path}")
+    return total_spikes, energy_proxy
+
 
+def render_membrane(out_path, t, th, v, spike_t, alpha):
+    """막전위 / 임계값 / 스파이크 그림 (render_queue 렌더러)"""
+    # matplotlib은 그림을 실제로 그릴 때만 (--no-plot / --defer-plots 실행은 import 안 함)
+    import matplotlib
+    matplotlib.use("Agg")   # 헤드리스 환경 안전
+    import matplotlib.pyplot as plt
     fig, ax = plt.subplots(figsize=(10, 4))
-    ax.plot(t, v_trace, label="V(t)")
+    ax.plot(t, v, label="V(t)")
     ax.plot(t, th, "--", label="V_th(t)")
-    if total_spikes > 0:
-        ax.scatter(t[spikes_mask], th[spikes_mask], s=10, label="spike")
+    if spike_t.size > 0:
+        ax.scatter(spike_t, dynamic_threshold(spike_t, V_TH_BASE, alpha), s=10, label="spike")
     ax.set_xlabel("time (s)")
     ax.set_ylabel("V")
     ax.set_title(f"Membrane Potential (alpha={alpha})")
     ax.legend()
     fig.tight_layout()
-    fig.savefig(str(fig_path), dpi=160)
+    savefig_atomic(fig, out_path, dpi=160)
     plt.close(fig)
 
-    # ----- CSV 누적 저장 -----
+
+def record_results(run_id: str, rows):
+    """[(alpha, spikes, energy_proxy), ...] → 실행 저장소 + spikes.csv / energy.csv 누적 저장."""
     ts = datetime.now(UTC).isoformat()
     write_csv_append(
         SPIKE_CSV,
         header=["run_id", "timestamp", "alpha", "spikes"],
-        rows=[[run_id, ts, alpha, total_spikes]],
+        rows=[[run_id, ts, a, s] for a, s, _ in rows],
     )
     write_csv_append(
         ENERGY_CSV,
         header=["run_id", "timestamp", "alpha", "energy_proxy"],
-        rows=[[run_id, ts, alpha, energy_proxy]],
+        rows=[[run_id, ts, a, e] for a, _, e in rows],
     )
+    store_results(run_id, rows, RUN_DB, timestamp=ts)
 
-    print(f"[alpha={alpha}] spikes={total_spikes}, energy_proxy={energy_proxy}, fig={fig_path}")
-    return total_spikes, energy_proxy
+
+def save_config(run_id: str, alphas, outdir, seed=None, solver="euler"):
+    """실행 설정 스냅샷 → data/configs/<run_id>.json + data/config.json(마지막 실행)"""
+    cfg = {
+        "run_id": run_id,
+        "generated_at_utc": datetime.now(UTC).isoformat(),
+        "params": {
+            "DT": DT, "T_END": T_END, "TAU": TAU,
+            "V_TH_BASE": V_TH_BASE, "I_CONST": I_CONST,
+            "ALPHAS": list(alphas),
+            "REFRACT_MS": REFRACT_MS,
+            "OUTDIR": str(outdir),
+            "SEED": seed,
+            "SOLVER": solver,
+        },
+    }
+    save_json(f"{CONFIG_DIR}/{run_id}.json", cfg)
+    save_json(CONFIG_JSON, cfg)
 
 
-def main():
+def main(argv=None):
+    args = parse_args(argv)
     # outdir 기본값 결정: 미지정 시 figures, 지정 시 해당 폴더
-    # (팁) 실험마다 폴더 분리하고 싶으면 아래 한 줄을 OUTDIR_OVERRIDE or f"{FIG_DIR}/run_{run_id}"로 바꿔도 됨
+    # (팁) 실험마다 폴더 분리하고 싶으면 아래 한 줄을 args.outdir or f"{FIG_DIR}/run_{run_id}"로 바꿔도 됨
     run_id = new_run_id()
-    outdir = OUTDIR_OVERRIDE if OUTDIR_OVERRIDE else Path(FIG_DIR)
+    outdir = Path(args.outdir) if args.outdir else Path(FIG_DIR)
+
+    # 단일 alpha 오버라이드 지원
+    alphas = [args.alpha] if args.alpha is not None else ALPHAS
 
     # 실행 설정 기록
-    save_json(
-        CONFIG_JSON,
-        {
-            "run_id": run_id,
-            "generated_at_utc": datetime.now(UTC).isoformat(),
-            "params": {
-                "DT": DT, "T_END": T_END, "TAU": TAU,
-                "V_TH_BASE": V_TH_BASE, "I_CONST": I_CONST,
-                "ALPHAS": ALPHAS if ALPHA_OVERRIDE is None else [ALPHA_OVERRIDE],
-                "REFRACT_MS": REFRACT_MS,
-                "OUTDIR": str(outdir),
-                "SEED": SEED_OVERRIDE,
-            },
-        },
-    )
+    save_config(run_id, alphas, outdir, args.seed, args.solver)
 
-    # 단일 alpha 오버라이드 지원
-    alphas = [ALPHA_OVERRIDE] if ALPHA_OVERRIDE is not None else ALPHAS
-    for alpha in alphas:
-        run_one(alpha, run_id, outdir)
+    with profiled(args.profile, f"{CONFIG_DIR}/{run_id}"):
+        _run(args, run_id, outdir, alphas)
+    # 실행별 계측 → 설정 스냅샷 옆 data/configs/<run_id>.metrics.json
+    path = METRICS.write(f"{CONFIG_DIR}/{run_id}.metrics.json", run_id=run_id,
+                         solver=args.solver, alphas=list(alphas))
+    print(f"[OK] metrics → {path}")
+
+
+def _run(args, run_id, outdir, alphas):
+    plot = plot_mode(args)
+    cache = cache_from_args(args)
+    if args.solver == "exact":
+        for a in alphas:
+            run_one(a, run_id, outdir, seed=args.seed, solver="exact", plot=plot,
+                    plot_points=args.plot_points, cache=cache)
+    elif len(alphas) == 1:
+        run_one(alphas[0], run_id, outdir, seed=args.seed, backend=args.backend, plot=plot,
+                plot_points=args.plot_points, cache=cache)
+    else:
+        run_population(alphas, run_id, outdir, seed=args.seed, plot=plot,
+                       plot_points=args.plot_points, cache=cache)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,22 +1,30 @@
 #!/usr/bin/env python3
-import json, os, glob
+import json, os, glob, sys
 from pathlib import Path
-import pandas as pd
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_pdf import PdfPages
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import utils
 
 BASE = Path(__file__).resolve().parent.parent
 RUNS_DATA = BASE / "data" / "runs"
 RUNS_FIGS = BASE / "figures" / "runs"
 REPORTS = BASE / "reports"
+STORE = BASE / "data" / "run_store.sqlite"
 
 def latest_run_id() -> str:
+    # 실행 저장소 우선 (인덱스 조회), 없으면 아카이브 폴더 이름순
+    run_id = utils.latest_run_id(STORE)
+    if run_id and (RUNS_DATA / run_id).is_dir():
+        return run_id
     cand = sorted([p.name for p in RUNS_DATA.glob("*") if p.is_dir()])
     if not cand:
         raise SystemExit("No runs found under data/runs/*")
     return cand[-1]
 
 def main():
+    import pandas as pd
+    import matplotlib.pyplot as plt
+    from matplotlib.backends.backend_pdf import PdfPages
     run_id = latest_run_id()
     data_dir = RUNS_DATA / run_id
     figs_dir = RUNS_FIGS / run_id
@@ -37,7 +45,7 @@ def main():
         df = pd.read_csv(table_csv)
 
     pdf_path = REPORTS / f"{run_id}_report.pdf"
-    with PdfPages(pdf_path) as pdf:
+    with utils.atomic_open(pdf_path, "wb") as fh, PdfPages(fh) as pdf:
         # 1) 표지 + 메타
         fig = plt.figure(figsize=(8.5, 11))
         fig.suptitle(f"DTG Sweep Report — {run_id}", fontsize=18)
@@ -0,0 +1,43 @@
+# lif_jit.py — LIF 시간 루프의 Numba 컴파일 버전 (선택 의존성)
+#
+# 백엔드 선택: 환경변수 SIM_BACKEND=auto|numpy|numba 또는 --backend (저장소 루트 sim_backend 공용 규칙 —
+# three_body_3d --backend와 같은 의미).
+# numba가 없으면 lif_model.simulate_lif가 LIFNeuron.step 루프(numpy 경로)를 쓴다.
+import os, sys
+import numpy as np
+
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if _REPO_ROOT not in sys.path:
+    sys.path.append(_REPO_ROOT)
+from sim_backend import BACKENDS, select_backend  # noqa: E402,F401
+
+try:
+    import numba
+    HAVE_NUMBA = True
+except ImportError:
+    numba = None
+    HAVE_NUMBA = False
+
+
+def _njit(fn):
+    return numba.njit(cache=True)(fn) if HAVE_NUMBA else fn
+
+@_njit
+def lif_loop(I, v_th, dt, tau, v_rest, v_reset, refractory_steps, v_trace, spikes):
+    """LIFNeuron.step과 같은 규칙으로 전체 구간 진행 (불응기 포함)"""
+    v = v_rest
+    ref = 0
+    k = dt / tau
+    for i in range(v_th.shape[0]):
+        if ref > 0:
+            ref -= 1
+            v_trace[i] = v_reset
+            continue
+        v += (-(v - v_rest) + I[i]) * k
+        if v >= v_th[i]:
+            v = v_reset
+            spikes[i] = True
+            if refractory_steps > 0:
+                ref = refractory_steps
+        v_trace[i] = v
+    return v_trace, spikes
@@ -1,5 +1,7 @@
 import numpy as np
 
+KERNEL_VERSION = "1"  # LIF / DTG 수치가 바뀌면 올림 → 결과 캐시(sim_cache) 무효화
+
 class LIFNeuron:
     def __init__(self, dt=1e-3, tau=20e-3, v_rest=0.0, v_reset=0.0,
                  v_th_base=1.0, refractory_ms=0.0):
@@ -34,6 +36,183 @@ class LIFNeuron:
         return self.v, False
 
 
+class LIFPopulation:
+    """LIFNeuron과 같은 규칙을 배열 전체에 적용하는 벡터화 버전.
+
+    V, 불응기 카운터를 shape(예: (K, A) = 뉴런 × alpha) 배열로 들고
+    step() 한 번에 모든 원소를 진행한다. 불응기 중인 원소는 v_reset을 반환하고
+    내부 V는 건드리지 않는다(LIFNeuron.step과 동일).
+    """
+    def __init__(self, shape, dt=1e-3, tau=20e-3, v_rest=0.0, v_reset=0.0,
+                 refractory_ms=0.0):
+        self.dt = dt
+        self.tau = tau
+        self.v_rest = v_rest
+        self.v_reset = v_reset
+        self.v = np.full(shape, v_rest, dtype=float)
+        self.refractory_steps = int(round(refractory_ms / (dt * 1e3))) if refractory_ms > 0 else 0
+        self._ref_count = np.zeros(shape, dtype=np.int64)
+        self._k = self.dt / self.tau
+
+    def reset(self):
+        self.v[...] = self.v_reset
+        self._ref_count[...] = 0
+
+    def step(self, I, v_th):
+        ref = self._ref_count > 0
+        self._ref_count[ref] -= 1
+        active = ~ref
+
+        dv = (-(self.v - self.v_rest) + I) * self._k
+        self.v = np.where(active, self.v + dv, self.v)
+
+        spiked = active & (self.v >= v_th)
+        self.v[spiked] = self.v_reset
+        if self.refractory_steps > 0:
+            self._ref_count[spiked] = self.refractory_steps
+        return np.where(ref, self.v_reset, self.v), spiked
+
+
+def simulate_population(alphas, t, I, n_neurons=1, dt=1e-3, tau=20e-3, v_rest=0.0,
+                        v_reset=0.0, v_th_base=1.0, refractory_ms=0.0, record=True):
+    """K 뉴런 × A alpha를 한 번의 시간 루프로 시뮬레이션.
+
+    I: 스칼라 또는 (K, A)로 브로드캐스트 가능한 상수 입력.
+    반환: dict(th=(A,T), spikes=(K,A) 스파이크 수,
+               v=(T,K,A) 막전위, mask=(T,K,A) 스파이크 여부 — record=True일 때만)
+    """
+    alphas = np.asarray(alphas, float)
+    K, A = int(n_neurons), alphas.size
+    # alpha별로 dynamic_threshold를 그대로 호출 → 단일 뉴런 경로와 비트 단위로 같은 임계값
+    th = np.stack([dynamic_threshold(t, v_th_base=v_th_base, alpha=a) for a in alphas])
+    pop = LIFPopulation((K, A), dt=dt, tau=tau, v_rest=v_rest, v_reset=v_reset,
+                        refractory_ms=refractory_ms)
+    I = np.broadcast_to(np.asarray(I, float), (K, A))
+    counts = np.zeros((K, A), dtype=np.int64)
+    if record:
+        v_rec = np.empty((t.size, K, A))
+        m_rec = np.zeros((t.size, K, A), dtype=bool)
+    for i in range(t.size):
+        v, spiked = pop.step(I, th[:, i][None, :])
+        counts += spiked
+        if record:
+            v_rec[i] = v
+            m_rec[i] = spiked
+    out = {"th": th, "spikes": counts}
+    if record:
+        out["v"], out["mask"] = v_rec, m_rec
+    return out
+
+
 def dynamic_threshold(t_array, v_th_base=1.0, alpha=1.0):
     # 결정적 임계값 함수: V_th(t) = v_th_base * exp(-alpha * t)
     return v_th_base * np.exp(-alpha * t_array)
+
+
+def coupled_threshold(theta, v_th_base=1.0, floor=0.05):
+    """외부 DTG 관측기 θ(t)로 구동되는 임계값: V_th = v_th_base · max(θ, floor).
+
+    θ₀ = V_0 = 1 이면 dynamic_threshold의 t=0 값과 같다. floor는 θ가 0 이하로 내려가도
+    임계값이 양수로 남게 하는 하한 (매 스텝 발화 방지). theta는 배열 그대로 (배치별) 처리.
+    """
+    return v_th_base * np.maximum(np.asarray(theta, float), floor)
+
+
+def simulate_lif(v_th, I, dt=1e-3, tau=20e-3, v_rest=0.0, v_reset=0.0,
+                 refractory_ms=0.0, backend=None):
+    """임계값 배열 v_th(T,)에 대해 LIF 뉴런 하나를 끝까지 진행.
+
+    backend: auto|numpy|numba (기본: SIM_BACKEND 환경변수). I는 스칼라 또는 (T,) 배열.
+    반환: (v_trace, spikes_mask)
+    """
+    from lif_jit import select_backend
+    v_th = np.asarray(v_th, float)
+    I = np.broadcast_to(np.asarray(I, float), v_th.shape)
+    v_trace = np.empty_like(v_th)
+    spikes = np.zeros(v_th.shape, dtype=bool)
+
+    neuron = LIFNeuron(dt=dt, tau=tau, v_rest=v_rest, v_reset=v_reset,
+                       v_th_base=1.0, refractory_ms=refractory_ms)
+    if select_backend(backend) == "numba":
+        from lif_jit import lif_loop
+        return lif_loop(np.ascontiguousarray(I), v_th, dt, tau, v_rest, v_reset,
+                        neuron.refractory_steps, v_trace, spikes)
+
+    for i, th in enumerate(v_th):
+        v_trace[i], spikes[i] = neuron.step(I=I[i], v_th=th)
+    return v_trace, spikes
+
+
+# ===== 정확 적분(이벤트 구동) DTG 해법 =====
+# 상수 입력 I에서 스파이크 사이의 막전위는 닫힌 꼴:
+#   V(t) = V_inf + (V_0 - V_inf)·exp(-(t - t_0)/tau),  V_inf = v_rest + I
+# 다음 스파이크는 V(t) = v_th_base·exp(-alpha·t) 의 첫 교차점이므로
+# 작은 창 단위로 부호 변화를 찾은 뒤 보호된 Newton으로 근을 구해 바로 점프한다.
+
+def exact_spike_times(alpha, t_end, I, tau=20e-3, v_rest=0.0, v_reset=0.0,
+                      v_th_base=1.0, refractory_ms=0.0, v0=None, tol=1e-12):
+    """[0, t_end) 구간의 스파이크 시각 배열 (Euler 이산화 오차 없음)
+
+    h = min(tau, 1/|alpha|)/4 간격으로 부호 변화를 찾아 구간을 잡고,
+    그 안에서 Newton + 이분법 보호(safeguard)로 교차 시각을 구한다.
+    """
+    from math import exp
+    v_inf = v_rest + I
+    t_ref = refractory_ms * 1e-3
+    h = 0.25 * (tau if alpha == 0 else min(tau, 1.0 / abs(alpha)))
+    t0 = 0.0
+    v = v_rest if v0 is None else v0
+    spikes = []
+
+    while t0 < t_end:
+        c = v - v_inf
+        f = lambda t: v_inf + c * exp(-(t - t0) / tau) - v_th_base * exp(-alpha * t)
+        if f(t0) >= 0.0:
+            if spikes and t_ref <= 0.0 and spikes[-1] == t0:
+                raise ValueError("reset potential is above threshold with no refractory period")
+            spikes.append(t0)
+            t0, v = t0 + t_ref, v_reset
+            continue
+        # 구간 찾기: f(lo) < 0 <= f(hi)
+        lo = t0
+        hi = min(lo + h, t_end)
+        while f(hi) < 0.0:
+            if hi >= t_end:
+                return np.array(spikes)
+            lo, hi = hi, min(hi + h, t_end)
+        # Newton(보호됨): 구간 밖으로 나가면 이분법
+        ts = hi
+        for _ in range(100):
+            ft = f(ts)
+            if ft >= 0.0:
+                hi = ts
+            else:
+                lo = ts
+            df = -c / tau * exp(-(ts - t0) / tau) + alpha * v_th_base * exp(-alpha * ts)
+            nxt = ts - ft / df if df != 0.0 else lo - 1.0
+            nxt = nxt if lo < nxt < hi else 0.5 * (lo + hi)
+            done = abs(nxt - ts) <= tol or hi - lo <= tol
+            ts = nxt
+            if done:
+                break
+        if ts >= t_end:
+            break
+        spikes.append(ts)
+        t0, v = ts + t_ref, v_reset
+    return np.array(spikes)
+
+
+def exact_trace(spike_times, t, I, tau=20e-3, v_rest=0.0, v_reset=0.0,
+                refractory_ms=0.0, v0=None):
+    """스파이크 시각으로부터 격자 t 위의 V(t)를 닫힌 꼴로 재구성 (플롯용)"""
+    t = np.asarray(t, float)
+    s = np.asarray(spike_times, float)
+    v_inf = v_rest + I
+    t_ref = refractory_ms * 1e-3
+    v_start = v_rest if v0 is None else v0
+    k = np.searchsorted(s, t, side="right") - 1
+    last = np.where(k >= 0, s[np.maximum(k, 0)] if s.size else 0.0, 0.0)
+    free_from = np.where(k >= 0, last + t_ref, 0.0)
+    v_from = np.where(k >= 0, v_reset, v_start)
+    v = v_inf + (v_from - v_inf) * np.exp(-(t - free_from) / tau)
+    return np.where((k >= 0) & (t < free_from), v_reset, v)
@@ -1,9 +1,11 @@
-# lif_network.py — 5뉴런 SNN, 래스터 플롯 / 파일 저장
+# lif_network.py — LIF SNN: 5뉴런 데모(밀집) + 대규모 희소(CSR) 이벤트 구동 엔진
+#
+#   python lif_network.py                     # 5뉴런 래스터 데모 (Baseline vs IG)
+#   python lif_network.py --n 100000 --p 1e-4 # 희소 네트워크 벤치마크 실행
+import argparse, os, time
 import numpy as np
-import matplotlib.pyplot as plt
-import os
 
-os.makedirs("figs", exist_ok=True)
+from utils import savefig_atomic, add_plot_args, plot_mode, submit
 
 # ===== LIF 파라미터 =====
 dt = 1e-3
@@ -16,28 +18,37 @@ R = 40.0
 theta_base = 1.0
 v_reset = 0.2
 
-N = 5                    # 뉴런 수
-rng = np.random.default_rng(0)
-
-# 외부 입력: 0.1~0.7초 동안 펄스 (뉴런마다 조금씩 노이즈)
-I_ext = np.zeros((N, steps), dtype=np.float32)
-for i in range(N):
-    I_ext[i, int(0.10/dt):int(0.70/dt)] = 1.0 + 0.05*rng.standard_normal()
-
-# 연결 가중치(희소, 흥분성 위주, 소량 억제)
-W = rng.uniform(0.0, 0.25, size=(N, N)).astype(np.float32)
-np.fill_diagonal(W, 0.0)
-# 소량 억제 연결 추가
-for _ in range(3):
-    i, j = rng.integers(0, N, size=2)
-    if i != j:
-        W[i, j] = -0.15
-
-def simulate(alpha=1.0):
-    """alpha * theta 로 임계값 조절 (alpha<1 => gate ON)"""
+N = 5                    # 데모 뉴런 수
+
+
+def make_demo_network(n=N, seed=0):
+    """데모용 외부 입력 I_ext (n, steps)와 밀집 가중치 W (n, n) 생성"""
+    rng = np.random.default_rng(seed)
+
+    # 외부 입력: 0.1~0.7초 동안 펄스 (뉴런마다 조금씩 노이즈)
+    I_ext = np.zeros((n, steps), dtype=np.float32)
+    for i in range(n):
+        I_ext[i, int(0.10/dt):int(0.70/dt)] = 1.0 + 0.05*rng.standard_normal()
+
+    # 연결 가중치(희소, 흥분성 위주, 소량 억제)
+    W = rng.uniform(0.0, 0.25, size=(n, n)).astype(np.float32)
+    np.fill_diagonal(W, 0.0)
+    # 소량 억제 연결 추가
+    for _ in range(3):
+        i, j = rng.integers(0, n, size=2)
+        if i != j:
+            W[i, j] = -0.15
+    return I_ext, W
+
+
+def simulate(alpha=1.0, W=None, I_ext=None):
+    """alpha * theta 로 임계값 조절 (alpha<1 => gate ON) — 밀집 (N, steps) 스파이크 행렬"""
+    if W is None or I_ext is None:
+        I_ext, W = make_demo_network()
+    n = W.shape[0]
     theta = alpha * theta_base
-    V = np.full(N, v_rest, dtype=np.float32)
-    spikes = np.zeros((N, steps), dtype=np.int8)
+    V = np.full(n, v_rest, dtype=np.float32)
+    spikes = np.zeros((n, steps), dtype=np.int8)
 
     for t in range(steps):
         # 이전 시점 스파이크가 다음 시점 전류에 미치는 영향 (한 스텝 지연)
@@ -55,34 +66,190 @@ def simulate(alpha=1.0):
 
     return spikes
 
-def plot_raster(spikes, title, outpath):
-    t_ms = np.arange(spikes.shape[1]) * dt * 1000.0
+
+# ===== 희소 시냅스 (CSR, 시냅스전 뉴런 기준 행) =====
+class CSRSynapses:
+    """행 = 시냅스전(pre) 뉴런. indptr[j]:indptr[j+1] 구간이 j의 출력 시냅스.
+
+    indices: 시냅스후(post) 뉴런 id, weights: 가중치, delays: 전달 지연(스텝, ≥1)
+    """
+    def __init__(self, n, indptr, indices, weights, delays):
+        self.n = int(n)
+        self.indptr = np.asarray(indptr, np.int64)
+        self.indices = np.asarray(indices, np.int32)
+        self.weights = np.asarray(weights, np.float32)
+        self.delays = np.asarray(delays, np.int32)
+        if self.delays.size and self.delays.min() < 1:
+            raise ValueError("synaptic delays must be >= 1 step")
+        self.max_delay = int(self.delays.max()) if self.delays.size else 1
+
+    @classmethod
+    def from_dense(cls, W, delay=1):
+        """밀집 W[post, pre] → CSR (simulate와 같은 1스텝 지연이면 결과 동일)"""
+        pre, post = np.nonzero(np.asarray(W).T)
+        counts = np.bincount(pre, minlength=W.shape[1])
+        indptr = np.concatenate([[0], np.cumsum(counts)])
+        w = np.asarray(W)[post, pre]
+        return cls(W.shape[0], indptr, post, w, np.full(post.size, delay))
+
+    @classmethod
+    def random(cls, n, p=1e-3, w_exc=0.05, w_inh=-0.1, frac_inh=0.2,
+               delay_range=(1, 5), seed=0):
+        """각 pre가 평균 n·p개의 무작위 post를 갖는 희소 네트워크 (메모리 O(시냅스 수))"""
+        rng = np.random.default_rng(seed)
+        counts = rng.binomial(n, p, size=n)
+        indptr = np.concatenate([[0], np.cumsum(counts)])
+        pre = np.repeat(np.arange(n), counts)
+        post = rng.integers(0, n, size=pre.size)
+        post = np.where(post == pre, (post + 1) % n, post)   # 자기 연결 제거
+        inh = rng.random(n) < frac_inh
+        w = np.where(inh[pre], w_inh, w_exc).astype(np.float32)
+        d = rng.integers(delay_range[0], delay_range[1] + 1, size=pre.size)
+        return cls(n, indptr, post, w, d)
+
+    def outgoing(self, fired):
+        """발화한 뉴런들의 출력 시냅스 인덱스 (해당 행만 접근)"""
+        starts = self.indptr[fired]
+        counts = self.indptr[fired + 1] - starts
+        total = int(counts.sum())
+        if total == 0:
+            return np.empty(0, np.int64)
+        off = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        return np.repeat(starts, counts) + off
+
+
+def simulate_sparse(syn, I_ext, alpha=1.0, n_steps=steps):
+    """이벤트 구동 시뮬레이션: 발화한 뉴런의 CSR 행만 읽어 지연 링버퍼에 전류를 쌓는다.
+
+    I_ext: (n, n_steps) 배열 또는 t(스텝) → (n,) 를 반환하는 함수.
+    반환: (times, ids) — 스파이크 이벤트 목록 (int32, 시간순)
+    """
+    n = syn.n
+    theta = alpha * theta_base
+    V = np.full(n, v_rest, dtype=np.float32)
+    L = syn.max_delay + 1
+    ring = np.zeros((L, n), dtype=np.float32)   # 지연 큐: ring[(t+d) % L]
+    ev_t, ev_i = [], []
+    get_I = I_ext if callable(I_ext) else (lambda t: I_ext[:, t])
+
+    for t in range(n_steps):
+        slot = t % L
+        I_t = get_I(t) + ring[slot]
+        ring[slot] = 0.0
+
+        dV = dt * (-(V - v_rest)/tau + R*I_t)
+        V += dV
+
+        fired = np.flatnonzero(V >= theta)
+        if fired.size:
+            V[fired] = v_reset
+            ev_t.append(np.full(fired.size, t, np.int32))
+            ev_i.append(fired.astype(np.int32))
+            k = syn.outgoing(fired)
+            if k.size:
+                np.add.at(ring, ((t + syn.delays[k]) % L, syn.indices[k]), syn.weights[k])
+
+    if not ev_t:
+        return np.empty(0, np.int32), np.empty(0, np.int32)
+    return np.concatenate(ev_t), np.concatenate(ev_i)
+
+
+def events_to_dense(times, ids, n, n_steps=steps):
+    """(times, ids) 이벤트 → 밀집 (n, n_steps) int8 행렬 (작은 n 비교용)"""
+    spikes = np.zeros((n, n_steps), dtype=np.int8)
+    spikes[ids, times] = 1
+    return spikes
+
+
+def plot_raster(spikes, title, outpath, plot="inline"):
+    """spikes: 밀집 (n, steps) 행렬 또는 (times, ids) 이벤트 튜플. plot: inline | defer | off"""
+    if isinstance(spikes, tuple):
+        cols, rows = spikes
+        n = int(rows.max()) + 1 if rows.size else 1
+    else:
+        rows, cols = np.where(spikes == 1)
+        n = spikes.shape[0]
+    return submit("lif_network:render_raster", outpath, plot, meta={"n": n, "title": title},
+                  times=np.asarray(cols, np.int32), ids=np.asarray(rows, np.int32))
+
+
+def render_raster(out_path, times, ids, n, title):
+    """(times, ids) 이벤트 → 래스터 그림 (render_queue 렌더러)"""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    t_ms = times * dt * 1000.0
     fig, ax = plt.subplots(figsize=(9, 4))
-    rows, cols = np.where(spikes == 1)
-    ax.scatter(t_ms[cols], rows, s=8)
+    ax.scatter(t_ms, ids, s=8 if n <= 100 else 0.5)
     ax.set_xlabel("time (ms)")
     ax.set_ylabel("neuron id")
     ax.set_title(title)
-    ax.set_ylim(-0.5, N-0.5)
-    ax.set_yticks(range(N))
+    ax.set_ylim(-0.5, n-0.5)
+    if n <= 20:
+        ax.set_yticks(range(n))
     ax.grid(True, alpha=0.3, linestyle=":")
     fig.tight_layout()
-    fig.savefig(outpath, dpi=200)
+    savefig_atomic(fig, out_path, dpi=200)
     # 필요하면 창으로도 보기
     # plt.show()
     plt.close(fig)
 
-# ===== 실행: Baseline vs Gate(IG) =====
-spk_base = simulate(alpha=1.0)
-spk_gate = simulate(alpha=0.7)  # IG on: 임계값 낮춤 → 민감도↑
-
-plot_raster(spk_base, "Raster — Baseline (alpha=1.0)", "figs/raster_baseline.png")
-plot_raster(spk_gate, "Raster — IG on (alpha=0.7)", "figs/raster_ig.png")
-
-print("Saved figures:")
-print(" - figs/raster_baseline.png")
-print(" - figs/raster_ig.png")
 
-# 간단한 요약(뉴런별 총 스파이크 수)
-print("Total spikes (baseline):", spk_base.sum())
-print("Total spikes (IG on)  :", spk_gate.sum())
+def run_demo(plot="inline"):
+    # ===== 실행: Baseline vs Gate(IG) =====
+    os.makedirs("figs", exist_ok=True)
+    I_ext, W = make_demo_network()
+    spk_base = simulate(alpha=1.0, W=W, I_ext=I_ext)
+    spk_gate = simulate(alpha=0.7, W=W, I_ext=I_ext)  # IG on: 임계값 낮춤 → 민감도↑
+
+    figs = [plot_raster(spk_base, "Raster — Baseline (alpha=1.0)", "figs/raster_baseline.png", plot),
+            plot_raster(spk_gate, "Raster — IG on (alpha=0.7)", "figs/raster_ig.png", plot)]
+
+    if plot != "off":
+        print("Saved figures:")
+        for f in figs:
+            print(f" - {f or '(unchanged)'}")
+
+    # 간단한 요약(뉴런별 총 스파이크 수)
+    print("Total spikes (baseline):", spk_base.sum())
+    print("Total spikes (IG on)  :", spk_gate.sum())
+
+
+def run_sparse(n, p, alpha, seed=0):
+    """무작위 희소 네트워크 + 펄스 입력으로 이벤트 구동 엔진 실행/시간 측정"""
+    rng = np.random.default_rng(seed)
+    amp = (1.0 + 0.05 * rng.standard_normal(n)).astype(np.float32)
+    zero = np.zeros(n, np.float32)
+    t_on, t_off = int(0.10/dt), int(0.70/dt)
+    I_ext = lambda t: amp if t_on <= t < t_off else zero
+
+    t0 = time.perf_counter()
+    syn = CSRSynapses.random(n, p, seed=seed)
+    t1 = time.perf_counter()
+    times, ids = simulate_sparse(syn, I_ext, alpha=alpha)
+    t2 = time.perf_counter()
+    print(f"[sparse] N={n}, synapses={syn.indices.size}, build={t1-t0:.2f}s, "
+          f"sim={t2-t1:.2f}s ({steps/(t2-t1):.0f} steps/s), spikes={times.size}")
+    if times.size == 0:
+        print(f"[WARN] no spikes at alpha={alpha} — only the leak update was timed "
+              f"(V_inf≈{R*tau*float(amp.mean()):.2f} < θ={alpha*theta_base:.2f})")
+    return times, ids
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=None, help="희소 네트워크 뉴런 수 (미지정 시 5뉴런 데모)")
+    ap.add_argument("--p", type=float, default=1e-3, help="연결 확률")
+    ap.add_argument("--alpha", type=float, default=0.7,
+                    help="임계값 배율 (기본 0.7 = IG on; 펄스 입력의 V_inf≈0.8이라 1.0이면 희소 실행이 발화하지 않음)")
+    ap.add_argument("--seed", type=int, default=0)
+    add_plot_args(ap)
+    args = ap.parse_args(argv)
+    if args.n is None:
+        run_demo(plot_mode(args))
+    else:
+        run_sparse(args.n, args.p, args.alpha, args.seed)
+
+
+if __name__ == "__main__":
+    main()
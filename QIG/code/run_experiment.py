@@ -1,12 +1,13 @@
 #!/usr/bin/env python3
 """
 DTG(LIF) 자동화 실행 스크립트
-- alpha 스윕 실행
+- alpha 스윕을 프로세스 안에서 실행 (dtg_simulation API 직접 호출, --jobs N 병렬)
 - 실행별 전용 출력 폴더(run_타임스탬프) 생성
-- 각 alpha 결과를 CSV/PNG로 수집
+- 각 alpha 결과를 메모리에 모아 CSV/요약을 한 번에 기록
 - 최신 대표 그래프를 figures/ 로도 동시 복사(가독성)
 """
-import argparse, subprocess, sys, shutil, json, time
+import argparse, sys, json
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from datetime import datetime
 
@@ -16,20 +17,39 @@ DATA = ROOT / "data"
 FIGS = ROOT / "figures"
 LOGS = ROOT / "logs"
 
-def sh(cmd: list[str], cwd=None):
-    p = subprocess.run(cmd, cwd=cwd, text=True, capture_output=True)
-    if p.returncode != 0:
-        print(p.stdout)
-        print(p.stderr, file=sys.stderr)
-        raise RuntimeError(f"Command failed: {' '.join(cmd)}")
-    return p.stdout
+sys.path.insert(0, str(CODE))
+import dtg_simulation as dtg
+from utils import new_run_id, atomic_open, write_text_atomic, copy_atomic, add_plot_args, plot_mode
+from utils import add_cache_args, cache_from_args
+from utils import METRICS, add_profile_arg, profiled, timer
+
+def sweep_point(a: str, outdir: Path, seed: int, run_id: str, solver: str = "euler",
+                plot: str = "inline", cache=None) -> dict:
+    """alpha 하나 실행 (워커 프로세스에서도 호출됨). CSV 누적은 부모가 한 번에."""
+    spikes, energy = dtg.run_one(float(a), run_id, outdir, seed=seed, record=False, solver=solver,
+                                 plot=plot, cache=cache)
+    return {"alpha": float(a), "spikes": spikes, "energy_proxy": energy}
+
+def _sweep_worker(*args):
+    """워커 프로세스용: 이 점의 계측만 떼어 (행, metrics dict)로 돌려줌 → 부모가 합산"""
+    METRICS.reset()
+    row = sweep_point(*args)
+    return row, METRICS.to_dict()
 
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--alphas", default="0.3,0.4,0.5,0.6,0.7,0.8,0.9,1.0,1.1,1.2",
                     help="쉼표구분 리스트")
     ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--jobs", type=int, default=1, help="병렬 워커 수 (1이면 순차 실행)")
+    ap.add_argument("--solver", choices=["euler", "exact"], default="euler",
+                    help="DTG 해법 (exact: 스파이크 사이 닫힌 꼴 점프)")
+    add_plot_args(ap)
+    add_cache_args(ap)
+    add_profile_arg(ap)   # run_dir/profile.prof (+ .txt), 워커 내부는 포함 안 됨
     args = ap.parse_args()
+    plot = plot_mode(args)
+    cache = cache_from_args(args)
 
     # 실행 세션 폴더
     stamp = datetime.now().strftime("%Y_%m_%d_%H%M%S")
@@ -45,50 +65,69 @@ def main():
         "alphas": args.alphas,
         "seed": args.seed,
         "script": "run_experiment.py",
-        "dtg_script": "dtg_simulation.py --alpha --outdir --seed",
+        "dtg_api": "dtg_simulation.run_one (in-process)",
+        "jobs": args.jobs,
+        "solver": args.solver,
     }
-    (run_dir / "meta.json").write_text(json.dumps(meta, indent=2), encoding="utf-8")
+    write_text_atomic(run_dir / "meta.json", json.dumps(meta, indent=2))
+
+    with profiled(args.profile, run_dir / "profile"):
+        sweep(args, run_dir, figs_dir, plot, cache)
 
+    # 실행별 계측 (워커 합산) → meta.json 옆
+    path = METRICS.write(run_dir / "metrics.json", script="run_experiment.py", jobs=args.jobs,
+                         solver=args.solver)
+    print(f"[OK] metrics → {path}  ({METRICS.summary(4)})")
+    if plot == "defer":
+        print(f"[NOTE] plots deferred → python3 render_queue.py {run_dir} (repo root)")
+
+def sweep(args, run_dir, figs_dir, plot, cache):
     # 스윕
     alphas = [a.strip() for a in args.alphas.split(",") if a.strip()]
-    summary_rows = []
+    run_id = new_run_id()
+    outdirs = []
     for a in alphas:
         outdir = run_dir / f"alpha_{a}"
         outdir.mkdir(exist_ok=True)
+        outdirs.append(outdir)
         print(f"[RUN] alpha={a} → {outdir}")
 
-        # dtg_simulation.py가 인자(--alpha/--outdir/--seed)를 지원한다는 가정
-        # (아래 2단계의 '아주 작은 패치'를 적용하면 됩니다)
-        sh([sys.executable, str(CODE / "dtg_simulation.py"),
-            "--alpha", a,
-            "--outdir", str(outdir),
-            "--seed", str(args.seed)
-        ])
-
-        # dtg_simulation이 outdir 안에 결과 요약 JSON을 남긴다고 가정
-        # (아래 패치 예시 포함) 없으면 건너뜀
-        summary_json = outdir / "summary.json"
-        if summary_json.exists():
-            s = json.loads(summary_json.read_text(encoding="utf-8"))
-            summary_rows.append(s)
+    with timer("sweep.points"):
+        if args.jobs > 1:
+            with ProcessPoolExecutor(max_workers=args.jobs) as ex:
+                done = list(ex.map(_sweep_worker, alphas, outdirs,
+                                   [args.seed] * len(alphas), [run_id] * len(alphas),
+                                   [args.solver] * len(alphas), [plot] * len(alphas),
+                                   [cache] * len(alphas)))
+            summary_rows = [row for row, _ in done]
+            for _, m in done:
+                METRICS.merge(m)
+        else:
+            summary_rows = [sweep_point(a, o, args.seed, run_id, args.solver, plot, cache)
+                            for a, o in zip(alphas, outdirs)]
+
+    # 결과 한 번에 기록: spikes/energy CSV + 설정 스냅샷(summarize_last_run이 run_id를 찾음)
+    with timer("sweep.record"):
+        dtg.record_results(run_id, [(r["alpha"], r["spikes"], r["energy_proxy"])
+                                    for r in summary_rows])
+        dtg.save_config(run_id, [float(a) for a in alphas], run_dir, args.seed, args.solver)
 
+    for a, outdir in zip(alphas, outdirs):
         # 대표 PNG를 figures/run_타임스탬프/ & figures/ 루트에도 복사
         # 파일명은 dtg_simulation에서 저장한 이름 규칙을 사용
-        for cand in ["membrane.png", f"membrane_alpha_{a}.png"]:
+        for cand in ["membrane.png", f"membrane_alpha_{float(a)}.png", f"membrane_alpha_{a}.png"]:
             src = outdir / cand
             if src.exists():
-                shutil.copy2(src, figs_dir / src.name)
+                copy_atomic(src, figs_dir / src.name)
                 # 최신 대표본은 figures 루트에도 덮어쓰기 복사(가독성)
-                shutil.copy2(src, FIGS / src.name)
+                copy_atomic(src, FIGS / src.name)
                 break
 
-        time.sleep(0.1)
-
     # 스윕 요약 CSV 저장
     if summary_rows:
         import csv
         csv_path = run_dir / "sweep_summary.csv"
-        with csv_path.open("w", newline="", encoding="utf-8") as f:
+        with atomic_open(csv_path, "w", newline="", encoding="utf-8") as f:
             wr = csv.DictWriter(f, fieldnames=sorted(summary_rows[0].keys()))
             wr.writeheader()
             wr.writerows(summary_rows)
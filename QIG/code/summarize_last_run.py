@@ -1,45 +1,51 @@
 #!/usr/bin/env python3
-import csv, json
+import argparse, json, sys
 from pathlib import Path
 from datetime import datetime, UTC
 
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from utils import latest_run_id as store_latest_run_id, run_rows, write_text_atomic, savefig_atomic
+from utils import add_plot_args, plot_mode, submit
+
 ROOT = Path(__file__).resolve().parents[1]
 DATA = ROOT / "data"
 FIGS = ROOT / "figures"
 RUNS = DATA / "runs"
 
-SPIKES = DATA / "spikes.csv"
-ENERGY = DATA / "energy.csv"
+STORE = DATA / "run_store.sqlite"   # 없으면 spikes.csv / energy.csv에서 자동 이관
 CONFIG = DATA / "config.json"
 
 def latest_run_id():
+    # 저장소의 마지막 run (인덱스 조회), 비어 있으면 config.json 스냅샷
+    run_id = store_latest_run_id(STORE)
+    if run_id:
+        return run_id
     if CONFIG.exists():
         try:
             j = json.loads(CONFIG.read_text())
             return j.get("run_id")
         except: pass
-    # fallback: spikes.csv의 마지막 run_id 사용
-    last = None
-    if SPIKES.exists():
-        with SPIKES.open() as f:
-            r = csv.reader(f)
-            next(r, None)
-            for row in r:
-                last = row[0] if row else last
-    return last
+    return None
+
+def rows_for(run_id):
+    """run_id의 [run_id, timestamp, alpha, spikes, energy_proxy] 문자열 행"""
+    if not run_id: return []
+    return [[str(v) for v in r] for r in run_rows(run_id, STORE)]
 
-def rows_for(csv_path, run_id):
-    out = []
-    if not csv_path.exists() or not run_id: return out
-    with csv_path.open() as f:
-        r = csv.reader(f)
-        header = next(r, None)
-        for row in r:
-            if row and row[0] == run_id:
-                out.append(row)
-    return out
+def render_spikes_bar(out_path, alphas, spikes, run_id):
+    import matplotlib.pyplot as plt
+    fig = plt.figure(figsize=(6,3))
+    plt.bar([str(a) for a in alphas], spikes)
+    plt.xlabel("alpha"); plt.ylabel("spikes")
+    plt.title(f"Run {run_id} — spikes by alpha")
+    plt.tight_layout()
+    savefig_atomic(fig, out_path, dpi=140)
+    plt.close()
 
-def main():
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="가장 최근 run 요약/아카이브")
+    add_plot_args(ap)
+    plot = plot_mode(ap.parse_args(argv))
     run_id = latest_run_id()
     if not run_id:
         print("no run_id found.")
@@ -48,30 +54,25 @@ def main():
     run_fig = (ROOT/"figures"/"runs"/run_id); run_fig.mkdir(parents=True, exist_ok=True)
     run_dat = (ROOT/"data"/"runs"/run_id); run_dat.mkdir(parents=True, exist_ok=True)
 
-    sp = rows_for(SPIKES, run_id)
-    en = rows_for(ENERGY, run_id)
+    rows = rows_for(run_id)
+    sp = [r[:4] for r in rows]
+    en = [r[:3] + [r[4]] for r in rows]
 
     # 요약 CSV
     sp_out = run_dat/"spikes_subset.csv"
     en_out = run_dat/"energy_subset.csv"
-    sp_out.write_text("run_id,timestamp,alpha,spikes\n" + "\n".join(",".join(r) for r in sp) + "\n")
-    en_out.write_text("run_id,timestamp,alpha,energy_proxy\n" + "\n".join(",".join(r) for r in en) + "\n")
+    write_text_atomic(sp_out, "run_id,timestamp,alpha,spikes\n" + "\n".join(",".join(r) for r in sp) + "\n")
+    write_text_atomic(en_out, "run_id,timestamp,alpha,energy_proxy\n" + "\n".join(",".join(r) for r in en) + "\n")
 
     # 요약 그래프
     try:
-        import matplotlib.pyplot as plt
         alphas = [float(r[2]) for r in sp]
         spikes = [int(r[3]) for r in sp]
         if alphas:
-            plt.figure(figsize=(6,3))
-            plt.bar([str(a) for a in alphas], spikes)
-            plt.xlabel("alpha"); plt.ylabel("spikes")
-            plt.title(f"Run {run_id} — spikes by alpha")
-            plt.tight_layout()
-            out = run_fig / "spikes_bar.png"
-            plt.savefig(out, dpi=140)
-            plt.close()
-            print(f"[OK] {out}")
+            out = submit("summarize_last_run:render_spikes_bar", run_fig / "spikes_bar.png", plot,
+                         meta={"run_id": run_id}, alphas=alphas, spikes=spikes)
+            if out:
+                print(f"[OK] {out}")
     except Exception as e:
         print(f"[WARN] plot skipped: {e}")
 
@@ -86,7 +87,7 @@ def main():
             md.append(f"| {r[2]} | {r[3]} |")
         md.append("")
         md.append(f"![spikes_bar](figures/runs/{run_id}/spikes_bar.png)")
-    (run_dat/"README_snippet.md").write_text("\n".join(md))
+    write_text_atomic(run_dat/"README_snippet.md", "\n".join(md))
     print(f"[OK] snippet → {run_dat/'README_snippet.md'}")
 
     # 매니페스트
@@ -102,7 +103,7 @@ def main():
             "snippet_md": str((run_dat/'README_snippet.md').relative_to(ROOT)),
         }
     }
-    (run_dat/"manifest.json").write_text(json.dumps(manifest, indent=2, ensure_ascii=False))
+    write_text_atomic(run_dat/"manifest.json", json.dumps(manifest, indent=2, ensure_ascii=False))
     print(f"[OK] manifest → {run_dat/'manifest.json'}")
 
 if __name__ == "__main__":
@@ -1,26 +1,193 @@
-import os, csv, json
+import os, csv, json, shutil, sqlite3, tempfile
+from contextlib import contextmanager
 from datetime import datetime, UTC
-import uuid
+import sys, uuid
+
+# 그림은 저장소 루트의 render_queue로 요청 (--no-plot / --defer-plots 공통 처리)
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if _REPO_ROOT not in sys.path:
+    sys.path.append(_REPO_ROOT)
+from render_queue import LOD_POINTS, add_plot_args, lod_indices, plot_mode, submit  # noqa: E402
+from sim_cache import SimCache, add_cache_args, cache_from_args, cache_key  # noqa: E402
+from instrument import METRICS, add_profile_arg, count, profiled, timer  # noqa: E402
+from sim_backend import add_backend_arg, select_backend  # noqa: E402
 
 def ensure_dir(path_or_file):
     d = path_or_file if os.path.isdir(path_or_file) else os.path.dirname(path_or_file)
     if d and not os.path.exists(d):
         os.makedirs(d, exist_ok=True)
 
+# ===== 원자적 / 동시 실행 안전 쓰기 =====
+# 병렬 스윕 워커가 같은 파일에 써도 헤더 중복·행 섞임·반쯤 쓴 파일이 생기지 않게:
+#   - 덮어쓰기: 같은 폴더 임시 파일에 쓰고 fsync 후 os.replace (읽는 쪽은 항상 완전한 파일만 봄)
+#   - 이어쓰기: <path>.lock 배타 잠금 안에서 헤더 판단 + 기록
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+_UMASK = os.umask(0); os.umask(_UMASK)   # mkstemp는 0600이라 일반 파일 권한으로 맞춤
+
+@contextmanager
+def file_lock(path):
+    """<path>.lock 에 대한 프로세스 간 배타 잠금"""
+    ensure_dir(str(path))
+    with open(f"{path}.lock", "a+b") as lf:
+        if fcntl is not None:
+            fcntl.flock(lf.fileno(), fcntl.LOCK_EX)
+        else:
+            lf.seek(0)
+            msvcrt.locking(lf.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lf.fileno(), fcntl.LOCK_UN)
+            else:
+                lf.seek(0)
+                msvcrt.locking(lf.fileno(), msvcrt.LK_UNLCK, 1)
+
+@contextmanager
+def atomic_open(path, mode="w", **kw):
+    """임시 파일로 열어 두었다가 정상 종료 시에만 path로 교체 (예외면 원본 유지)"""
+    path = str(path)
+    ensure_dir(path)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".",
+                               prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode, **kw) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, 0o666 & ~_UMASK)
+        count("bytes_written", os.path.getsize(tmp))
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+def write_text_atomic(path, text, encoding="utf-8"):
+    with atomic_open(path, "w", encoding=encoding) as f:
+        f.write(text)
+
+def savefig_atomic(fig, path, **kw):
+    """fig.savefig를 임시 파일로 한 뒤 교체 (형식은 확장자에서)"""
+    kw.setdefault("format", os.path.splitext(str(path))[1].lstrip(".") or None)
+    with atomic_open(path, "wb") as f:
+        fig.savefig(f, **kw)
+
+def copy_atomic(src, dst):
+    """shutil.copy2와 같지만 대상 교체는 원자적으로"""
+    with open(src, "rb") as fi, atomic_open(dst, "wb") as fo:
+        shutil.copyfileobj(fi, fo)
+    shutil.copystat(src, dst)
+
 def write_csv_append(path, header=None, rows=None):
     ensure_dir(path)
-    new_file = not os.path.exists(path) or os.path.getsize(path) == 0
-    with open(path, "a", newline="") as f:
-        w = csv.writer(f)
-        if new_file and header:
-            w.writerow(header)
-        for r in (rows or []):
-            w.writerow(r)
+    with file_lock(path):
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        with open(path, "a", newline="") as f:
+            start = f.tell()
+            w = csv.writer(f)
+            if new_file and header:
+                w.writerow(header)
+            for r in (rows or []):
+                w.writerow(r)
+            f.flush()
+            os.fsync(f.fileno())
+            count("bytes_written", f.tell() - start)
 
 def save_json(path, obj):
-    ensure_dir(path)
-    with open(path, "w") as f:
+    with atomic_open(path, "w") as f:
         json.dump(obj, f, indent=2, ensure_ascii=False)
 
 def new_run_id():
     return datetime.now(UTC).strftime("%Y%m%dT%H%M%SZ") + "-" + uuid.uuid4().hex[:8]
+
+# ===== 실행 저장소 (SQLite, run_id/alpha 인덱스) =====
+# spikes.csv / energy.csv 전체를 선형 스캔하지 않고 run_id로 바로 조회한다.
+# runs.seq(자동 증가)가 실행 순서라 최신 run 조회는 인덱스 한 번(O(1)).
+
+RUN_DB = "data/run_store.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    seq        INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id     TEXT UNIQUE NOT NULL,
+    created_at TEXT
+);
+CREATE TABLE IF NOT EXISTS results (
+    run_id       TEXT NOT NULL,
+    timestamp    TEXT,
+    alpha        REAL NOT NULL,
+    spikes       INTEGER,
+    energy_proxy REAL,
+    PRIMARY KEY (run_id, alpha)
+);
+"""
+
+def open_run_store(path=RUN_DB):
+    """저장소 연결 (없으면 스키마 생성 후 같은 폴더의 spikes.csv / energy.csv 이관)"""
+    ensure_dir(str(path))
+    fresh = not os.path.exists(path)
+    con = sqlite3.connect(str(path), timeout=30.0)
+    con.execute("PRAGMA journal_mode=WAL")   # 스윕 워커 동시 쓰기 / 읽기 허용
+    con.executescript(_SCHEMA)
+    if fresh:
+        d = os.path.dirname(str(path))
+        migrate_csv(con, os.path.join(d, "spikes.csv"), os.path.join(d, "energy.csv"))
+    return con
+
+def _read_csv_rows(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, newline="") as f:
+        r = csv.reader(f)
+        next(r, None)
+        return [row for row in r if len(row) >= 4]
+
+def migrate_csv(con, spikes_csv, energy_csv):
+    """기존 누적 CSV → 저장소 (run_id, alpha 기준 병합, 여러 번 실행해도 안전). 반환: 이관 행 수"""
+    energy = {(r[0], float(r[2])): float(r[3]) for r in _read_csv_rows(energy_csv)}
+    rows = [(r[0], r[1], float(r[2]), int(r[3]), energy.get((r[0], float(r[2]))))
+            for r in _read_csv_rows(spikes_csv)]
+    with con:
+        for run_id, ts, *_ in rows:   # CSV 등장 순서 = 실행 순서
+            con.execute("INSERT OR IGNORE INTO runs (run_id, created_at) VALUES (?, ?)",
+                        (run_id, ts))
+        con.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)", rows)
+    return len(rows)
+
+def store_results(run_id, rows, path=RUN_DB, timestamp=None):
+    """[(alpha, spikes, energy_proxy), ...] → 저장소 한 트랜잭션으로 기록"""
+    ts = timestamp or datetime.now(UTC).isoformat()
+    con = open_run_store(path)
+    try:
+        with con:
+            con.execute("INSERT OR IGNORE INTO runs (run_id, created_at) VALUES (?, ?)",
+                        (run_id, ts))
+            con.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+                            [(run_id, ts, float(a), int(s), float(e)) for a, s, e in rows])
+    finally:
+        con.close()
+
+def latest_run_id(path=RUN_DB):
+    """가장 최근에 기록된 run_id (없으면 None)"""
+    con = open_run_store(path)
+    try:
+        row = con.execute("SELECT run_id FROM runs ORDER BY seq DESC LIMIT 1").fetchone()
+    finally:
+        con.close()
+    return row[0] if row else None
+
+def run_rows(run_id, path=RUN_DB):
+    """run_id의 결과 행 [(run_id, timestamp, alpha, spikes, energy_proxy), ...] (alpha 오름차순)"""
+    con = open_run_store(path)
+    try:
+        return con.execute(
+            "SELECT run_id, timestamp, alpha, spikes, energy_proxy FROM results "
+            "WHERE run_id = ? ORDER BY alpha", (run_id,)).fetchall()
+    finally:
+        con.close()
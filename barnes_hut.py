@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# barnes_hut.py — Barnes–Hut 옥트리 중력 가속도 (NumPy 벡터화, O(N log N))
+#
+# 트리: Morton(Z-order) 코드로 입자를 정렬한 뒤 레벨별로 접두사가 같은 구간을
+#       노드로 묶는다. 각 노드는 정렬 배열의 연속 구간 [start, end) 이므로
+#       질량/질량중심은 누적합 차이로 바로 얻는다.
+# 순회: (입자, 노드) 쌍 전체를 한 번에 평가 — s/d < θ 이면 단극 근사, 아니면
+#       자식 노드(또는 리프 내부 입자 직접합)로 펼친다. 입자 청크 단위로 돌려
+#       메모리는 O(N + chunk·깊이) 로 유지된다.
+import numpy as np
+
+MAX_DEPTH = 21  # 3×21 = 63 bit Morton 코드
+
+def _part1by2(x):
+    """21비트 정수의 비트 사이에 0 두 개씩 끼워 넣기"""
+    x = x & np.uint64(0x1FFFFF)
+    x = (x | (x << np.uint64(32))) & np.uint64(0x1F00000000FFFF)
+    x = (x | (x << np.uint64(16))) & np.uint64(0x1F0000FF0000FF)
+    x = (x | (x << np.uint64(8)))  & np.uint64(0x100F00F00F00F00F)
+    x = (x | (x << np.uint64(4)))  & np.uint64(0x10C30C30C30C30C3)
+    x = (x | (x << np.uint64(2)))  & np.uint64(0x1249249249249249)
+    return x
+
+def morton_codes(x, lo, size, depth=MAX_DEPTH):
+    """(N,3) 좌표 → (N,) uint64 Morton 코드"""
+    n_cells = 1 << depth
+    q = np.floor((x - lo) / size * n_cells)
+    q = np.clip(q, 0, n_cells - 1).astype(np.uint64)
+    return (_part1by2(q[:, 0])
+            | (_part1by2(q[:, 1]) << np.uint64(1))
+            | (_part1by2(q[:, 2]) << np.uint64(2)))
+
+class Octree:
+    """정렬된 입자 배열 위의 평탄(flat) 옥트리
+
+    노드 배열: start/end(정렬 입자 구간), mass, com(노드수,3), size(변 길이),
+    child_start/n_child(전역 노드 인덱스 구간). n_child == 0 이면 리프.
+    """
+    def __init__(self, pos, masses, leaf_size=8, depth=MAX_DEPTH):
+        x = np.ascontiguousarray(np.asarray(pos, float).T)  # (N,3)
+        m = np.asarray(masses, float)
+        N = x.shape[0]
+        lo = x.min(axis=0)
+        size = float((x.max(axis=0) - lo).max()) * (1.0 + 1e-12) or 1.0
+
+        codes = morton_codes(x, lo, size, depth)
+        order = np.argsort(codes, kind="stable")
+        codes = codes[order]
+        self.order = order
+        self.x = x[order]
+        self.m = m[order]
+
+        cm = np.concatenate([[0.0], np.cumsum(self.m)])
+        cmx = np.vstack([np.zeros((1, 3)), np.cumsum(self.m[:, None] * self.x, axis=0)])
+
+        starts, ends, sizes = [np.array([0])], [np.array([N])], [np.array([size])]
+        parents = []  # 레벨 l+1 노드의 (레벨 l 내) 부모 인덱스
+        cur_s, cur_e = starts[0], ends[0]
+        for level in range(depth):
+            expand = (cur_e - cur_s) > leaf_size
+            if not expand.any():
+                break
+            active = np.zeros(N + 1, np.int64)
+            np.add.at(active, cur_s[expand], 1)
+            np.add.at(active, cur_e[expand], -1)
+            active = np.cumsum(active[:-1]).astype(bool)
+            key = codes >> np.uint64(3 * (depth - level - 1))
+            brk = np.flatnonzero((key[1:] != key[:-1]) | (active[1:] != active[:-1])) + 1
+            seg_s = np.concatenate([[0], brk])
+            seg_e = np.concatenate([brk, [N]])
+            keep = active[seg_s]
+            seg_s, seg_e = seg_s[keep], seg_e[keep]
+            parents.append(np.searchsorted(cur_s, seg_s, side="right") - 1)
+            starts.append(seg_s); ends.append(seg_e)
+            sizes.append(np.full(seg_s.size, size / 2.0 ** (level + 1)))
+            cur_s, cur_e = seg_s, seg_e
+
+        offsets = np.cumsum([0] + [s.size for s in starts])
+        n_nodes = offsets[-1]
+        self.start = np.concatenate(starts)
+        self.end = np.concatenate(ends)
+        self.size = np.concatenate(sizes)
+        self.mass = cm[self.end] - cm[self.start]
+        self.com = (cmx[self.end] - cmx[self.start]) / np.maximum(self.mass, 1e-300)[:, None]
+        self.child_start = np.zeros(n_nodes, np.int64)
+        self.n_child = np.zeros(n_nodes, np.int64)
+        for level, par in enumerate(parents):
+            gpar = par + offsets[level]
+            cnt = np.bincount(gpar, minlength=n_nodes)
+            first = np.searchsorted(gpar, np.arange(n_nodes), side="left")
+            has = cnt > 0
+            self.n_child[has] = cnt[has]
+            self.child_start[has] = first[has] + offsets[level + 1]
+        self.n_nodes = n_nodes
+
+def _expand(idx, counts, base):
+    """각 idx를 counts번 반복하고 base+0..count-1 오프셋을 붙인다"""
+    rep = np.repeat(idx, counts)
+    tot = counts.sum()
+    off = np.arange(tot) - np.repeat(np.cumsum(counts) - counts, counts)
+    return rep, np.repeat(base, counts) + off
+
+def bh_accelerations(pos, G, masses, theta=0.5, eps=1e-12, leaf_size=8, chunk=4096):
+    """Barnes–Hut 가속도: pos (3,N) → (3,N). theta=0 이면 직접합과 같다."""
+    tree = Octree(pos, masses, leaf_size=leaf_size)
+    x, m = tree.x, tree.m
+    N = x.shape[0]
+    th2 = theta * theta
+    acc_sorted = np.zeros((N, 3))
+
+    for c0 in range(0, N, chunk):
+        c1 = min(c0 + chunk, N)
+        acc_c = np.zeros((c1 - c0, 3))
+        bi = np.arange(c0, c1)
+        nodes = np.zeros(bi.size, np.int64)
+        while bi.size:
+            d = tree.com[nodes] - x[bi]
+            r2 = np.einsum("pk,pk->p", d, d) + eps
+            contains = (tree.start[nodes] <= bi) & (bi < tree.end[nodes])
+            far = (tree.size[nodes] ** 2 < th2 * r2) & ~contains
+            if far.any():
+                w = tree.mass[nodes[far]] * r2[far] ** -1.5
+                for k in range(3):
+                    acc_c[:, k] += np.bincount(bi[far] - c0, weights=w * d[far, k],
+                                               minlength=c1 - c0)
+            near = ~far
+            leaf = near & (tree.n_child[nodes] == 0)
+            if leaf.any():
+                nl = nodes[leaf]
+                bi_l, js = _expand(bi[leaf], tree.end[nl] - tree.start[nl], tree.start[nl])
+                ok = js != bi_l
+                bi_l, js = bi_l[ok], js[ok]
+                dd = x[js] - x[bi_l]
+                rr2 = np.einsum("pk,pk->p", dd, dd) + eps
+                w = m[js] * rr2 ** -1.5
+                for k in range(3):
+                    acc_c[:, k] += np.bincount(bi_l - c0, weights=w * dd[:, k],
+                                               minlength=c1 - c0)
+            inner = near & ~leaf
+            ni = nodes[inner]
+            bi, nodes = _expand(bi[inner], tree.n_child[ni], tree.child_start[ni])
+        acc_sorted[c0:c1] = acc_c
+
+    acc = np.empty((N, 3))
+    acc[tree.order] = acc_sorted
+    return G * acc.T
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# bench_backends.py — numpy vs numba 백엔드 처리량 (steps/sec)
+#   rhs       : solve_ivp 콜백 1회 = 1 step
+#   yoshida4  : 고정 스텝 적분 루프 전체 (exp2)
+#   lif       : LIF 시간 루프 (dtg_simulation 기본 파라미터)
+import argparse, sys, time
+from pathlib import Path
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "QIG" / "code"))
+import three_body_3d as tb
+import nbody_jit
+from lif_model import simulate_lif, dynamic_threshold
+
+def rate(fn, n_steps, min_time=0.5):
+    fn()  # 워밍업(JIT 컴파일 포함)
+    reps, t0 = 0, time.perf_counter()
+    while True:
+        fn(); reps += 1
+        el = time.perf_counter() - t0
+        if el >= min_time:
+            return reps * n_steps / el
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--backends", default="numpy,numba")
+    ap.add_argument("--min-time", type=float, default=0.5)
+    args = ap.parse_args()
+
+    masses = np.array([1.0, 1.0, 1.0])
+    s0 = tb.make_ic("exp2", 1.0)
+    t = np.arange(0.0, 1.0, 1e-3)
+    th = dynamic_threshold(t, v_th_base=1.0, alpha=0.7)
+
+    print(f"{'backend':<8} {'rhs/s':>12} {'yoshida4 steps/s':>18} {'lif steps/s':>14}")
+    for name in args.backends.split(","):
+        if name == "numba" and not nbody_jit.HAVE_NUMBA:
+            print(f"{name:<8} (numba not installed — skipped)")
+            continue
+        tb.set_backend(name)
+        r_rhs = rate(lambda: [tb.rhs(0.0, s0, 1.0, masses) for _ in range(1000)], 1000, args.min_time)
+        r_sym = rate(lambda: tb.integrate_symplectic(s0, 5.0, 0.005, 1.0, masses, "yoshida4"),
+                     1000, args.min_time)
+        r_lif = rate(lambda: simulate_lif(th, 1.10, refractory_ms=2.0, backend=name),
+                     t.size, args.min_time)
+        print(f"{name:<8} {r_rhs:>12.0f} {r_sym:>18.0f} {r_lif:>14.0f}")
+
+if __name__ == "__main__":
+    main()
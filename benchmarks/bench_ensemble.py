@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# bench_ensemble.py — 배치 앙상블 적분 vs IC마다 run() 반복: 벽시계 속도 향상 (목표 50–100x, M ≥ 1000)
+#
+#   python benchmarks/bench_ensemble.py                      # M = 4 IC × 250 alpha = 1000
+#   python benchmarks/bench_ensemble.py --n-alphas 25 --loop-sample 8
+#
+# run() 반복은 --loop-sample개 IC(격자에서 고르게)만 실제로 돌려(임시 디렉터리, 그림/캐시 끔)
+# IC당 평균 시간 × M으로 외삽한다. 같은 IC들에서 앙상블 최종 상태와 run() 최종 상태의 차이도 보고.
+import argparse, contextlib, io, sys, tempfile, time
+from pathlib import Path
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import three_body_3d as tb
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--ics", default="exp1,exp2,exp3,figure8")
+    ap.add_argument("--n-alphas", type=int, default=250, help="IC당 alpha 개수 (M = IC 수 × 이 값)")
+    ap.add_argument("--alpha-range", default="0.5,1.5")
+    ap.add_argument("--tmax", type=float, default=2.0)
+    ap.add_argument("--dt", type=float, default=0.01)
+    ap.add_argument("--loop-sample", type=int, default=16, help="실제로 run()을 돌릴 IC 수")
+    ap.add_argument("--target", type=float, default=50.0, help="기대 최소 속도 향상 배율")
+    args = ap.parse_args()
+
+    lo, hi = (float(x) for x in args.alpha_range.split(","))
+    labels, S0 = tb.make_ic_ensemble(args.ics.split(","), np.linspace(lo, hi, args.n_alphas))
+    M = len(labels)
+    masses = np.array([1.0, 1.0, 1.0])
+
+    t0 = time.perf_counter()
+    _, Y, info = tb.integrate_ensemble(S0, args.tmax, args.dt, 1.0, masses)
+    t_ens = time.perf_counter() - t0
+    n_bad = int(np.sum(info["status"] != "ok"))
+
+    idx = np.unique(np.linspace(0, M - 1, min(args.loop_sample, M)).round().astype(int))
+    diffs = []
+    with tempfile.TemporaryDirectory() as tmp:
+        t0 = time.perf_counter()
+        for i in idx:
+            ic, a = labels[i]
+            with contextlib.redirect_stdout(io.StringIO()):
+                tb.run(ic, a, args.tmax, args.dt, tmp, output="csv", plot="off")
+        t_loop = (time.perf_counter() - t0) / idx.size
+        for i in idx:   # run()은 CSV에 위치만 남기므로 같은 적분을 다시 해 최종 상태 비교
+            sol = tb.integrate(S0[i], args.tmax, args.dt, 1.0, masses)
+            diffs.append(np.max(np.abs(sol.y[:, -1] - Y[-1, i])))
+
+    speedup = t_loop * M / t_ens
+    print(f"M={M}  t_max={args.tmax:g}  steps/system median={np.median(info['steps']):.0f} "
+          f"max={info['steps'].max()}  not ok={n_bad}")
+    print(f"ensemble      : {t_ens:>9.3f} s")
+    print(f"run() loop    : {t_loop * M:>9.3f} s  (extrapolated from {idx.size} IC, "
+          f"{t_loop * 1e3:.1f} ms/IC)")
+    print(f"speedup       : {speedup:>9.1f}x")
+    print(f"|Δ final state| vs integrate(): median={np.median(diffs):.2e}  max={np.max(diffs):.2e}")
+    if speedup < args.target:
+        print(f"[WARN] speedup {speedup:.1f}x below target {args.target:g}x")
+    else:
+        print(f"[OK] speedup ≥ {args.target:g}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+# bench_forces.py — 직접합 vs Barnes–Hut 교차점: N별 시간 / 피크 메모리 / 상대 오차
+import argparse, sys, time, tracemalloc
+from pathlib import Path
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import three_body_3d as tb
+from barnes_hut import bh_accelerations
+
+def measure(fn, repeat):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        out = fn()
+    wall = (time.perf_counter() - t0) / repeat
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return out, wall, peak / 2**20
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--ns", default="64,256,1024,4096,16384,65536")
+    ap.add_argument("--theta", type=float, default=0.5)
+    ap.add_argument("--eps", type=float, default=1e-4)
+    ap.add_argument("--direct-max", type=int, default=16384, help="이보다 큰 N은 직접합 생략")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    print(f"{'N':>7} {'direct[s]':>10} {'MB':>8} {'bh[s]':>10} {'MB':>8} {'rel.err':>9}  faster")
+    for N in map(int, args.ns.split(",")):
+        s0, masses = tb.make_cluster(N)
+        pos, _ = tb.unpack_state(s0, N=N)
+        rep = args.repeat if N <= 4096 else 1
+        b, t_bh, m_bh = measure(
+            lambda: bh_accelerations(pos, 1.0, masses, theta=args.theta, eps=args.eps), rep)
+        if N <= args.direct_max:
+            a, t_d, m_d = measure(lambda: tb.accelerations(pos, 1.0, masses, args.eps), rep)
+            err = np.median(np.linalg.norm(a - b, axis=0) / np.linalg.norm(a, axis=0))
+            win = "bh" if t_bh < t_d else "direct"
+            print(f"{N:>7d} {t_d:>10.4f} {m_d:>8.1f} {t_bh:>10.4f} {m_bh:>8.1f} {err:>9.2e}  {win}")
+        else:
+            print(f"{N:>7d} {'-':>10} {'-':>8} {t_bh:>10.4f} {m_bh:>8.1f} {'-':>9}  -")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# bench_import.py — 진입점 import 시간 예산 검사 (python -X importtime)
+#
+#   python benchmarks/bench_import.py                  # 전체 진입점, 예산 300 ms
+#   python benchmarks/bench_import.py --budget-ms 200 -k three_body
+#
+# 모듈마다 새 인터프리터에서 `import <모듈>`을 --repeat번 돌려 최상위 모듈의 누적 import 시간
+# 최솟값을 잰다 (첫 실행은 .pyc 생성용으로 버림). 예산을 넘거나, 무거운 모듈(pandas /
+# matplotlib / scipy.integrate)이 import 시점에 끌려오면 종료 코드 1.
+import argparse, json, os, subprocess, sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+QIG_CODE = ROOT / "QIG" / "code"
+
+# (모듈, 실행 위치) — Makefile / CLI가 직접 부르는 스크립트와 그 공용 모듈
+ENTRY_POINTS = [(m, ROOT) for m in ("three_body_3d", "three_body_sweep", "dtg_coupling",
+                                    "render_queue", "sim_cache", "trajectory_io")] + \
+               [(m, QIG_CODE) for m in ("dtg_simulation", "run_experiment", "summarize_last_run",
+                                        "analyze_last_run", "export_report", "lif_network")]
+HEAVY = ("pandas", "matplotlib", "scipy.integrate")
+
+def import_profile(module, cwd):
+    """새 인터프리터에서 import 1회 → ({모듈: 누적 µs}, 최상위 누적 µs)"""
+    env = dict(os.environ, PYTHONPATH=str(cwd))
+    r = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                       cwd=cwd, env=env, capture_output=True, text=True, check=True)
+    cum = {}
+    for line in r.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, c, name = line[len("import time:"):].split("|")
+        cum[name.strip()] = int(c)
+    return cum, cum[module]
+
+def measure(module, cwd, repeat=5):
+    """반환: (최소 ms, import 시점에 로드된 무거운 모듈 목록)"""
+    import_profile(module, cwd)   # .pyc 워밍업
+    best, heavy = float("inf"), []
+    for _ in range(repeat):
+        cum, us = import_profile(module, cwd)
+        best = min(best, us / 1e3)
+        heavy = [h for h in HEAVY if h in cum]
+    return best, heavy
+
+def main():
+    ap = argparse.ArgumentParser(description="진입점 import 시간 예산 검사")
+    ap.add_argument("--budget-ms", type=float, default=300.0, help="모듈당 허용 import 시간[ms]")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("-k", default=None, help="이름에 포함된 모듈만 (쉼표구분)")
+    ap.add_argument("--out", default=None, help="결과 JSON 경로 (선택)")
+    args = ap.parse_args()
+
+    keys = [k for k in args.k.split(",") if k] if args.k else []
+    results, failed = {}, []
+    print(f"{'module':<22} {'import ms':>10}  heavy")
+    for module, cwd in ENTRY_POINTS:
+        if keys and not any(k in module for k in keys):
+            continue
+        ms, heavy = measure(module, cwd, args.repeat)
+        over = ms > args.budget_ms
+        results[module] = {"ms": ms, "heavy": heavy, "over_budget": over}
+        flag = "  OVER BUDGET" if over else ""
+        print(f"{module:<22} {ms:>10.1f}  {','.join(heavy) or '-'}{flag}")
+        if over or heavy:
+            failed.append(module)
+
+    if args.out:
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.out).write_text(json.dumps({"budget_ms": args.budget_ms, "results": results},
+                                             indent=2))
+        print(f"[OK] results → {args.out}")
+    if failed:
+        print(f"[FAIL] {len(failed)} module(s) over {args.budget_ms:g} ms or importing "
+              f"{'/'.join(HEAVY)} at import time: {', '.join(failed)}")
+        sys.exit(1)
+    print(f"[OK] all entry points import under {args.budget_ms:g} ms without heavy modules")
+
+if __name__ == "__main__":
+    main()
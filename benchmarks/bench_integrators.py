@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+# bench_integrators.py — DOP853 vs 심플렉틱 고정 스텝: 비용(RHS 호출/시간) 대비 에너지 드리프트
+import argparse, os, sys, time
+from pathlib import Path
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import three_body_3d as tb
+
+def max_drift(sol, masses):
+    return float(np.max(np.abs(tb.drift_diagnostics(sol.y, 1.0, masses)["energy"])))
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--ics", default="exp1,exp2,exp3,figure8")
+    ap.add_argument("--integrators", default=",".join(tb.INTEGRATORS))
+    ap.add_argument("--tmax", type=float, default=20.0)
+    ap.add_argument("--dt", type=float, default=0.005)
+    ap.add_argument("--csv", default=None, help="결과 CSV 저장 경로(옵션)")
+    args = ap.parse_args()
+
+    masses = np.array([1.0, 1.0, 1.0])
+    rows = []
+    print(f"{'ic':<8} {'integrator':<12} {'nfev':>9} {'wall[s]':>9} {'max|drift|':>12}")
+    for ic in args.ics.split(","):
+        s0 = tb.make_ic(ic, 1.0)
+        for name in args.integrators.split(","):
+            t0 = time.perf_counter()
+            sol = tb.integrate(s0, args.tmax, args.dt, 1.0, masses, integrator=name)
+            wall = time.perf_counter() - t0
+            d = max_drift(sol, masses)
+            rows.append((ic, name, int(sol.nfev), wall, d))
+            print(f"{ic:<8} {name:<12} {sol.nfev:>9d} {wall:>9.3f} {d:>12.3e}")
+
+    if args.csv:
+        os.makedirs(os.path.dirname(os.path.abspath(args.csv)), exist_ok=True)
+        with open(args.csv, "w") as f:
+            f.write("ic,integrator,nfev,wall_s,max_abs_drift\n")
+            for r in rows:
+                f.write(",".join(map(str, r)) + "\n")
+        print(f"[OK] CSV: {args.csv}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# bench_suite.py — 회귀 추적용 벤치마크 묶음 (CPU 전용, 오프라인)
+#
+#   python benchmarks/bench_suite.py                    # 전체 실행 → results/<시각>.json, 기준선과 비교
+#   python benchmarks/bench_suite.py --save-baseline    # 현재 결과를 기준선으로 저장
+#   python benchmarks/bench_suite.py -k rhs,lif --quick # 이름 필터 + 작은 크기
+#
+# 각 케이스는 "작업 1회당 초"(낮을수록 좋음)를 값으로 기록하고, 드리프트 같은 부가 지표는
+# extra에 남긴다. 기준선 대비 value가 (1 + threshold)배를 넘으면 회귀로 표시하고 종료 코드 1.
+import argparse, json, os, platform, shutil, subprocess, sys, tempfile, time
+from datetime import datetime, UTC
+from pathlib import Path
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+QIG_CODE = ROOT / "QIG" / "code"
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(QIG_CODE))
+import three_body_3d as tb
+import lif_network
+from lif_model import LIFNeuron, simulate_population
+
+HERE = Path(__file__).resolve().parent
+RESULTS_DIR = HERE / "results"
+BASELINE = HERE / "baseline.json"
+
+# ---------------- 측정 ----------------
+def per_call(fn, min_time=0.2, repeat=5):
+    """fn 1회당 시간(초)의 최솟값 (timeit 방식: 배경 부하 잡음 최소화).
+
+    워밍업(JIT 포함) 1회 후 repeat번, 각 반복은 min_time/repeat 이상 돈다.
+    """
+    fn()
+    budget = min_time / repeat
+    samples = []
+    for _ in range(repeat):
+        n, t0 = 0, time.perf_counter()
+        while True:
+            fn(); n += 1
+            el = time.perf_counter() - t0
+            if el >= budget:
+                break
+        samples.append(el / n)
+    return float(min(samples))
+
+def max_drift(sol, masses):
+    return float(np.max(np.abs(tb.drift_diagnostics(sol.y, 1.0, masses)["energy"])))
+
+# ---------------- 케이스 ----------------
+# 각 생성기는 (이름, fn) 을 내고, fn(args) → (초, extra dict)
+def cases_nbody(q):
+    masses3 = np.array([1.0, 1.0, 1.0])
+    for N in ((3, 64) if q else (3, 64, 512, 2048)):
+        s0, m = (tb.make_ic("exp1", 1.0), masses3) if N == 3 else tb.make_cluster(N)
+        pos, _ = tb.unpack_state(s0, N=N)
+        yield f"accelerations/N={N}", lambda a, pos=pos, m=m: (
+            per_call(lambda: tb.accelerations(pos, 1.0, m), a.min_time), {})
+        yield f"rhs/N={N}", lambda a, s0=s0, m=m: (
+            per_call(lambda: tb.rhs(0.0, s0, 1.0, m), a.min_time), {})
+
+    # IC별 고정 스텝 처리량 (초/스텝) + DOP853 / 심플렉틱 드리프트-비용 곡선
+    tmax, dt = (2.0, 0.005) if q else (10.0, 0.005)
+    for ic in ("exp1", "exp2", "exp3", "figure8"):
+        s0 = tb.make_ic(ic, 1.0)
+        n_steps = int(round(tmax / dt))
+
+        def steps(a, s0=s0, n_steps=n_steps):
+            sec = per_call(lambda: tb.integrate_symplectic(s0, tmax, dt, 1.0, masses3, "yoshida4"),
+                           a.min_time, repeat=3)
+            return sec / n_steps, {"steps_per_s": n_steps / sec}
+        yield f"steps/yoshida4/{ic}", steps
+
+        for integ in ("dop853", "verlet", "yoshida4", "yoshida6", "pefrl"):
+            def curve(a, s0=s0, integ=integ):
+                run = lambda: tb.integrate(s0, tmax, dt, 1.0, masses3, integrator=integ)
+                sol = run()
+                return per_call(run, a.min_time, repeat=3), {
+                    "nfev": int(sol.nfev), "max_abs_drift": max_drift(sol, masses3)}
+            yield f"drift_cost/{ic}/{integ}", curve
+
+def cases_lif(q):
+    neuron = LIFNeuron(refractory_ms=2.0)
+    yield "lif/neuron_step", lambda a: (per_call(lambda: neuron.step(1.1, 1.0), a.min_time), {})
+
+    t = np.arange(0.0, 1.0 if not q else 0.2, 1e-3)
+    for K in ((1, 100) if q else (1, 100, 10_000)):
+        def pop(a, K=K):
+            sec = per_call(lambda: simulate_population([1.0, 0.7, 0.5], t, 1.1, n_neurons=K,
+                                                       refractory_ms=2.0, record=False),
+                           a.min_time, repeat=3)
+            return sec / t.size, {"neuron_steps_per_s": K * 3 * t.size / sec}
+        yield f"lif/population_step/N={K}", pop
+
+    I_ext, W = lif_network.make_demo_network()
+    yield "lif_network/simulate_dense/N=5", lambda a: (
+        per_call(lambda: lif_network.simulate(0.7, W, I_ext), a.min_time, repeat=3)
+        / lif_network.steps, {})
+    for n in ((10_000,) if q else (10_000, 100_000)):
+        def sparse(a, n=n):
+            syn = lif_network.CSRSynapses.random(n, 10.0 / n, seed=0)
+            rng = np.random.default_rng(0)
+            amp = (1.0 + 0.05 * rng.standard_normal(n)).astype(np.float32)
+            sec = per_call(lambda: lif_network.simulate_sparse(syn, lambda _: amp, 0.7),
+                           a.min_time, repeat=1)
+            return sec / lif_network.steps, {"synapses": int(syn.indices.size)}
+        yield f"lif_network/simulate_sparse_step/N={n}", sparse
+
+def cases_pipeline(q):
+    """make sweep 경로 전체 (run_experiment → dtg_simulation → 저장) 벽시계 시간, 임시 복사본에서"""
+    alphas = "0.5,1.0" if q else "0.3,0.4,0.5,0.6,0.7,0.8,0.9,1.0,1.1,1.2"
+    for plot in ("--no-plot", ""):
+        def sweep(a, plot=plot):
+            with tempfile.TemporaryDirectory() as tmp:
+                # QIG/code/utils.py · lif_jit.py가 저장소 루트에서 import하는 공용 모듈들
+                for f in ("render_queue.py", "sim_cache.py", "instrument.py", "sim_backend.py"):
+                    shutil.copy2(ROOT / f, tmp)
+                shutil.copytree(QIG_CODE, Path(tmp) / "QIG" / "code",
+                                ignore=shutil.ignore_patterns("__pycache__"))
+                cmd = [sys.executable, "code/run_experiment.py", "--alphas", alphas,
+                       "--no-cache"] + ([plot] if plot else [])
+                t0 = time.perf_counter()
+                subprocess.run(cmd, cwd=Path(tmp) / "QIG", check=True, stdout=subprocess.DEVNULL)
+                return time.perf_counter() - t0, {"alphas": alphas}
+        yield f"sweep/e2e{'_noplot' if plot else ''}", sweep
+
+SUITES = {"nbody": cases_nbody, "lif": cases_lif, "pipeline": cases_pipeline}
+
+# ---------------- 실행 / 비교 ----------------
+def environment():
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                             capture_output=True, text=True).stdout.strip()
+    except OSError:
+        rev = ""
+    return {"timestamp": datetime.now(UTC).isoformat(), "git": rev,
+            "python": platform.python_version(), "numpy": np.__version__,
+            "platform": platform.platform(), "cpu_count": os.cpu_count(),
+            "backend": tb.get_backend()}
+
+def run_suite(args):
+    keys = [k for k in args.k.split(",") if k] if args.k else []
+    results = {}
+    for suite in args.suites.split(","):
+        for name, fn in SUITES[suite](args.quick):
+            if keys and not any(k in name for k in keys):
+                continue
+            sec, extra = fn(args)
+            results[name] = {"value": sec, "unit": "s", "extra": extra}
+            print(f"  {name:<42} {sec:>12.4e} s  {json.dumps(extra) if extra else ''}")
+    return results
+
+def compare(results, baseline, threshold):
+    """반환: [(이름, 기준, 현재, 비율)] 중 회귀인 것"""
+    base = baseline.get("results", {})
+    regressions = []
+    print(f"\n{'case':<42} {'baseline':>11} {'current':>11} {'ratio':>7}")
+    for name, r in results.items():
+        if name not in base:
+            continue
+        b = base[name]["value"]
+        ratio = r["value"] / b if b > 0 else float("inf")
+        flag = "  REGRESSION" if ratio > 1.0 + threshold else ""
+        print(f"{name:<42} {b:>11.3e} {r['value']:>11.3e} {ratio:>7.2f}{flag}")
+        if flag:
+            regressions.append((name, b, r["value"], ratio))
+    return regressions
+
+def main():
+    ap = argparse.ArgumentParser(description="벤치마크 묶음 + 기준선 회귀 검사")
+    ap.add_argument("--suites", default=",".join(SUITES), help="nbody,lif,pipeline 중 선택")
+    ap.add_argument("-k", default=None, help="이름에 포함된 케이스만 (쉼표구분)")
+    ap.add_argument("--quick", action="store_true", help="작은 크기/짧은 시간")
+    ap.add_argument("--min-time", type=float, default=0.3, help="케이스당 최소 측정 시간[s]")
+    ap.add_argument("--backend", choices=tb.BACKENDS, default=None)
+    ap.add_argument("--threshold", type=float, default=0.15, help="회귀 판정 비율 (0.15 = 15%% 느려짐)")
+    ap.add_argument("--baseline", default=str(BASELINE))
+    ap.add_argument("--save-baseline", action="store_true", help="이번 결과를 기준선으로 저장")
+    ap.add_argument("--out", default=None, help="결과 JSON 경로 (기본: results/<시각>.json)")
+    args = ap.parse_args()
+
+    tb.set_backend(args.backend)
+    env = environment()
+    print(f"[BENCH] backend={env['backend']} git={env['git']} cpus={env['cpu_count']}")
+    report = {"env": env, "args": {"quick": args.quick, "min_time": args.min_time},
+              "results": run_suite(args)}
+
+    out = Path(args.out) if args.out else RESULTS_DIR / f"{datetime.now(UTC):%Y%m%dT%H%M%SZ}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2))
+    print(f"[OK] results → {out}")
+
+    if args.save_baseline:
+        Path(args.baseline).write_text(json.dumps(report, indent=2))
+        print(f"[OK] baseline → {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print("[NOTE] no baseline yet — rerun with --save-baseline to store one")
+        return
+    regressions = compare(report["results"], json.loads(Path(args.baseline).read_text()),
+                          args.threshold)
+    if regressions:
+        print(f"[FAIL] {len(regressions)} regression(s) beyond +{args.threshold:.0%}")
+        sys.exit(1)
+    print("[OK] no regressions")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# dtg_coupling.py — 3체 혼돈 지표 → DTG θ → QIG LIF 임계값 폐루프 (파일 없이 온라인)
+#
+#   python dtg_coupling.py --ics exp1,exp2,exp3 --alphas 0.5:1.5:16 --tmax 20 --neurons 200
+#
+# 생산자(스레드): (ic, alpha) 쌍 M개를 ensemble_stream으로 한 번에 적분하며 청크마다
+#   에너지 드리프트 E (M,n)와 유한 시간 Lyapunov λ (M,n)를 DTGObserver에 넣어 θ (n,M)를 얻고
+#   링 버퍼에 밀어 넣는다.
+# 소비자(메인): 링 버퍼에서 θ 행을 꺼내 LIFPopulation (뉴런 K × 쌍 M)을
+#   V_th = coupled_threshold(θ) 로 진행한다. 3체 샘플 하나(dt)당 LIF --lif-steps 스텝, θ는 그동안 고정.
+# 버퍼가 가득 차면 생산자가, 비면 소비자가 기다린다 (메모리 O(capacity·M)).
+import argparse, csv, os, sys, threading
+import numpy as np
+
+import three_body_3d as tb
+from instrument import METRICS, add_profile_arg, count, profiled, timer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "QIG", "code"))
+from lif_model import LIFPopulation, coupled_threshold  # noqa: E402
+
+# ---------------- 링 버퍼 ----------------
+class RingBuffer:
+    """고정 용량 (capacity, width) float 링 버퍼. 스레드 하나씩 push/pop (블로킹).
+
+    push(block (n, width))는 자리가 날 때까지 기다리며 나눠 쓰고, pop(n)은 최대 n행을
+    복사해 돌려준다. close() 후 비면 pop은 None.
+    """
+    def __init__(self, capacity, width):
+        self.buf = np.empty((int(capacity), int(width)))
+        self.capacity = int(capacity)
+        self.head = self.size = 0      # head: 다음에 읽을 행
+        self.closed = False
+        self.high_water = 0
+        self.waits = {"push": 0, "pop": 0}
+        self._cv = threading.Condition()
+
+    def push(self, block):
+        block = np.asarray(block, float)
+        i = 0
+        while i < block.shape[0]:
+            with self._cv:
+                while self.size == self.capacity and not self.closed:
+                    self.waits["push"] += 1
+                    self._cv.wait()
+                if self.closed:
+                    raise RuntimeError("push to closed ring buffer")
+                tail = (self.head + self.size) % self.capacity
+                n = min(block.shape[0] - i, self.capacity - self.size, self.capacity - tail)
+                self.buf[tail:tail + n] = block[i:i + n]
+                self.size += n
+                self.high_water = max(self.high_water, self.size)
+                i += n
+                self._cv.notify_all()
+
+    def pop(self, n):
+        with self._cv:
+            while self.size == 0 and not self.closed:
+                self.waits["pop"] += 1
+                self._cv.wait()
+            if self.size == 0:
+                return None
+            n = min(int(n), self.size, self.capacity - self.head)
+            out = self.buf[self.head:self.head + n].copy()
+            self.head = (self.head + n) % self.capacity
+            self.size -= n
+            self._cv.notify_all()
+            return out
+
+    def close(self):
+        with self._cv:
+            self.closed = True
+            self._cv.notify_all()
+
+# ---------------- 생산자 / 소비자 ----------------
+def produce(ring, S0, t_max, dt, masses, observer, chunk, stats, errors):
+    """3체 배치 적분 → θ 청크를 링 버퍼로. stats에 쌍별 최대 드리프트 / 마지막 λ 누적"""
+    try:
+        with timer("coupled.produce"):
+            for t, drift, lyap in tb.ensemble_stream(S0, t_max, dt, 1.0, masses, chunk=chunk):
+                th = observer.series(drift, I=lyap)
+                stats["drift_max"] = np.maximum(stats["drift_max"], np.abs(drift).max(axis=1))
+                stats["lyap"] = lyap[:, -1]
+                ring.push(th.T)
+    except BaseException as e:   # 소비자가 영원히 기다리지 않게 닫고 메인에서 다시 던짐
+        errors.append(e)
+    finally:
+        ring.close()
+
+def consume(ring, M, n_neurons, lif_steps, I_ext, v_th_base, floor, refractory_ms, rows=64):
+    """링 버퍼의 θ로 LIF 집단 진행. 반환: (쌍별 스파이크 수 (M,), 쌍별 평균 V_th (M,), 샘플 수)"""
+    pop = LIFPopulation((n_neurons, M), refractory_ms=refractory_ms)
+    spikes = np.zeros(M, dtype=np.int64)
+    th_sum = np.zeros(M)
+    n = 0
+    with timer("coupled.consume"):
+        while (block := ring.pop(rows)) is not None:
+            v_th = coupled_threshold(block, v_th_base, floor)     # (n, M)
+            for row in v_th:
+                for _ in range(lif_steps):
+                    _, spiked = pop.step(I_ext, row[None, :])
+                    spikes += spiked.sum(axis=0)
+            th_sum += v_th.sum(axis=0)
+            n += block.shape[0]
+    count("lif.steps", n * lif_steps * n_neurons * M)
+    return spikes, th_sum / max(n, 1), n
+
+def run_coupled(ics, alphas, t_max, dt, n_neurons=100, lif_steps=10, I_ext=1.1, v_th_base=1.0,
+                floor=0.05, refractory_ms=2.0, capacity=1024, chunk=128, dtg=None):
+    """(ic × alpha) 전체를 한 번에 폐루프로 실행 → 쌍별 요약 행 리스트
+
+    dtg: DTGObserver 인자 (V_0, alpha, beta, lambda_, b) 덮어쓰기 dict
+    """
+    masses = np.array([1.0, 1.0, 1.0])
+    labels, S0 = tb.make_ic_ensemble(ics, alphas)
+    M = len(labels)
+    observer = tb.DTGObserver(**(dtg or {}))
+    ring = RingBuffer(capacity, M)
+    stats = {"drift_max": np.zeros(M), "lyap": np.zeros(M)}
+    errors = []
+    th = threading.Thread(target=produce, daemon=True,
+                          args=(ring, S0, t_max, dt, masses, observer, chunk, stats, errors))
+    th.start()
+    spikes, th_mean, n = consume(ring, M, n_neurons, lif_steps, I_ext, v_th_base, floor,
+                                 refractory_ms)
+    th.join()
+    if errors:
+        raise errors[0]
+    count("ring.high_water", ring.high_water)
+    count("ring.push_waits", ring.waits["push"])
+    count("ring.pop_waits", ring.waits["pop"])
+    t_lif = n * lif_steps * 1e-3   # LIFPopulation 기본 dt = 1 ms
+    theta = np.broadcast_to(observer.theta, (M,))
+    return [{"ic": ic, "alpha": a, "lyap": float(stats["lyap"][i]),
+             "drift_max": float(stats["drift_max"][i]), "theta_final": float(theta[i]),
+             "v_th_mean": float(th_mean[i]), "spikes": int(spikes[i]),
+             "rate_hz": float(spikes[i] / (n_neurons * t_lif)) if t_lif > 0 else 0.0}
+            for i, (ic, a) in enumerate(labels)]
+
+# ---------------- 메인 ----------------
+def write_rows(path, rows):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=list(rows[0]))
+        w.writeheader()
+        w.writerows(rows)
+    os.replace(tmp, path)
+    return path
+
+def _floats(s):
+    """쉼표구분 목록, 또는 "시작:끝:개수" (linspace, 양 끝 포함)"""
+    if s.count(":") == 2:
+        a, b, n = s.split(":")
+        return [round(float(x), 10) for x in np.linspace(float(a), float(b), int(n))]
+    return [float(x) for x in s.split(",") if x.strip()]
+
+def main():
+    ap = argparse.ArgumentParser(description="3체 드리프트/Lyapunov → DTG θ → LIF 임계값 폐루프")
+    ap.add_argument("--ics", default="exp1,exp2,exp3")
+    ap.add_argument("--alphas", default="0.5,1.0,1.5")
+    ap.add_argument("--tmax", type=float, default=10.0)
+    ap.add_argument("--dt", type=float, default=0.01)
+    ap.add_argument("--neurons", type=int, default=100, help="쌍마다 LIF 뉴런 수")
+    ap.add_argument("--lif-steps", type=int, default=10, help="3체 샘플 하나당 LIF 스텝 수 (1 ms)")
+    ap.add_argument("--current", type=float, default=1.1, help="LIF 상수 입력 I")
+    ap.add_argument("--v-th-base", type=float, default=1.0)
+    ap.add_argument("--theta-floor", type=float, default=0.05, help="V_th = base·max(θ, floor)")
+    ap.add_argument("--refractory-ms", type=float, default=2.0)
+    ap.add_argument("--buffer", type=int, default=1024, help="링 버퍼 용량 (3체 샘플 행)")
+    ap.add_argument("--chunk", type=int, default=128, help="3체 적분 청크 (스텝)")
+    ap.add_argument("--out", default="out")
+    add_profile_arg(ap)
+    args = ap.parse_args()
+
+    tag = f"t{args.tmax:g}_dt{args.dt:g}"
+    data = os.path.join(args.out, "data")
+    with profiled(args.profile, os.path.join(data, f"profile_coupled_{tag}")):
+        rows = run_coupled(args.ics.split(","), _floats(args.alphas), args.tmax, args.dt,
+                           args.neurons, args.lif_steps, args.current, args.v_th_base,
+                           args.theta_floor, args.refractory_ms, args.buffer, args.chunk)
+    path = write_rows(os.path.join(data, f"dtg_coupled_{tag}.csv"), rows)
+    for r in rows:
+        print(f"  {r['ic']:<8} α={r['alpha']:<6g} λ={r['lyap']:+.3f}  |ΔE/E|max={r['drift_max']:.2e}"
+              f"  θ={r['theta_final']:+.4f}  rate={r['rate_hz']:.1f} Hz")
+    print(f"[OK] CSV  : {path}")
+    mpath = METRICS.write(os.path.join(data, f"metrics_coupled_{tag}.json"), args=vars(args))
+    print(f"[OK] METRICS: {mpath}  ({METRICS.summary(4)})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# instrument.py — 계측: 누적 타이머 / 카운터 / 실행별 metrics JSON / --profile
+#
+#   from instrument import METRICS, timer, count
+#   with timer("run.integrate"):
+#       ...
+#   count("rhs_evals", sol.nfev)
+#   METRICS.write("data/runs/<run_id>/metrics.json", run_id=...)
+#
+# 프로세스마다 전역 METRICS 하나. 워커 프로세스는 reset() 후 to_dict()를 돌려주고
+# 부모가 merge()로 합친다.
+import json, os, platform, time
+from contextlib import contextmanager
+from datetime import datetime, UTC
+
+class Metrics:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.timers = {}     # 이름 → [누적 초, 호출 수]
+        self.counters = {}   # 이름 → 누적 값
+        self._t0 = time.perf_counter()
+
+    @contextmanager
+    def timer(self, name):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            rec = self.timers.setdefault(name, [0.0, 0])
+            rec[0] += time.perf_counter() - t0
+            rec[1] += 1
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def to_dict(self):
+        return {"wall_s": time.perf_counter() - self._t0,
+                "timers": {k: {"seconds": v[0], "calls": v[1]} for k, v in sorted(self.timers.items())},
+                "counters": dict(sorted(self.counters.items()))}
+
+    def merge(self, d):
+        """다른 프로세스의 to_dict() 결과를 더함 (wall_s는 제외)"""
+        for k, v in d.get("timers", {}).items():
+            rec = self.timers.setdefault(k, [0.0, 0])
+            rec[0] += v["seconds"]
+            rec[1] += v["calls"]
+        for k, v in d.get("counters", {}).items():
+            self.count(k, v)
+
+    def write(self, path, **extra):
+        """metrics JSON 저장 (임시 파일 → 교체)"""
+        os.makedirs(os.path.dirname(str(path)) or ".", exist_ok=True)
+        out = dict(extra, generated_at_utc=datetime.now(UTC).isoformat(),
+                   host={"python": platform.python_version(), "cpu_count": os.cpu_count()},
+                   **self.to_dict())
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(out, f, indent=2, ensure_ascii=False, default=str)
+        os.replace(tmp, path)
+        return str(path)
+
+    def summary(self, top=8):
+        """가장 오래 걸린 타이머 몇 줄 (콘솔용)"""
+        items = sorted(self.timers.items(), key=lambda kv: -kv[1][0])[:top]
+        return "  ".join(f"{k}={v[0]:.3f}s" for k, v in items)
+
+METRICS = Metrics()
+timer = METRICS.timer
+count = METRICS.count
+
+def count_bytes(path, name="bytes_written"):
+    """파일 크기를 카운터에 더함 (없으면 무시)"""
+    try:
+        count(name, os.path.getsize(path))
+    except OSError:
+        pass
+
+# ---------------- 프로파일러 ----------------
+PROFILERS = ("cprofile", "pyinstrument")
+
+def add_profile_arg(ap):
+    ap.add_argument("--profile", nargs="?", const="cprofile", choices=PROFILERS, default=None,
+                    help="프로파일 덤프 (cprofile 기본, pyinstrument는 설치돼 있을 때)")
+    return ap
+
+@contextmanager
+def profiled(mode, prefix):
+    """mode가 있으면 블록 전체를 프로파일해 <prefix>.prof/.txt (또는 .html) 로 저장"""
+    if mode is None:
+        yield
+        return
+    os.makedirs(os.path.dirname(str(prefix)) or ".", exist_ok=True)
+    if mode == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            print("[WARN] pyinstrument not installed — falling back to cProfile")
+            mode = "cprofile"
+    if mode == "pyinstrument":
+        prof = Profiler()
+        prof.start()
+        try:
+            yield
+        finally:
+            prof.stop()
+            with open(f"{prefix}.html", "w", encoding="utf-8") as f:
+                f.write(prof.output_html())
+            with open(f"{prefix}.txt", "w", encoding="utf-8") as f:
+                f.write(prof.output_text())
+            print(f"[PROFILE] {prefix}.html")
+        return
+    import cProfile, pstats
+    prof = cProfile.Profile()
+    prof.enable()
+    try:
+        yield
+    finally:
+        prof.disable()
+        prof.dump_stats(f"{prefix}.prof")
+        with open(f"{prefix}.txt", "w", encoding="utf-8") as f:
+            pstats.Stats(prof, stream=f).sort_stats("cumulative").print_stats(40)
+        print(f"[PROFILE] {prefix}.prof (+ .txt top 40 by cumulative time)")
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# nbody_jit.py — Numba 컴파일 커널 (가속도 / RHS / 고정 스텝 심플렉틱 루프)
+#
+# numba가 없으면 HAVE_NUMBA=False 이고 three_body_3d는 NumPy 경로를 그대로 쓴다.
+# 백엔드 선택: 환경변수 SIM_BACKEND=auto|numpy|numba 또는 --backend (sim_backend 공용 규칙).
+import numpy as np
+
+from sim_backend import BACKENDS, select_backend  # noqa: F401  (기존 import 경로 유지)
+
+try:
+    import numba
+    HAVE_NUMBA = True
+except ImportError:  # 선택 의존성
+    numba = None
+    HAVE_NUMBA = False
+
+
+def _njit(fn):
+    return numba.njit(cache=True, fastmath=False)(fn) if HAVE_NUMBA else fn
+
+@_njit
+def accelerations_into(pos, G, masses, eps, acc):
+    """pos (3,N) → acc (3,N) 제자리 계산, 쌍 대칭 이용"""
+    N = pos.shape[1]
+    for i in range(N):
+        acc[0, i] = 0.0; acc[1, i] = 0.0; acc[2, i] = 0.0
+    for i in range(N):
+        for j in range(i + 1, N):
+            dx = pos[0, j] - pos[0, i]
+            dy = pos[1, j] - pos[1, i]
+            dz = pos[2, j] - pos[2, i]
+            r2 = dx*dx + dy*dy + dz*dz + eps
+            inv3 = 1.0 / (r2 * np.sqrt(r2))
+            wi = G * masses[j] * inv3
+            wj = G * masses[i] * inv3
+            acc[0, i] += wi * dx; acc[1, i] += wi * dy; acc[2, i] += wi * dz
+            acc[0, j] -= wj * dx; acc[1, j] -= wj * dy; acc[2, j] -= wj * dz
+    return acc
+
+@_njit
+def rhs_flat(s, G, masses, eps):
+    """상태 벡터(body-major) → 도함수 벡터"""
+    N = masses.shape[0]
+    pos = np.empty((3, N))
+    for i in range(N):
+        for k in range(3):
+            pos[k, i] = s[3*i + k]
+    acc = np.empty((3, N))
+    accelerations_into(pos, G, masses, eps, acc)
+    out = np.empty(6 * N)
+    for i in range(N):
+        for k in range(3):
+            out[3*i + k] = s[3*N + 3*i + k]
+            out[3*N + 3*i + k] = acc[k, i]
+    return out
+
+@_njit
+def symplectic_loop(pos, vel, G, masses, eps, dt, kicks, drifts, n_steps, save_every, Y):
+    """kick/drift 분할 루프 전체 — integrate_symplectic의 컴파일 버전
+
+    한 스텝 = K(kicks[0]) D(drifts[0]) K(kicks[1]) … D(drifts[-1]) K(kicks[-1]) (계수 × dt)
+    """
+    N = masses.shape[0]
+    acc = np.empty((3, N))
+    accelerations_into(pos, G, masses, eps, acc)
+    nfev = 1
+    stale = False
+    j = 1
+    n_sub = drifts.shape[0]
+    for n in range(1, n_steps + 1):
+        for s in range(n_sub + 1):
+            h = kicks[s] * dt
+            if h != 0.0:
+                if stale:
+                    accelerations_into(pos, G, masses, eps, acc)
+                    nfev += 1
+                    stale = False
+                for k in range(3):
+                    for i in range(N):
+                        vel[k, i] += h * acc[k, i]
+            if s < n_sub:
+                c = drifts[s] * dt
+                for k in range(3):
+                    for i in range(N):
+                        pos[k, i] += c * vel[k, i]
+                stale = True
+        if n % save_every == 0:
+            for i in range(N):
+                for k in range(3):
+                    Y[3*i + k, j] = pos[k, i]
+                    Y[3*N + 3*i + k, j] = vel[k, i]
+            j += 1
+    return nfev
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# render_queue.py — 그림 렌더링 분리: 시뮬레이션은 작은 데이터 아티팩트만, 렌더는 나중에/병렬로
+#
+#   시뮬레이션 쪽:  submit("three_body_3d:render_drift", "figures/drift.png", mode, t=t, drift=d)
+#   렌더 쪽:        python render_queue.py figures QIG/figures --jobs 8
+#
+# 아티팩트 = <png>.fig.npz (배열 + 렌더러 "모듈:함수" + 스칼라 인자 JSON + 입력 해시)
+# 렌더 후 <png>.sha256 에 입력 해시를 남기고, 해시가 같고 PNG가 있으면 다시 그리지 않는다.
+#
+# mode: inline(즉시 렌더, 기본) | defer(아티팩트만 저장) | off(그림 생략)
+import argparse, hashlib, importlib, json, os, sys
+import numpy as np
+
+PLOT_MODES = ("inline", "defer", "off")
+ARTIFACT_SUFFIX = ".fig.npz"
+LOD_POINTS = 2000   # 그림에 넘기는 시계열당 최대 점 수 (원본 데이터는 그대로 저장)
+
+def add_plot_args(ap):
+    """--no-plot / --defer-plots 공통 CLI 옵션"""
+    g = ap.add_mutually_exclusive_group()
+    g.add_argument("--no-plot", action="store_true", help="그림 생략")
+    g.add_argument("--defer-plots", action="store_true",
+                   help="그림 대신 데이터 아티팩트(.fig.npz)만 저장 → render_queue.py로 나중에 렌더")
+    return ap
+
+def plot_mode(args):
+    return "off" if args.no_plot else "defer" if args.defer_plots else "inline"
+
+def lod_indices(Y, points=LOD_POINTS):
+    """min/max 보존 다운샘플 인덱스: 시계열 묶음 Y (m, T) → 공통 인덱스 (정렬, 시작/끝 포함)
+
+    양 끝 두 점 자리를 남기고 T를 (points−2)/2개 버킷으로 나눠 각 시계열의 버킷별 argmin / argmax를 모두
+    남긴다 (마지막 버킷은 끝 값으로 채워 길이를 맞춤). → 시계열당 최대 max(points, 4)개,
+    피크·리셋·급변이 사라지지 않는다 (t_max/dt와 무관하게 렌더 비용 고정).
+    """
+    Y = np.atleast_2d(np.asarray(Y))
+    T = Y.shape[-1]
+    if points is None or points <= 0 or T <= points:
+        return np.arange(T)
+    nb = max(1, (points - 2) // 2)
+    bs = -(-T // nb)
+    if nb * bs > T:
+        Y = np.concatenate([Y, np.repeat(Y[:, -1:], nb * bs - T, axis=1)], axis=1)
+    body = Y.reshape(Y.shape[0], nb, bs)
+    base = np.arange(nb) * bs
+    idx = np.concatenate([(body.argmin(-1) + base).ravel(), (body.argmax(-1) + base).ravel()])
+    return np.unique(np.concatenate([np.minimum(idx, T - 1), [0, T - 1]]))
+
+def artifact_path(png_path):
+    return str(png_path) + ARTIFACT_SUFFIX
+
+def _digest(renderer, meta, arrays):
+    h = hashlib.sha256()
+    h.update(renderer.encode("utf-8"))
+    h.update(json.dumps(meta, sort_keys=True, default=str).encode("utf-8"))
+    for k in sorted(arrays):
+        a = np.ascontiguousarray(arrays[k])
+        h.update(f"{k}:{a.dtype.str}:{a.shape}".encode("utf-8"))
+        h.update(a.tobytes())
+    return h.hexdigest()
+
+def _up_to_date(png_path, digest):
+    side = str(png_path) + ".sha256"
+    if not (os.path.exists(png_path) and os.path.exists(side)):
+        return False
+    with open(side) as f:
+        return f.read().strip() == digest
+
+def _replace_write(path, write, mode="wb"):
+    """write(f)로 임시 파일에 쓴 뒤 원자적으로 교체"""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, mode) as f:
+        write(f)
+    os.replace(tmp, path)
+
+def _module(name):
+    """이미 로드된 모듈 (스크립트로 실행 중이면 __main__) 또는 새로 import"""
+    if name in sys.modules:
+        return sys.modules[name]
+    main = sys.modules.get("__main__")
+    f = getattr(main, "__file__", None)
+    if f and os.path.splitext(os.path.basename(f))[0] == name:
+        return main
+    return importlib.import_module(name)
+
+def submit(renderer, png_path, mode="inline", meta=None, **arrays):
+    """그림 하나 요청. renderer = "모듈:함수" (함수 시그니처: fn(out_path, **arrays, **meta))
+
+    반환: 렌더했으면 png 경로, 미뤘으면 아티팩트 경로, 생략/최신이면 None
+    """
+    if mode not in PLOT_MODES:
+        raise ValueError(f"plot mode must be one of {PLOT_MODES}, got {mode!r}")
+    if mode == "off":
+        return None
+    png_path = str(png_path)
+    meta = dict(meta or {})
+    arrays = {k: np.asarray(v) for k, v in arrays.items()}
+    digest = _digest(renderer, meta, arrays)
+    if _up_to_date(png_path, digest):
+        return None
+    os.makedirs(os.path.dirname(png_path) or ".", exist_ok=True)
+    if mode == "inline":
+        _call(renderer, png_path, arrays, meta, digest)
+        return png_path
+    mod = _module(renderer.split(":")[0])
+    header = {"renderer": renderer, "meta": meta, "digest": digest,
+              "src_dir": os.path.dirname(os.path.abspath(mod.__file__))}
+    art = artifact_path(png_path)
+    _replace_write(art, lambda f: np.savez(f, __header__=json.dumps(header, default=str), **arrays))
+    return art
+
+def _call(renderer, png_path, arrays, meta, digest, src_dir=""):
+    if src_dir and src_dir not in sys.path:
+        sys.path.insert(0, src_dir)
+    mod_name, fn_name = renderer.split(":")
+    getattr(_module(mod_name), fn_name)(png_path, **arrays, **meta)
+    _replace_write(str(png_path) + ".sha256", lambda f: f.write(digest + "\n"), "w")
+
+def render_artifact(path, force=False):
+    """아티팩트 하나 렌더 (입력 해시가 같고 PNG가 있으면 건너뜀). 반환: 렌더 여부"""
+    png_path = path[: -len(ARTIFACT_SUFFIX)]
+    with np.load(path) as z:
+        header = json.loads(str(z["__header__"]))
+        if not force and _up_to_date(png_path, header["digest"]):
+            return False
+        arrays = {k: z[k] for k in z.files if k != "__header__"}
+    _call(header["renderer"], png_path, arrays, header["meta"], header["digest"],
+          header.get("src_dir", ""))
+    return True
+
+def find_artifacts(roots):
+    out = []
+    for root in roots:
+        if os.path.isfile(root):
+            out.append(root)
+            continue
+        for d, _, files in os.walk(root):
+            out += [os.path.join(d, f) for f in files if f.endswith(ARTIFACT_SUFFIX)]
+    return sorted(out)
+
+def render_all(roots, jobs=1, force=False):
+    """roots 아래 모든 아티팩트를 렌더 (jobs>1이면 프로세스 풀). 반환: (렌더 수, 건너뛴 수)"""
+    arts = find_artifacts(roots)
+    if jobs > 1 and len(arts) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=jobs) as ex:
+            done = list(ex.map(render_artifact, arts, [force] * len(arts)))
+    else:
+        done = [render_artifact(a, force) for a in arts]
+    n = sum(done)
+    return n, len(arts) - n
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="미뤄 둔 그림(.fig.npz) 렌더")
+    ap.add_argument("roots", nargs="*", default=["figures"], help="아티팩트를 찾을 폴더/파일")
+    ap.add_argument("--jobs", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--force", action="store_true", help="입력 해시가 같아도 다시 렌더")
+    args = ap.parse_args(argv)
+    n, skipped = render_all(args.roots, args.jobs, args.force)
+    print(f"[OK] rendered {n} figure(s), {skipped} up to date")
+
+if __name__ == "__main__":
+    main()
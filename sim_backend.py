@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+# sim_backend.py — 가속 커널 백엔드 선택 (three_body_3d / nbody_jit / QIG lif_jit 공용)
+#
+# 환경변수 SIM_BACKEND=auto|numpy|numba 또는 --backend.
+# auto → numba(설치 시) 아니면 numpy. numba 요청인데 없으면 경고 후 numpy.
+# numba 자체는 여기서 import하지 않는다 (CLI 시작 시간) — 설치 여부만 확인.
+import importlib.util, os
+
+BACKENDS = ("auto", "numpy", "numba")
+HAVE_NUMBA = importlib.util.find_spec("numba") is not None
+
+def select_backend(name=None):
+    """요청(없으면 SIM_BACKEND, 그것도 없으면 auto) → 실제로 쓸 백엔드 "numpy" | "numba" """
+    name = name or os.environ.get("SIM_BACKEND", "auto")
+    if name not in BACKENDS:
+        raise ValueError(f"backend must be one of {BACKENDS}, got {name!r}")
+    if name == "auto":
+        return "numba" if HAVE_NUMBA else "numpy"
+    if name == "numba" and not HAVE_NUMBA:
+        print("[WARN] numba not installed — falling back to numpy backend")
+        return "numpy"
+    return name
+
+def add_backend_arg(ap, help="가속 커널 백엔드 (기본: SIM_BACKEND 환경변수, 없으면 auto)"):
+    ap.add_argument("--backend", choices=BACKENDS, default=None, help=help)
+    return ap
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# sim_cache.py — 파라미터 + 커널 버전으로 주소 지정되는 시뮬레이션 디스크 캐시 (LRU 용량 제한)
+#
+#   key = sha256(namespace, 정규화된 파라미터 JSON, 커널 버전)
+#   <root>/<key[:2]>/<key>.npz  — 배열(궤적/지표) + meta JSON
+#
+# 수치 결과가 바뀌는 커널 수정 시에는 호출 쪽 KERNEL_VERSION을 올려 이전 항목을 무효화한다.
+# 조회 시 mtime을 갱신하고, 저장 후 전체 크기가 한도를 넘으면 가장 오래 안 쓴 항목부터 지운다.
+#
+# 환경변수: SIM_CACHE_DIR (기본: 저장소 루트/.sim_cache), SIM_CACHE_MAX_MB (기본 2048)
+import hashlib, json, os
+import numpy as np
+
+DEFAULT_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".sim_cache")
+DEFAULT_MAX_MB = 2048
+
+def cache_key(namespace, params, version):
+    """정규화된 파라미터 해시 (float/int/str/list/dict만, 키 순서 무관)"""
+    canon = json.dumps({"ns": namespace, "v": str(version), "p": params},
+                       sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canon.encode("utf-8")).hexdigest()
+
+class SimCache:
+    """enabled=False면 항상 miss + 저장 안 함, refresh=True면 조회는 miss 처리하고 새 결과로 덮어씀"""
+    def __init__(self, root=None, max_mb=None, enabled=True, refresh=False):
+        self.root = root or os.environ.get("SIM_CACHE_DIR", DEFAULT_ROOT)
+        self.max_bytes = int(float(max_mb or os.environ.get("SIM_CACHE_MAX_MB", DEFAULT_MAX_MB))
+                             * 2**20)
+        self.enabled = enabled
+        self.refresh = refresh
+        self.hits = self.misses = 0
+
+    def _path(self, key):
+        return os.path.join(self.root, key[:2], key + ".npz")
+
+    def get(self, key):
+        """배열 dict (+ "meta") 또는 None"""
+        if not self.enabled or self.refresh:
+            self.misses += 1
+            return None
+        path = self._path(key)
+        try:
+            with np.load(path) as z:
+                out = {k: z[k] for k in z.files if k != "__meta__"}
+                out["meta"] = json.loads(str(z["__meta__"])) if "__meta__" in z.files else {}
+        except (OSError, ValueError, KeyError):   # 없음 / 깨진 항목
+            self.misses += 1
+            return None
+        os.utime(path)   # LRU 접근 시각
+        self.hits += 1
+        return out
+
+    def put(self, key, meta=None, **arrays):
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, __meta__=json.dumps(meta or {}, default=str), **arrays)
+        os.replace(tmp, path)
+        self.evict()
+        return path
+
+    def evict(self):
+        """총 크기가 한도 이하가 될 때까지 mtime이 오래된 항목부터 삭제. 반환: 삭제 수"""
+        entries = []
+        for d, _, files in os.walk(self.root):
+            for f in files:
+                if f.endswith(".npz"):
+                    p = os.path.join(d, f)
+                    try:
+                        st = os.stat(p)
+                    except OSError:
+                        continue
+                    entries.append((st.st_mtime, st.st_size, p))
+        total = sum(e[1] for e in entries)
+        removed = 0
+        for _, size, p in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(p)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        return removed
+
+def add_cache_args(ap):
+    """--no-cache / --refresh 공통 CLI 옵션"""
+    g = ap.add_mutually_exclusive_group()
+    g.add_argument("--no-cache", action="store_true", help="결과 캐시를 읽지도 쓰지도 않음")
+    g.add_argument("--refresh", action="store_true", help="캐시를 무시하고 다시 계산해 덮어씀")
+    return ap
+
+def cache_from_args(args):
+    return SimCache(enabled=not args.no_cache, refresh=args.refresh)
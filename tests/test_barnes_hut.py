@@ -0,0 +1,33 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import three_body_3d as tb  # noqa: E402
+from barnes_hut import bh_accelerations  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def cluster():
+    s0, m = tb.make_cluster(1000, seed=1)
+    pos, _ = tb.unpack_state(s0, N=m.size)
+    return pos, m, tb.accelerations(pos, 1.0, m, 1e-4)
+
+
+def rel_err(pos, m, ref, theta):
+    b = bh_accelerations(pos, 1.0, m, theta=theta, eps=1e-4)
+    return np.linalg.norm(b - ref, axis=0) / np.linalg.norm(ref, axis=0)
+
+
+def test_bh_theta_zero_is_direct_sum(cluster):
+    assert rel_err(*cluster, 0.0).max() < 1e-12
+
+
+@pytest.mark.parametrize("theta", [0.3, 0.5, 0.7, 1.0])
+def test_bh_error_scales_with_theta(cluster, theta):
+    # 단극 근사: 상대 오차 ~ θ² (사중극 무시)
+    err = rel_err(*cluster, theta)
+    assert np.median(err) < 0.03 * theta ** 2
+    assert err.max() < 0.4 * theta ** 2
@@ -0,0 +1,50 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import three_body_3d as tb  # noqa: E402
+
+PARAMS = dict(V_0=0.8, alpha=0.7, beta=0.5, lambda_=0.1, b=0.3, I=0.2)
+
+
+def reference(E, I=0.2):
+    """dtg_update를 샘플마다 부른 θ 궤적 (..., K)"""
+    p = PARAMS
+    theta = np.full(E.shape[:-1], p["V_0"])
+    out = np.empty_like(E)
+    for k in range(E.shape[-1]):
+        theta = tb.dtg_update(p["V_0"], p["alpha"], p["beta"], p["lambda_"], p["b"],
+                              E[..., k], I, theta)
+        out[..., k] = theta
+    return out
+
+
+def feed(obs, E, chunk=7):
+    for i in range(0, E.shape[-1], chunk):
+        obs.update(E[..., i:i + chunk])
+
+
+@pytest.mark.parametrize("shape", [(50,), (3, 50)])
+@pytest.mark.parametrize("mode", ["fast", "record", "bounds"])
+def test_observer_matches_dtg_update_loop(shape, mode):
+    E = np.random.default_rng(0).normal(0.0, 1.0, shape)
+    ref = reference(E)
+    obs = tb.DTGObserver(**PARAMS, record=(mode == "record"),
+                         bounds=(-10.0, 10.0) if mode == "bounds" else None)
+    feed(obs, E)
+    np.testing.assert_allclose(np.broadcast_to(obs.theta, shape[:-1]), ref[..., -1])
+    assert obs.n == shape[-1]
+    if mode == "record":
+        np.testing.assert_allclose(obs.trace(), ref)
+
+
+def test_bounds_crossing_index():
+    E = np.random.default_rng(1).normal(0.0, 1.0, 50)
+    ref = reference(E)
+    lo = float(np.sort(ref)[5])
+    obs = tb.DTGObserver(**PARAMS, bounds=(lo, 10.0))
+    feed(obs, E)
+    assert obs.t_cross == int(np.argmax(ref < lo))
@@ -0,0 +1,26 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import three_body_3d as tb  # noqa: E402
+
+MASSES = np.ones(3)
+
+
+def test_ensemble_matches_integrate_on_figure8():
+    labels, S0 = tb.make_ic_ensemble(["figure8"], [0.9, 1.0, 1.1])
+    t, Y, info = tb.integrate_ensemble(S0, 2.0, 0.01, 1.0, MASSES, save_every=50)
+    assert list(info["status"]) == ["ok"] * len(labels)
+    np.testing.assert_allclose(t, np.arange(0.0, 2.0 + 1e-12, 0.5))
+    for i in range(len(labels)):
+        sol = tb.integrate(S0[i], 2.0, 0.01, 1.0, MASSES)
+        np.testing.assert_allclose(Y[:, i].T, sol.y[:, ::50], atol=1e-6)
+
+
+def test_ensemble_stops_system_at_step_budget():
+    _, S0 = tb.make_ic_ensemble(["figure8", "exp2"], [0.5])
+    _, Y, info = tb.integrate_ensemble(S0, 2.0, 0.01, 1.0, MASSES, max_steps=300)
+    assert list(info["status"]) == ["ok", "max_steps"]
+    assert np.isfinite(Y[-1, 0]).all() and np.isnan(Y[-1, 1]).all()
@@ -0,0 +1,28 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import three_body_3d as tb  # noqa: E402
+
+MASSES = np.ones(3)
+
+
+def final_error(scheme, dt, ref):
+    sol = tb.integrate_symplectic(tb.make_ic("figure8"), 1.0, dt, 1.0, MASSES, scheme)
+    return np.max(np.abs(sol.y[:, -1] - ref))
+
+
+@pytest.mark.parametrize("scheme,order", [("verlet", 2), ("yoshida4", 4), ("pefrl", 4)])
+def test_fixed_step_order(scheme, order):
+    ref = tb.integrate(tb.make_ic("figure8"), 1.0, 0.01, 1.0, MASSES, rtol=1e-13, atol=1e-14).y[:, -1]
+    ratio = final_error(scheme, 0.02, ref) / final_error(scheme, 0.01, ref)
+    assert 0.7 * 2 ** order < ratio < 1.4 * 2 ** order
+
+
+def test_pefrl_is_not_yoshida4():
+    assert "forest_ruth" not in tb.INTEGRATORS
+    ref = tb.integrate(tb.make_ic("figure8"), 1.0, 0.01, 1.0, MASSES, rtol=1e-13, atol=1e-14).y[:, -1]
+    assert final_error("pefrl", 0.02, ref) < 0.2 * final_error("yoshida4", 0.02, ref)
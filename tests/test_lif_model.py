@@ -0,0 +1,58 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "QIG" / "code"))
+import lif_model as lm  # noqa: E402
+
+
+def test_population_matches_neuron_loop():
+    alphas = np.array([0.5, 1.0, 3.0])
+    currents = np.array([0.9, 1.1, 1.5])[:, None]    # 뉴런마다 다른 입력 → (K, A)
+    t = np.arange(0.0, 0.5, 1e-3)
+    out = lm.simulate_population(alphas, t, currents, n_neurons=3, refractory_ms=2.0)
+    assert out["spikes"].sum() > 0
+    for k, I in enumerate(currents[:, 0]):
+        for a, alpha in enumerate(alphas):
+            neuron = lm.LIFNeuron(refractory_ms=2.0)
+            th = lm.dynamic_threshold(t, alpha=alpha)
+            v, mask = zip(*(neuron.step(I, th[i]) for i in range(t.size)))
+            np.testing.assert_array_equal(out["mask"][:, k, a], mask)
+            np.testing.assert_array_equal(out["v"][:, k, a], v)
+            assert out["spikes"][k, a] == sum(mask)
+
+
+def euler_spike_times(alpha, t_end, I, dt, refractory_ms):
+    t = np.arange(0.0, t_end, dt)
+    _, mask = lm.simulate_lif(lm.dynamic_threshold(t, alpha=alpha), I, dt=dt,
+                              refractory_ms=refractory_ms, backend="numpy")
+    return t[mask]
+
+
+def test_exact_spike_times_converge_with_euler():
+    exact = lm.exact_spike_times(1.0, 0.3, 1.1, refractory_ms=2.0)
+    assert exact.size > 5
+    errs = []
+    for dt in (1e-4, 1e-5, 1e-6):
+        euler = euler_spike_times(1.0, 0.3, 1.1, dt, 2.0)
+        assert euler.size == exact.size
+        errs.append(np.max(np.abs(euler - exact)))
+    # Euler는 1차: dt를 10배 줄이면 오차도 ~10배
+    assert errs[1] < 0.5 * errs[0] and errs[2] < 0.2 * errs[1]
+    assert errs[2] < 5e-6
+
+
+def test_exact_spike_times_hit_threshold():
+    tau, I, alpha, t_ref = 20e-3, 1.1, 2.0, 2e-3
+    s = lm.exact_spike_times(alpha, 0.5, I, tau=tau, refractory_ms=2.0, tol=1e-13)
+    free = np.concatenate([[0.0], s[:-1] + t_ref])     # 각 스파이크 직전 리셋이 풀린 시각
+    v = I + (0.0 - I) * np.exp(-(s - free) / tau)       # 닫힌 꼴 V(t_spike⁻)
+    np.testing.assert_allclose(v, lm.dynamic_threshold(s, alpha=alpha), atol=1e-10)
+    # 스파이크 사이에는 임계값 아래: 교차를 건너뛰지 않았다
+    for a, b in zip(free, s):
+        tt = np.linspace(a, b, 200)[:-1]
+        vv = I - I * np.exp(-(tt - a) / tau)
+        assert np.all(vv < lm.dynamic_threshold(tt, alpha=alpha))
+    np.testing.assert_allclose(lm.exact_trace(s, s - 1e-12, I, tau=tau, refractory_ms=2.0),
+                               lm.dynamic_threshold(s, alpha=alpha), atol=1e-9)
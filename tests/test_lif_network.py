@@ -0,0 +1,21 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "QIG" / "code"))
+import lif_network as ln  # noqa: E402
+
+
+def test_sparse_matches_dense_when_spiking():
+    I_ext, W = ln.make_demo_network()
+    dense = ln.simulate(alpha=0.7, W=W, I_ext=I_ext)
+    assert dense.sum() > 0
+    times, ids = ln.simulate_sparse(ln.CSRSynapses.from_dense(W), I_ext, alpha=0.7)
+    np.testing.assert_array_equal(ln.events_to_dense(times, ids, W.shape[0]), dense)
+
+
+def test_sparse_default_alpha_spikes(capsys):
+    times, _ = ln.run_sparse(2000, 5e-3, alpha=0.7)
+    assert times.size > 0
+    assert "WARN" not in capsys.readouterr().out
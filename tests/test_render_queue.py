@@ -0,0 +1,36 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from render_queue import lod_indices  # noqa: E402
+
+
+@pytest.mark.parametrize("T,points", [(10_001, 100), (100_000, 2000), (1001, 7), (5000, 4999)])
+def test_lod_keeps_extrema_within_budget(T, points):
+    rng = np.random.default_rng(0)
+    y = np.cumsum(rng.standard_normal(T))
+    y[T // 3] += 1e3        # 고립된 피크 / 리셋
+    y[2 * T // 3] -= 1e3
+    idx = lod_indices(y, points)
+    assert idx.size <= points
+    assert np.all(np.diff(idx) > 0) and idx[0] == 0 and idx[-1] == T - 1
+    assert {T // 3, 2 * T // 3, int(np.argmax(y)), int(np.argmin(y))} <= set(idx.tolist())
+    # 버킷 안 극값이 모두 남으므로 다운샘플의 범위 = 원본의 범위
+    assert y[idx].max() == y.max() and y[idx].min() == y.min()
+
+
+def test_lod_multiple_series_budget():
+    rng = np.random.default_rng(1)
+    Y = rng.standard_normal((3, 20_000))
+    idx = lod_indices(Y, 500)
+    assert idx.size <= 3 * 500
+    for y in Y:
+        assert int(np.argmax(y)) in idx and int(np.argmin(y)) in idx
+
+
+def test_lod_short_series_untouched():
+    np.testing.assert_array_equal(lod_indices(np.arange(50.0), 100), np.arange(50))
+    np.testing.assert_array_equal(lod_indices(np.arange(50.0), 0), np.arange(50))
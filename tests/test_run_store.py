@@ -0,0 +1,63 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "QIG" / "code"))
+import utils  # noqa: E402
+
+
+@pytest.fixture
+def store(tmp_path):
+    d = tmp_path / "data"
+    d.mkdir()
+    (d / "spikes.csv").write_text("run_id,timestamp,alpha,spikes\n"
+                                  "old-b,2024-01-01T00:00:00,1.0,3\n"
+                                  "old-b,2024-01-01T00:00:00,0.5,7\n"
+                                  "old-a,2024-01-02T00:00:00,0.5,2\n")
+    (d / "energy.csv").write_text("run_id,timestamp,alpha,energy_proxy\n"
+                                  "old-b,2024-01-01T00:00:00,0.5,0.25\n"
+                                  "old-b,2024-01-01T00:00:00,1.0,0.5\n"
+                                  "old-a,2024-01-02T00:00:00,0.5,0.125\n")
+    return d / "run_store.sqlite"
+
+
+def test_migrates_csv_and_orders_runs(store):
+    # CSV 등장 순서가 실행 순서: old-a가 마지막 (run_id 사전순과 반대)
+    assert utils.latest_run_id(store) == "old-a"
+    assert utils.run_rows("old-b", store) == [
+        ("old-b", "2024-01-01T00:00:00", 0.5, 7, 0.25),
+        ("old-b", "2024-01-01T00:00:00", 1.0, 3, 0.5)]
+
+    utils.store_results("new-2", [(1.0, 4, 0.75), (0.5, 9, 1.5)], store, timestamp="t2")
+    utils.store_results("new-1", [(0.5, 1, 0.0)], store, timestamp="t3")
+    assert utils.latest_run_id(store) == "new-1"
+    assert utils.run_rows("new-2", store) == [("new-2", "t2", 0.5, 9, 1.5),
+                                             ("new-2", "t2", 1.0, 4, 0.75)]
+    assert utils.run_rows("old-a", store) == [("old-a", "2024-01-02T00:00:00", 0.5, 2, 0.125)]
+
+    # 재이관은 병합이라 행/순서가 바뀌지 않는다
+    con = utils.open_run_store(store)
+    try:
+        utils.migrate_csv(con, store.parent / "spikes.csv", store.parent / "energy.csv")
+        assert con.execute("SELECT COUNT(*) FROM results").fetchone()[0] == 6
+    finally:
+        con.close()
+    assert utils.latest_run_id(store) == "new-1"
+
+
+def test_empty_store(tmp_path):
+    assert utils.latest_run_id(tmp_path / "none" / "run_store.sqlite") is None
+
+
+def test_atomic_open_keeps_original_on_error(tmp_path):
+    path = tmp_path / "out.txt"
+    utils.write_text_atomic(path, "first")
+    with pytest.raises(RuntimeError):
+        with utils.atomic_open(path) as f:
+            f.write("partial")
+            raise RuntimeError("boom")
+    assert path.read_text() == "first"
+    assert [p.name for p in tmp_path.iterdir()] == ["out.txt"]
+    utils.write_text_atomic(path, "second")
+    assert path.read_text() == "second"
@@ -0,0 +1,46 @@
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from sim_cache import SimCache, cache_key  # noqa: E402
+
+PARAMS = {"ic": "exp1", "alpha": 1.0, "t_max": 10.0, "dt": 0.01}
+
+
+def test_hit_returns_stored_arrays(tmp_path):
+    cache = SimCache(root=str(tmp_path))
+    key = cache_key("run", PARAMS, "1")
+    traj = np.random.default_rng(0).standard_normal((5, 19))
+    cache.put(key, meta={"ic": "exp1"}, traj=traj, t=np.arange(5.0))
+    hit = cache.get(key)
+    np.testing.assert_array_equal(hit["traj"], traj)
+    np.testing.assert_array_equal(hit["t"], np.arange(5.0))
+    assert hit["meta"] == {"ic": "exp1"}
+    assert (cache.hits, cache.misses) == (1, 0)
+
+
+def test_key_is_content_addressed(tmp_path):
+    cache = SimCache(root=str(tmp_path))
+    cache.put(cache_key("run", PARAMS, "1"), x=np.zeros(3))
+    assert cache_key("run", dict(reversed(list(PARAMS.items()))), "1") == cache_key("run", PARAMS, "1")
+    assert cache.get(cache_key("run", dict(PARAMS, alpha=1.5), "1")) is None
+    assert cache.get(cache_key("run", PARAMS, "2")) is None
+    assert cache.get(cache_key("lyap", PARAMS, "1")) is None
+    assert SimCache(root=str(tmp_path), refresh=True).get(cache_key("run", PARAMS, "1")) is None
+    assert cache.get(cache_key("run", PARAMS, "1")) is not None
+
+
+def test_size_cap_evicts_least_recently_used(tmp_path):
+    big = np.zeros(40_000)          # ~320 KB / 항목
+    cache = SimCache(root=str(tmp_path), max_mb=1.0)
+    keys = [cache_key("run", dict(PARAMS, alpha=a), "1") for a in (1.0, 2.0, 3.0)]
+    for i, k in enumerate(keys):
+        path = cache.put(k, x=big)
+        os.utime(path, (1000.0 + i, 1000.0 + i))   # 저장 순서대로 mtime 고정
+    assert cache.get(keys[0]) is not None          # 조회 → 가장 최근 사용으로 갱신
+    cache.put(cache_key("run", dict(PARAMS, alpha=4.0), "1"), x=big)
+    assert cache.get(keys[1]) is None              # 가장 오래 안 쓴 항목만 삭제
+    assert cache.get(keys[0]) is not None and cache.get(keys[2]) is not None
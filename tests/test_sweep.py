@@ -0,0 +1,26 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import three_body_sweep as sw  # noqa: E402
+
+
+def test_point_key_includes_kernel_version():
+    p = {"kind": "drift", "ic": "exp2", "alpha": 1.0, "tmax": 20.0, "dt": 0.01,
+         "integrator": "dop853"}
+    assert sw.point_key(p) == sw.point_key(dict(reversed(list(p.items()))))
+    assert sw.point_key(p, kernel="old") != sw.point_key(p)
+
+
+def test_select_filters_store():
+    tasks = sw.build_tasks(["exp1", "exp2"], [0.5, 1.0], [0.01, 0.005], [1e-8], [1.0], 20.0,
+                           kinds=("drift", "lyap", "outcome"))
+    store = {sw.point_key(p): {"params": p} for p in tasks}
+    only = sw.select(store, ics=["exp2"], alphas=[0.5])
+    assert only and all(r["params"]["ic"] == "exp2" and r["params"]["alpha"] == 0.5
+                        for r in only.values())
+    # dt 필터는 dt가 있는 작업만 거른다 (lyap은 남음)
+    kinds = sorted(r["params"]["kind"] for r in sw.select(store, dts=[0.005]).values())
+    assert kinds.count("lyap") == 4 and kinds.count("drift") == 4
+    assert len(sw.select(store, kinds=["outcome"], tmax=10.0)) == 0
+    assert len(sw.select(store)) == len(store)
@@ -1,20 +1,43 @@
 #!/usr/bin/env python3
 # three_body_3d_opt.py — optimized, vectorized, DTG-integrated
+# pandas / scipy.integrate / matplotlib은 쓰는 경로에서만 import (CLI 시작·--no-plot·요약 스크립트 가볍게)
 import argparse, os
 import numpy as np
-import pandas as pd
-from scipy.integrate import solve_ivp
 
-import matplotlib
-matplotlib.use("Agg")
-import matplotlib.pyplot as plt
+from render_queue import LOD_POINTS, add_plot_args, lod_indices, plot_mode, submit
+from sim_cache import add_cache_args, cache_from_args, cache_key
+from sim_backend import BACKENDS, add_backend_arg, select_backend
+from instrument import METRICS, add_profile_arg, count, count_bytes, profiled, timer
 
 EPS = 1e-12
+DIRECT_BLOCK = 512  # N이 이보다 크면 직접합을 행 블록으로 나눠 메모리 O(N·block) 유지
+MAX_PLOT_BODIES = 10
+KERNEL_VERSION = "3"  # 적분/힘/진단 수치가 바뀌면 올림 → 결과 캐시(sim_cache) 무효화
+
+# ---------------- 백엔드 ----------------
+_BACKEND = None
+_jit = None
+
+def set_backend(name=None):
+    """가속 커널 백엔드 설정: auto|numpy|numba (기본: 환경변수 SIM_BACKEND)"""
+    global _BACKEND, _jit
+    _BACKEND = select_backend(name)
+    if _BACKEND == "numba":
+        import nbody_jit
+        _jit = nbody_jit
+    else:
+        _jit = None
+    return _BACKEND
+
+def get_backend():
+    return _BACKEND or set_backend()
 
 # ---------------- 상태 관리 ----------------
-def unpack_state(s, N=3):
-    """1D 상태 벡터 → (pos, vel) 분리"""
+def unpack_state(s, N=None):
+    """1D 상태 벡터 → (pos, vel) 분리 (N 미지정 시 길이로 추론)"""
     s = np.asarray(s, float).reshape(-1)
+    if N is None:
+        N = s.size // 6
     if s.size != 6 * N:
         raise ValueError(f"state length must be 6N (= {6*N}), got {s.size}")
     pos = s[:3*N].reshape(3, N, order="F")
@@ -32,8 +55,16 @@ def pack_state(pos, vel):
                            vel.reshape(3*N, order="F")])
 
 # ---------------- 물리 코어 ----------------
-def accelerations(pos, G, masses, eps=EPS):
-    """중력 가속도 계산, 완전 벡터화"""
+def accelerations(pos, G, masses, eps=EPS, work=None):
+    """중력 가속도 계산, 완전 벡터화
+
+    work(make_workspace)가 주어지면 중간 배열을 재사용해 할당 없이 계산하고
+    work["acc"]를 반환한다.
+    """
+    if work is not None:
+        return _accelerations_into(pos, G, masses, eps, work)
+    if pos.shape[1] > DIRECT_BLOCK:
+        return _accelerations_blocked(pos, G, masses, eps)
     dr = pos[:, None, :] - pos[:, :, None]  # (3,N,N)
     r2 = np.sum(dr * dr, axis=0) + eps
     np.fill_diagonal(r2, np.inf)
@@ -41,23 +72,998 @@ def accelerations(pos, G, masses, eps=EPS):
     w = masses[None, :] * inv_r3
     return G * np.einsum("kij,ij->ki", dr, w)
 
-def rhs(t, s, G=1.0, masses=(1.0,1.0,1.0)):
-    """상미분방정식 RHS"""
-    pos, vel = unpack_state(s, N=3)
-    acc = accelerations(pos, G, np.asarray(masses, float))
+def _accelerations_blocked(pos, G, masses, eps, block=DIRECT_BLOCK):
+    N = pos.shape[1]
+    acc = np.empty((3, N))
+    for a in range(0, N, block):
+        b = min(a + block, N)
+        dr = pos[:, None, :] - pos[:, a:b, None]  # (3,B,N)
+        r2 = np.einsum("kij,kij->ij", dr, dr) + eps
+        r2[np.arange(b - a), np.arange(a, b)] = np.inf
+        w = masses[None, :] * r2 ** (-1.5)
+        acc[:, a:b] = np.einsum("kij,ij->ki", dr, w)
+    return G * acc
+
+FORCE_BACKENDS = ("direct", "bh")
+
+def make_force(backend="direct", theta=0.5, eps=EPS):
+    """가속도 함수 f(pos, G, masses) 생성: direct(직접합) | bh(Barnes–Hut, 열림각 θ)"""
+    if backend == "direct":
+        return lambda pos, G, masses: accelerations(pos, G, masses, eps)
+    if backend == "bh":
+        from barnes_hut import bh_accelerations
+        return lambda pos, G, masses: bh_accelerations(pos, G, masses, theta=theta, eps=eps)
+    raise ValueError(f"force backend must be one of {FORCE_BACKENDS}")
+
+def resolve_force(backend="direct", theta=0.5, eps=EPS):
+    """기본 직접합이면 None(사전 할당 버퍼 경로), 아니면 make_force 결과"""
+    if backend == "direct" and eps == EPS:
+        return None
+    return make_force(backend, theta, eps)
+
+def acceleration_jacobian(pos, G, masses, eps=EPS):
+    """∂a/∂x (3N×3N), 상태 벡터와 같은 순서(body-major: x1,y1,z1,x2,...)"""
+    N = pos.shape[1]
+    dr = pos[:, None, :] - pos[:, :, None]  # (3,N,N), dr[:,i,j] = x_j - x_i
+    r2 = np.sum(dr * dr, axis=0) + eps
+    np.fill_diagonal(r2, np.inf)
+    inv3 = r2 ** (-1.5)
+    inv5 = r2 ** (-2.5)
+    # B[i,j,k,l] = ∂a_i,k / ∂x_j,l  (i ≠ j)
+    B = (np.eye(3)[None, None] * inv3[:, :, None, None]
+         - 3.0 * np.einsum("kij,lij->ijkl", dr, dr) * inv5[:, :, None, None])
+    B *= G * masses[None, :, None, None]
+    idx = np.arange(N)
+    B[idx, idx] = -B.sum(axis=1)
+    return B.transpose(0, 2, 1, 3).reshape(3*N, 3*N)
+
+def make_workspace(N=3):
+    """accelerations(work=...)용 사전 할당 버퍼"""
+    return {"dr": np.empty((3, N, N)), "dr2": np.empty((3, N, N)),
+            "r2": np.empty((N, N)), "acc": np.empty((3, N))}
+
+def _accelerations_into(pos, G, masses, eps, work):
+    dr, dr2, r2, acc = work["dr"], work["dr2"], work["r2"], work["acc"]
+    np.subtract(pos[:, None, :], pos[:, :, None], out=dr)
+    np.multiply(dr, dr, out=dr2)
+    np.sum(dr2, axis=0, out=r2)
+    r2 += eps
+    np.fill_diagonal(r2, np.inf)
+    np.power(r2, -1.5, out=r2)
+    r2 *= masses[None, :]
+    np.einsum("kij,ij->ki", dr, r2, out=acc)
+    acc *= G
+    return acc
+
+def rhs(t, s, G=1.0, masses=(1.0,1.0,1.0), force=None):
+    """상미분방정식 RHS (force: make_force 결과, 기본은 직접합)"""
+    m = np.asarray(masses, float)
+    if force is None and get_backend() == "numba":
+        return _jit.rhs_flat(np.asarray(s, float), G, m, EPS)
+    pos, vel = unpack_state(s, N=m.size)
+    acc = force(pos, G, m) if force is not None else accelerations(pos, G, m)
     return pack_state(vel, acc)
 
-def total_energy(s, G=1.0, masses=(1.0,1.0,1.0)):
+def potential_energy(pos, G=1.0, masses=(1.0,1.0,1.0), eps=EPS, block=DIRECT_BLOCK):
+    """단일 상태의 퍼텐셜 에너지 (행 블록 단위, 메모리 O(N·block))"""
+    m = np.asarray(masses, float)
+    N = m.size
+    U = 0.0
+    for a in range(0, N, block):
+        b = min(a + block, N)
+        dr = pos[:, None, :] - pos[:, a:b, None]
+        r = np.sqrt(np.einsum("kij,kij->ij", dr, dr) + eps)
+        upper = np.arange(N)[None, :] > np.arange(a, b)[:, None]
+        U -= G * np.sum(np.where(upper, m[a:b, None] * m[None, :] / r, 0.0))
+    return U
+
+def total_energy(s, G=1.0, masses=(1.0,1.0,1.0), eps=EPS):
     """계의 전체 에너지 계산"""
     m = np.asarray(masses, float)
-    pos, vel = unpack_state(s, N=3)
+    pos, vel = unpack_state(s, N=m.size)
     v2 = np.sum(vel * vel, axis=0)
     K = 0.5 * np.sum(m * v2)
-    dr = pos[:, None, :] - pos[:, :, None]
-    r = np.sqrt(np.sum(dr*dr, axis=0) + EPS)
-    iu = np.triu_indices(m.size, k=1)
-    U = -G * np.sum(m[iu[0]] * m[iu[1]] / r[iu])
-    return K + U
+    return K + potential_energy(pos, G, m, eps)
+
+# ---------------- 적분기 ----------------
+_CBRT2 = 2.0 ** (1.0 / 3.0)
+_Y4_W1 = 1.0 / (2.0 - _CBRT2)
+_Y4_W0 = -_CBRT2 / (2.0 - _CBRT2)
+_Y6_W = (-1.17767998417887, 0.235573213359357, 0.784513610477560)  # Yoshida(1990) 해 A
+_Y6_W0 = 1.0 - 2.0 * sum(_Y6_W)
+
+# leapfrog(KDK) 서브스텝 가중치 — 대칭 합성
+SYMPLECTIC_SCHEMES = {
+    "verlet":   (1.0,),
+    "yoshida4": (_Y4_W1, _Y4_W0, _Y4_W1),
+    "yoshida6": (_Y6_W[2], _Y6_W[1], _Y6_W[0], _Y6_W0, _Y6_W[0], _Y6_W[1], _Y6_W[2]),
+}
+# 일반 분할 계수 (kick b₀…bₙ, drift a₁…aₙ): 한 스텝 = K(b₀) D(a₁) K(b₁) … D(aₙ) K(bₙ)
+# PEFRL (Omelyan–Mryglod–Folk 2002, 위치 확장 Forest–Ruth 유사): 4차, 힘 4회/스텝,
+# 오차 상수가 yoshida4보다 두 자릿수가량 작다. Forest–Ruth(1990) 자체는 yoshida4와 같은
+# 삼중 점프 계수라 따로 두지 않는다.
+_PEFRL_XI, _PEFRL_LAM, _PEFRL_CHI = 0.1786178958448091, -0.2123418310626054, -0.06626458266981849
+SPLIT_SCHEMES = {
+    "pefrl": ((0.0, 0.5 - _PEFRL_LAM, _PEFRL_LAM, _PEFRL_LAM, 0.5 - _PEFRL_LAM, 0.0),
+              (_PEFRL_XI, _PEFRL_CHI, 1.0 - 2.0 * (_PEFRL_CHI + _PEFRL_XI), _PEFRL_CHI, _PEFRL_XI)),
+}
+FIXED_STEP_SCHEMES = tuple(SYMPLECTIC_SCHEMES) + tuple(SPLIT_SCHEMES)
+# 고정 스텝의 드리프트가 유계인 것은 dt가 가장 가까운 조우를 풀 때뿐이다. t_max=10, α=1에서
+# |ΔE/E|max < 1e-3 이 되는 dt:
+#   exp1, figure8 : verlet ≤ 0.002, yoshida4/yoshida6/pefrl ≤ 0.01
+#   exp2          : yoshida6 ≤ 0.005, yoshida4/pefrl ≤ 0.001, verlet 없음
+#   exp3          : 없음 (근접 충돌) → dop853
+# run()은 드리프트가 drift_tol을 넘으면 경고한다.
+
+def kick_drift(scheme):
+    """고정 스텝 방식 → (kick 계수 (n+1,), drift 계수 (n,)). KDK 합성은 인접 반 kick을 합친다"""
+    if scheme in SPLIT_SCHEMES:
+        b, a = SPLIT_SCHEMES[scheme]
+        return np.array(b), np.array(a)
+    if scheme not in SYMPLECTIC_SCHEMES:
+        raise ValueError(f"scheme must be one of {sorted(FIXED_STEP_SCHEMES)}")
+    w = np.array(SYMPLECTIC_SCHEMES[scheme])
+    return 0.5 * (np.append(w, 0.0) + np.insert(w, 0, 0.0)), w
+
+# 로그 해밀토니안(LogH) 시간변환 leapfrog: 같은 합성 가중치를 가상시간 s에서 사용
+LOGH_SCHEMES = {"logh": SYMPLECTIC_SCHEMES["verlet"], "logh4": SYMPLECTIC_SCHEMES["yoshida4"]}
+INTEGRATORS = ("dop853",) + FIXED_STEP_SCHEMES + tuple(LOGH_SCHEMES)
+
+# 근접 조우 / 탈출 판정 (0이면 끔)
+ENCOUNTER_RADIUS = 0.1   # 최소 쌍 거리 < 이 값이면 조우 구간
+ESCAPE_RADIUS = 10.0     # 질량중심에서 이 거리를 넘는 천체가 생기면 탈출 이벤트
+# 조우/충돌 추적은 소수체에서만: 클러스터는 매 스텝 쌍 거리 O(N²)가 비싸고, 평균 입자 간격이
+# r_enc보다 작아 늘 "조우 중"으로 나와 의미가 없다 (탈출 판정은 O(N)이라 유지)
+ENCOUNTER_MAX_BODIES = 3
+
+class IntegrationResult:
+    """solve_ivp 결과와 같은 모양(t, y, nfev)의 간단한 컨테이너"""
+    def __init__(self, t, y, nfev, method):
+        self.t, self.y, self.nfev, self.method = t, y, nfev, method
+        self.success = True
+
+_COUNTING_DOP853 = None
+
+def _counting_dop853():
+    """CountingDOP853 클래스 (scipy.integrate는 처음 필요할 때 import)"""
+    global _COUNTING_DOP853
+    if _COUNTING_DOP853 is None:
+        from scipy.integrate import DOP853
+
+        class CountingDOP853(DOP853):
+            """채택/기각 스텝을 계측 카운터에 더하는 DOP853 (수치 결과는 동일).
+
+            시도 1회 = RHS n_stages(12)회이므로 한 번의 _step_impl 동안 늘어난 nfev로 시도 수를 안다.
+            encounter(EncounterStats)가 주어지면 채택 스텝마다 근접 조우 통계도 쌓는다.
+            """
+            def __init__(self, fun, t0, y0, t_bound, encounter=None, **kw):
+                super().__init__(fun, t0, y0, t_bound, **kw)
+                self.encounter = encounter
+
+            def _step_impl(self):
+                n0, t0 = self.nfev, self.t
+                ok, msg = super()._step_impl()
+                tries = (self.nfev - n0) // self.n_stages
+                if ok:
+                    count("dop853.accepted_steps")
+                    count("dop853.rejected_steps", max(0, tries - 1))
+                    if self.encounter is not None:
+                        self.encounter.step(self.t - t0, self.y)
+                else:
+                    count("dop853.rejected_steps", tries)
+                return ok, msg
+
+        _COUNTING_DOP853 = CountingDOP853
+    return _COUNTING_DOP853
+
+def __getattr__(name):   # tb.CountingDOP853 (지연 정의)
+    if name == "CountingDOP853":
+        return _counting_dop853()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+class DenseTrajectory:
+    """dense_output 적분 결과: 채택된 스텝만 보관하고 요청한 격자/시각에서 지연 보간.
+
+    .t/.y 는 출력 격자(dt)에서 처음 접근할 때 보간해 만든다 (dt=None이면 채택 스텝).
+    임의 시각은 traj(t) 또는 traj.resample(dt)로 얻는다.
+    """
+    def __init__(self, sol, dt=None):
+        self.sol = sol.sol
+        self.t_steps, self.y_steps = sol.t, sol.y
+        self.t_events = sol.t_events
+        self.nfev, self.success = sol.nfev, sol.success
+        self.method = "dop853-dense"
+        self.dt = dt
+        self._grid = None
+
+    def __call__(self, t):
+        return self.sol(np.asarray(t, float))
+
+    def resample(self, dt):
+        t = np.arange(self.t_steps[0], self.t_steps[-1] + 1e-12, dt)
+        return t, self(t)
+
+    def _ensure_grid(self):
+        if self._grid is None:
+            self._grid = (self.t_steps, self.y_steps) if self.dt is None else self.resample(self.dt)
+        return self._grid
+
+    @property
+    def t(self):
+        return self._ensure_grid()[0]
+
+    @property
+    def y(self):
+        return self._ensure_grid()[1]
+
+def integrate_symplectic(s0, t_max, dt, G=1.0, masses=(1.0,1.0,1.0),
+                         scheme="yoshida4", save_every=1, force=None):
+    """고정 스텝 심플렉틱 적분 (KDK leapfrog 합성 또는 일반 kick/drift 분할, kick_drift 참고).
+
+    스텝마다 가속도 버퍼와 pos/vel을 제자리에서 갱신하므로 루프 안에서
+    배열 할당이 없다. 가속도는 직전 서브스텝 값을 재사용(FSAL)하고, 계수가 0인 kick
+    앞에서는 계산하지 않는다. force가 주어지거나 N > DIRECT_BLOCK 이면 그 함수의 결과를
+    버퍼로 복사한다.
+    """
+    kicks, drifts = kick_drift(scheme)
+    m = np.asarray(masses, float)
+    N = m.size
+    pos, vel = (a.copy() for a in unpack_state(s0, N=N))
+    tmp = np.empty((3, N))
+    if force is None and N <= DIRECT_BLOCK:
+        work = make_workspace(N)
+        def update_acc():
+            return accelerations(pos, G, m, work=work)
+    else:
+        f = force or make_force("direct")
+        acc_buf = np.empty((3, N))
+        def update_acc():
+            acc_buf[...] = f(pos, G, m)
+            return acc_buf
+    kick = [b * dt for b in kicks]
+    drift = [a * dt for a in drifts]
+
+    n_steps = int(round(t_max / dt))
+    n_out = n_steps // save_every + 1
+    Y = np.empty((6 * N, n_out))
+    Y[:3*N, 0] = pos.reshape(3*N, order="F")
+    Y[3*N:, 0] = vel.reshape(3*N, order="F")
+
+    if force is None and N <= DIRECT_BLOCK and get_backend() == "numba":
+        nfev = _jit.symplectic_loop(pos, vel, float(G), m, EPS, float(dt),
+                                    kicks, drifts, n_steps, save_every, Y)
+        t = np.arange(n_out) * (dt * save_every)
+        return IntegrationResult(t, Y, nfev, scheme)
+
+    acc = update_acc()
+    nfev = 1
+    stale = False   # drift 뒤 가속도는 0이 아닌 kick이 쓸 때만 계산 (PEFRL: 끝 kick = 0)
+    j = 1
+    for n in range(1, n_steps + 1):
+        for b, a in zip(kick, drift + [None]):
+            if b:
+                if stale:
+                    update_acc(); nfev += 1; stale = False
+                np.multiply(acc, b, out=tmp); vel += tmp
+            if a is not None:
+                np.multiply(vel, a, out=tmp); pos += tmp
+                stale = True
+        if n % save_every == 0:
+            Y[:3*N, j] = pos.reshape(3*N, order="F")
+            Y[3*N:, j] = vel.reshape(3*N, order="F")
+            j += 1
+    t = np.arange(n_out) * (dt * save_every)
+    return IntegrationResult(t, Y, nfev, scheme)
+
+# ---------------- 근접 조우 / 정규화 적분 ----------------
+def separations(pos):
+    """(3, N) 위치 → 최소 쌍 거리"""
+    N = pos.shape[1]
+    dr = pos[:, :, None] - pos[:, None, :]
+    r2 = np.einsum("kij,kij->ij", dr, dr)
+    return float(np.sqrt(np.min(r2[np.triu_indices(N, 1)])))
+
+def max_com_distance(pos, masses):
+    com = pos @ masses / masses.sum()
+    return float(np.sqrt(np.max(np.sum((pos - com[:, None]) ** 2, axis=0))))
+
+class EncounterStats:
+    """적분 스텝별 근접 조우 통계: 조우 구간(최소 쌍 거리 < r_enc)의 스텝 수/시간/횟수, 첫 탈출 시각.
+
+    적분기가 채택한 스텝마다 step(h, y)를 부른다 (고정 스텝은 scan으로 사후 집계).
+    N > ENCOUNTER_MAX_BODIES (클러스터)면 스텝 수/시간만 세고 조우·탈출은 추적하지 않는다.
+    """
+    def __init__(self, masses, r_enc=ENCOUNTER_RADIUS, r_esc=ESCAPE_RADIUS):
+        self.m = np.asarray(masses, float)
+        self.N = self.m.size
+        self.r_enc, self.r_esc = r_enc, r_esc
+        self.active = self.N <= ENCOUNTER_MAX_BODIES and bool(r_enc or r_esc)
+        self.steps = self.enc_steps = self.encounters = 0
+        self.time = self.enc_time = 0.0
+        self.r_min = np.inf
+        self.t_escape = None
+        self.event_times = {}
+        self._inside = False
+
+    def step(self, h, y):
+        self.steps += 1
+        self.time += h
+        if not self.active:
+            return
+        pos, _ = unpack_state(y, N=self.N)
+        if self.r_enc:
+            r = separations(pos)
+            self.r_min = min(self.r_min, r)
+            inside = r < self.r_enc
+            if inside:
+                self.enc_steps += 1
+                self.enc_time += h
+                self.encounters += not self._inside
+            self._inside = inside
+        if self.r_esc and self.t_escape is None and max_com_distance(pos, self.m) > self.r_esc:
+            self.t_escape = self.time
+
+    def scan(self, t, Y):
+        """고정 스텝 결과 (t, Y) 전체를 스텝 단위로 집계"""
+        for k in range(1, t.size):
+            self.step(t[k] - t[k-1], Y[:, k])
+
+    def record_events(self, names, t_events, t0=0.0):
+        """solve_ivp 이벤트 시각 (정밀 근 찾기) 기록 — 청크 적분이면 t0 = 청크 시작 시각"""
+        for name, te in zip(names, t_events or []):
+            te = np.asarray(te, float) + t0
+            self.event_times.setdefault(name, []).extend(te.tolist())
+            if name == "escape" and len(te) and self.t_escape is None:
+                self.t_escape = float(te[0])
+
+    def to_dict(self):
+        return {"steps": self.steps, "encounter_steps": self.enc_steps,
+                "encounter_step_frac": self.enc_steps / max(self.steps, 1),
+                "encounters": self.encounters, "encounter_time": self.enc_time,
+                "r_min": None if np.isinf(self.r_min) else self.r_min,
+                "t_escape": self.t_escape,
+                "events": {k: len(v) for k, v in self.event_times.items()}}
+
+    def publish(self):
+        """계측 카운터로 내보냄 (metrics JSON에 남음)"""
+        count("encounter.steps", self.enc_steps)
+        count("encounter.count", self.encounters)
+        count("encounter.total_steps", self.steps)
+
+def encounter_events(masses, r_enc=ENCOUNTER_RADIUS, r_esc=ESCAPE_RADIUS, terminal_escape=False):
+    """solve_ivp 이벤트: 조우 진입(최소 쌍 거리 = r_enc, 감소 방향), 탈출(질량중심 거리 = r_esc, 증가)
+
+    반환: (이름 목록, 이벤트 함수 목록)
+    """
+    m = np.asarray(masses, float)
+    N = m.size
+    names, events = [], []
+    if r_enc:
+        def encounter(t, s):
+            return separations(unpack_state(s, N=N)[0]) - r_enc
+        encounter.direction = -1
+        names.append("encounter"); events.append(encounter)
+    if r_esc:
+        def escape(t, s):
+            return max_com_distance(unpack_state(s, N=N)[0], m) - r_esc
+        escape.direction = 1
+        escape.terminal = terminal_escape
+        names.append("escape"); events.append(escape)
+    return names, events
+
+def _acc_jerk_batch(P, V, G, masses, eps=EPS):
+    """(M,3,N) 위치·속도 → 가속도, 저크 (M,3,N)"""
+    N = P.shape[2]
+    dr = P[:, :, None, :] - P[:, :, :, None]    # r_j − r_i : (M,3,N,N)
+    dv = V[:, :, None, :] - V[:, :, :, None]
+    r2 = np.einsum("mkij,mkij->mij", dr, dr) + eps
+    idx = np.arange(N)
+    r2[:, idx, idx] = np.inf
+    inv3 = masses[None, None, :] * r2 ** (-1.5)
+    rv = np.einsum("mkij,mkij->mij", dr, dv)
+    acc = G * np.einsum("mkij,mij->mki", dr, inv3)
+    jerk = G * (np.einsum("mkij,mij->mki", dv, inv3)
+                - 3.0 * np.einsum("mkij,mij->mki", dr, inv3 * rv / r2))
+    return acc, jerk
+
+def _hermite3(u, h, f0, d0, f1, d1):
+    """3차 Hermite 보간 (값·1계 도함수), u ∈ [0, 1]"""
+    return ((2*u**3 - 3*u**2 + 1) * f0 + (u**3 - 2*u**2 + u) * h * d0
+            + (-2*u**3 + 3*u**2) * f1 + (u**3 - u**2) * h * d1)
+
+def _hermite5(u, h, f0, d0, s0, f1, d1, s1):
+    """5차 Hermite 보간 (값·1계·2계 도함수), u ∈ [0, 1]"""
+    u2, u3, u4, u5 = u*u, u**3, u**4, u**5
+    return ((1 - 10*u3 + 15*u4 - 6*u5) * f0 + (u - 6*u3 + 8*u4 - 3*u5) * h * d0
+            + (0.5*u2 - 1.5*u3 + 1.5*u4 - 0.5*u5) * h*h * s0
+            + (10*u3 - 15*u4 + 6*u5) * f1 + (-4*u3 + 7*u4 - 3*u5) * h * d1
+            + (0.5*u3 - u4 + 0.5*u5) * h*h * s1)
+
+def integrate_logh(s0, t_max, dt, G=1.0, masses=(1.0,1.0,1.0), scheme="logh", force=None,
+                   eps=EPS, encounter=None, max_steps=None):
+    """로그 해밀토니안(LogH) 시간변환 leapfrog (Mikkola–Tanikawa / Preto–Tremaine).
+
+    가상시간 s에서 Γ = log(T + B) − log(U), B = −E₀ 를 DKD leapfrog로 적분한다:
+      drift dt = (h/2)/(T(v) + B), q += dt·v,  t += dt
+      kick  dt = h/U(q),           v += dt·a(q)
+    물리 시간 스텝이 U에 반비례해 근접 조우에서 저절로 줄고, 2체 케플러 궤도는 에너지가
+    반올림 오차 수준으로 보존된다 (KDK 순서는 이 성질이 없음). logh4는 Yoshida 4차 합성.
+    s 스텝 h는 첫 스텝의 물리 시간이 dt가 되도록 h = dt·U₀ 로 고정 (스텝 수 ≈ ∫U dt / h).
+
+    채택 스텝의 (t, q, v)를 모아 dt 출력 격자로 5차 Hermite 보간(끝점 a, 저크 사용)해 반환한다
+    (.t_steps 보관). 깊은 조우 안의 격자점은 보간 오차가 스텝 자체 오차보다 클 수 있다.
+    """
+    if scheme not in LOGH_SCHEMES:
+        raise ValueError(f"scheme must be one of {sorted(LOGH_SCHEMES)}")
+    m = np.asarray(masses, float)
+    N = m.size
+    pos, vel = (a.copy() for a in unpack_state(s0, N=N))
+    direct = force is None and N <= DIRECT_BLOCK
+    if direct:
+        work = make_workspace(N)
+        acc_of = lambda q: accelerations(q, G, m, eps, work=work)
+    else:
+        f = force or make_force("direct", eps=eps)
+        acc_of = lambda q: f(q, G, m)
+    U_of = lambda: -potential_energy(pos, G, m, eps)
+    T_of = lambda: 0.5 * np.sum(m * np.sum(vel * vel, axis=0))
+
+    U0 = U_of()
+    if U0 <= 0:
+        raise ValueError("logh needs an attractive potential (U > 0)")
+    B = U0 - T_of()                # = −E₀
+    h = dt * U0
+    weights = LOGH_SCHEMES[scheme]
+    max_steps = max_steps or 100 * (int(round(t_max / dt)) + 1)
+
+    def drift(hs):
+        W = T_of() + B
+        if W <= 0:
+            raise FloatingPointError("logh: T + B <= 0 (energy error too large, reduce dt)")
+        d = 0.5 * hs / W
+        np.add(pos, d * vel, out=pos)
+        return d
+
+    nfev = 0
+    t = 0.0
+    ts, P, V = [0.0], [pos.copy()], [vel.copy()]
+    while t < t_max and len(ts) <= max_steps:
+        t_prev = t
+        for w in weights:
+            hs = w * h
+            t += drift(hs)
+            vel += (hs / U_of()) * acc_of(pos)
+            t += drift(hs)
+            nfev += 1
+        ts.append(t); P.append(pos.copy()); V.append(vel.copy())
+        if encounter is not None:
+            encounter.step(t - t_prev, pack_state(pos, vel))
+    count("logh.steps", len(ts) - 1)
+
+    # 스텝 끝점의 가속도·저크 (보간용 도함수) — 작은 N은 배치로
+    t_steps = np.asarray(ts)
+    P, V = np.asarray(P), np.asarray(V)   # (K, 3, N)
+    if direct:
+        A, J = (np.concatenate(x) for x in zip(*(
+            _acc_jerk_batch(P[i:i+4096], V[i:i+4096], G, m, eps)
+            for i in range(0, len(P), 4096))))
+    else:
+        A = np.asarray([acc_of(q) for q in P])
+        J = None
+    nfev += len(P)
+
+    t_grid = np.arange(0.0, min(t_max, t_steps[-1]) + 1e-12, dt)
+    k = np.clip(np.searchsorted(t_steps, t_grid, side="right") - 1, 0, t_steps.size - 2)
+    hk = (t_steps[k + 1] - t_steps[k])[:, None, None]
+    u = (t_grid - t_steps[k])[:, None, None] / hk
+    pos_g = _hermite5(u, hk, P[k], V[k], A[k], P[k + 1], V[k + 1], A[k + 1])
+    if J is not None:
+        vel_g = _hermite5(u, hk, V[k], A[k], J[k], V[k + 1], A[k + 1], J[k + 1])
+    else:
+        vel_g = _hermite3(u, hk, V[k], A[k], V[k + 1], A[k + 1])
+    Y = np.concatenate([pos_g.transpose(0, 2, 1).reshape(t_grid.size, 3 * N),
+                        vel_g.transpose(0, 2, 1).reshape(t_grid.size, 3 * N)], axis=1).T
+    out = IntegrationResult(t_grid, np.ascontiguousarray(Y), nfev, scheme)
+    out.t_steps = t_steps
+    out.success = t >= t_max
+    return out
+
+def integrate(s0, t_max, dt, G=1.0, masses=(1.0,1.0,1.0), integrator="dop853",
+              rtol=1e-9, atol=1e-12, force=None, dense=False, events=None, encounter=None):
+    """적분기 선택 계층: dop853(적응, solve_ivp), 고정 스텝 심플렉틱, 또는 LogH 정규화 leapfrog
+
+    dense=True(dop853)면 t_eval 없이 채택 스텝만 저장하고 DenseTrajectory를 반환
+    — 이때 dt는 정확도와 무관한 출력 격자 간격일 뿐이다.
+    encounter: EncounterStats면 채택 스텝마다 근접 조우 통계를 쌓는다.
+    """
+    with timer(f"integrate.{integrator}"):
+        if integrator == "dop853":
+            from scipy.integrate import solve_ivp
+            m = np.asarray(masses, float)
+            f = lambda t,s: rhs(t,s,G,m,force)
+            opts = {"encounter": encounter} if encounter is not None else {}
+            if dense:
+                sol = solve_ivp(f, (0.0, t_max), s0, dense_output=True, events=events,
+                                method=_counting_dop853(), rtol=rtol, atol=atol, **opts)
+                sol = DenseTrajectory(sol, dt)
+            else:
+                t_eval = np.arange(0.0, t_max + 1e-12, dt)
+                sol = solve_ivp(f, (0.0, t_max), s0, t_eval=t_eval, events=events,
+                                method=_counting_dop853(), rtol=rtol, atol=atol, **opts)
+        elif integrator in LOGH_SCHEMES:
+            sol = integrate_logh(s0, t_max, dt, G, masses, scheme=integrator, force=force,
+                                 encounter=encounter)
+        else:
+            sol = integrate_symplectic(s0, t_max, dt, G, masses, scheme=integrator, force=force)
+            count("symplectic.steps", int(round(t_max / dt)))
+            if encounter is not None:
+                encounter.scan(sol.t, sol.y)
+    count("rhs_evals", int(sol.nfev))
+    return sol
+
+# Barnes–Hut 힘은 근사 오차(θ=0.5에서 상대 ~1e-3)가 있고 트리 구조가 바뀔 때 불연속이라,
+# 이보다 작은 dop853 rtol은 정확도는 그대로인 채 스텝만 기각한다 (N=200: 1e-9 → 1e-6에서 ~20배 빠름)
+BH_RTOL = 1e-6
+
+# ---------------- 조기 종료 / 결과 분류 ----------------
+# bound = t_max까지 종료 조건 없음, max_steps = LogH 스텝 예산(가상시간)을 t_max 전에 소진
+OUTCOMES = ("bound", "escape", "collision", "drift", "max_steps")
+COLLISION_RADIUS = 1e-3   # 최소 쌍 거리가 이보다 작으면 충돌 (0이면 끔)
+DRIFT_TOL = 1e-3          # |ΔE/E₀|가 이보다 크면 수치적으로 신뢰 불가 → 중단 (0이면 끔)
+
+def escape_margin(pos, vel, masses, G=1.0, r_esc=ESCAPE_RADIUS):
+    """(K,3,N) 배치 → (K,) 탈출 여유: 탈출 후보 중 (질량중심 거리 − r_esc) 최댓값, 없으면 −r_esc
+
+    후보 = 나머지 천체들의 질량중심에 대한 2체 에너지가 양수이고 멀어지는 중인 천체
+    (거리만 보면 느슨한 쌍성 궤도의 원점 근처를 탈출로 오인한다).
+    """
+    m = np.asarray(masses, float)
+    M = m.sum()
+    com = pos @ m / M                 # (K,3)
+    vcom = vel @ m / M
+    out = np.full(pos.shape[0], -float(r_esc))
+    for i in range(m.size):
+        rest = M - m[i]
+        r = pos[..., i] - (com * M - m[i] * pos[..., i]) / rest
+        v = vel[..., i] - (vcom * M - m[i] * vel[..., i]) / rest
+        rn = np.sqrt(np.sum(r * r, axis=-1) + EPS)
+        e = 0.5 * (m[i] * rest / M) * np.sum(v * v, axis=-1) - G * m[i] * rest / rn
+        d = np.sqrt(np.sum((pos[..., i] - com) ** 2, axis=-1)) - r_esc
+        ok = (e > 0) & (np.sum(r * v, axis=-1) > 0)
+        out = np.maximum(out, np.where(ok, d, -float(r_esc)))
+    return out
+
+def termination_events(masses, G=1.0, E0=None, r_esc=ESCAPE_RADIUS, r_coll=COLLISION_RADIUS,
+                       drift_tol=DRIFT_TOL):
+    """solve_ivp 종료(terminal) 이벤트: escape / collision / drift. 반환: (이름 목록, 함수 목록)
+
+    collision은 N ≤ ENCOUNTER_MAX_BODIES일 때만 (클러스터는 쌍 거리 O(N²)).
+    """
+    m = np.asarray(masses, float)
+    N = m.size
+    names, events = [], []
+    if r_esc:
+        def escape(t, s):
+            pos, vel = unpack_state(s, N=N)
+            return float(escape_margin(pos[None], vel[None], m, G, r_esc)[0])
+        escape.direction = 1
+        names.append("escape"); events.append(escape)
+    if r_coll and N <= ENCOUNTER_MAX_BODIES:
+        def collision(t, s):
+            return separations(unpack_state(s, N=N)[0]) - r_coll
+        collision.direction = -1
+        names.append("collision"); events.append(collision)
+    if drift_tol and E0:
+        def drift(t, s):
+            return abs((total_energy(s, G, m) - E0) / E0) - drift_tol
+        drift.direction = 1
+        names.append("drift"); events.append(drift)
+    for ev in events:
+        ev.terminal = True
+    return names, events
+
+def outcome_scan(t, Y, masses, G=1.0, E0=None, r_esc=ESCAPE_RADIUS, r_coll=COLLISION_RADIUS,
+                 drift_tol=DRIFT_TOL):
+    """고정 격자 궤적 (6N, K)에서 처음 종료 조건을 만족하는 샘플 → (결과, 인덱스) 또는 (None, None)
+
+    collision은 termination_events와 같이 N ≤ ENCOUNTER_MAX_BODIES일 때만 검사한다.
+    """
+    m = np.asarray(masses, float)
+    N = m.size
+    pos, vel = unpack_state_batch(Y.T, N)
+    hit = {}
+    if r_esc:
+        hit["escape"] = escape_margin(pos, vel, m, G, r_esc) > 0
+    if r_coll and N <= ENCOUNTER_MAX_BODIES:
+        dr = pos[:, :, :, None] - pos[:, :, None, :]
+        r2 = np.einsum("kdij,kdij->kij", dr, dr)
+        iu = np.triu_indices(N, 1)
+        hit["collision"] = np.sqrt(r2[:, iu[0], iu[1]].min(axis=1)) < r_coll
+    if drift_tol and E0:
+        hit["drift"] = np.abs((total_energy_batch(Y, G, m) - E0) / E0) > drift_tol
+    first = {k: int(np.argmax(v)) for k, v in hit.items() if v.any()}
+    if not first:
+        return None, None
+    name = min(first, key=first.get)
+    return name, first[name]
+
+def integrate_until(s0, t_max, dt, G=1.0, masses=(1.0,1.0,1.0), integrator="dop853",
+                    rtol=1e-9, atol=1e-12, force=None, r_esc=ESCAPE_RADIUS,
+                    r_coll=COLLISION_RADIUS, drift_tol=DRIFT_TOL, chunk_t=1.0, encounter=None,
+                    observer=None):
+    """종료 조건(탈출/충돌/드리프트)을 만나면 멈추는 적분. 반환: (sol, 결과, 종료 시각)
+
+    dop853은 solve_ivp 종료 이벤트로 정확한 시각에서 멈춘다 (sol은 그 직전 격자까지).
+    고정 스텝/LogH는 chunk_t 구간씩 적분하며 격자 샘플을 검사하고, 처음 걸린 샘플에서 자른다.
+    결과가 "bound"면 t_max까지 종료 조건이 없었던 것이다. LogH가 깊은 조우에서 스텝 예산
+    (max_steps, 가상시간 스텝 수)을 다 써 물리 시간 t_max에 못 미치면 "max_steps"로 그 시각에서 멈춘다.
+    observer(DTGObserver)는 chunk_t 구간마다 드리프트로 갱신 (dop853은 적분 직후 한 번에).
+    """
+    m = np.asarray(masses, float)
+    E0 = total_energy(np.asarray(s0, float), G, m)
+    if integrator == "dop853":
+        names, events = termination_events(m, G, E0, r_esc, r_coll, drift_tol)
+        sol = integrate(s0, t_max, dt, G, m, integrator, rtol, atol, force,
+                        events=events or None, encounter=encounter)
+        if observer is not None:
+            E = total_energy_batch(sol.y, G, m)
+            _observe(observer, E, E[0], sol.t)
+        fired = [(te[0], n) for n, te in zip(names, sol.t_events or []) if len(te)]
+        if fired:
+            t_out, name = min(fired)
+            count(f"outcome.{name}")
+            return sol, name, float(t_out)
+        count("outcome.bound")
+        return sol, "bound", float(sol.t[-1])
+
+    n_chunk = max(1, int(round(chunk_t / dt)))
+    n_total = int(round(t_max / dt))
+    s = np.asarray(s0, float)
+    ts, Ys, nfev, k = [np.zeros(1)], [s[:, None]], 0, 0
+    name = None
+    while k < n_total and name is None:
+        n = min(n_chunk, n_total - k)
+        sol = integrate(s, n * dt, dt, G, m, integrator=integrator, force=force,
+                        encounter=encounter)
+        nfev += sol.nfev
+        t_seg, Y_seg = sol.t[1:] + k * dt, sol.y[:, 1:]
+        name, i = outcome_scan(t_seg, Y_seg, m, G, E0, r_esc, r_coll, drift_tol)
+        if name is not None:
+            t_seg, Y_seg = t_seg[:i + 1], Y_seg[:, :i + 1]
+        elif not sol.success:   # 구간 끝(n·dt)에 못 미침 → 이어 붙이면 시각이 어긋나므로 여기서 끝
+            name = "max_steps"
+            if t_seg.size == 0:
+                break
+        ts.append(t_seg); Ys.append(Y_seg)
+        if observer is not None:
+            if k == 0:   # t=0 샘플도 관측 (다른 경로와 같은 샘플 수)
+                _observe(observer, np.array([E0]), E0, ts[0])
+            _observe(observer, total_energy_batch(Y_seg, G, m), E0, t_seg)
+        s = Y_seg[:, -1].copy()
+        k += n
+    out = IntegrationResult(np.concatenate(ts), np.concatenate(Ys, axis=1), nfev, integrator)
+    name = name or "bound"
+    count(f"outcome.{name}")
+    return out, name, float(out.t[-1])
+
+# ---------------- 앙상블(배치) 코어 ----------------
+def unpack_state_batch(S, N=3):
+    """(M, 6N) 상태 배치 → (pos, vel), 각각 (M,3,N)"""
+    S = np.asarray(S, float)
+    if S.ndim != 2 or S.shape[1] != 6 * N:
+        raise ValueError(f"batch must have shape (M, 6N) = (M, {6*N}), got {S.shape}")
+    M = S.shape[0]
+    pos = S[:, :3*N].reshape(M, N, 3).transpose(0, 2, 1)
+    vel = S[:, 3*N:].reshape(M, N, 3).transpose(0, 2, 1)
+    return pos, vel
+
+def pack_state_batch(pos, vel):
+    """(M,3,N) pos/vel → (M, 6N) 상태 배치"""
+    pos = np.asarray(pos, float)
+    vel = np.asarray(vel, float)
+    if pos.shape != vel.shape or pos.ndim != 3 or pos.shape[1] != 3:
+        raise ValueError("pos/vel must have shape (M,3,N)")
+    M, _, N = pos.shape
+    return np.concatenate([pos.transpose(0, 2, 1).reshape(M, 3*N),
+                           vel.transpose(0, 2, 1).reshape(M, 3*N)], axis=1)
+
+def accelerations_batch(pos, G, masses, eps=EPS):
+    """M개 계의 중력 가속도를 한 번에 계산: pos (M,3,N) → (M,3,N)"""
+    N = pos.shape[2]
+    dr = pos[:, :, None, :] - pos[:, :, :, None]  # (M,3,N,N)
+    r2 = np.einsum("mkij,mkij->mij", dr, dr) + eps
+    idx = np.arange(N)
+    r2[:, idx, idx] = np.inf
+    w = masses[None, None, :] * r2 ** (-1.5)
+    return G * np.einsum("mkij,mij->mki", dr, w)
+
+def rhs_batch(t, S, G=1.0, masses=(1.0,1.0,1.0)):
+    """배치 RHS: (M, 6N) → (M, 6N)"""
+    m = np.asarray(masses, float)
+    pos, vel = unpack_state_batch(S, N=m.size)
+    return pack_state_batch(vel, accelerations_batch(pos, G, m))
+
+def ensemble_energy(S, G=1.0, masses=(1.0,1.0,1.0)):
+    """배치 상태 각각의 전체 에너지: (M, 6N) → (M,)"""
+    return total_energy_batch(np.asarray(S, float).T, G, masses)
+
+# Dormand–Prince 5(4) 계수 (FSAL: 7번째 단 = 다음 스텝 첫 단)
+_DP_A = ((),
+         (1/5,),
+         (3/40, 9/40),
+         (44/45, -56/15, 32/9),
+         (19372/6561, -25360/2187, 64448/6561, -212/729),
+         (9017/3168, -355/33, 46732/5247, 49/176, -5103/18656))
+_DP_B = (35/384, 0.0, 500/1113, 125/192, -2187/6784, 11/84)
+_DP_E = (-71/57600, 0.0, 71/16695, -71/1920, 17253/339200, -22/525, 1/40)  # y5 − y4
+
+def _rms(x):
+    """(M, n) → 계별 RMS (M,)"""
+    return np.sqrt(np.mean(x * x, axis=1))
+
+def _initial_step_batch(f, S, F, rtol, atol):
+    """계별 첫 스텝 크기 (Hairer 방식, solve_ivp와 같은 추정)"""
+    scale = atol + np.abs(S) * rtol
+    d0, d1 = _rms(S / scale), _rms(F / scale)
+    h0 = np.where((d0 < 1e-5) | (d1 < 1e-5), 1e-6, 0.01 * d0 / np.maximum(d1, 1e-300))
+    d2 = _rms((f(S + h0[:, None] * F) - F) / scale) / h0
+    dm = np.maximum(d1, d2)
+    h1 = np.where(dm <= 1e-15, np.maximum(1e-6, h0 * 1e-3), (0.01 / np.maximum(dm, 1e-300)) ** 0.2)
+    return np.minimum(100 * h0, h1)
+
+def integrate_ensemble(S0, t_max, dt, G=1.0, masses=(1.0,1.0,1.0), save_every=0,
+                       rtol=1e-9, atol=1e-12, max_steps=1_000_000):
+    """(M, 6N) 배치를 적응 Dormand–Prince 5(4)로 동시에 적분 — 계마다 스텝 크기/오차 제어가 따로.
+
+    매 반복에서 아직 안 끝난 계만 모아 한 스텝씩 시도하고, 계별 내장 오차 추정
+    (RMS(err / (atol + rtol·|y|)) ≤ 1)으로 채택/기각과 다음 스텝을 정한다 (solve_ivp와 같은 규칙).
+    출력 시각(save_every·dt 간격, 0이면 t_max만)에는 스텝을 잘라 정확히 멈추므로 dt는 정확도와
+    무관하다. 스텝 크기가 반올림 수준으로 줄거나 max_steps를 넘은 계는 멈추고 이후 스냅샷은 NaN.
+
+    반환: (t (T,), 스냅샷 (T, M, 6N), info) — info의 "steps"/"rejected" (M,) 정수,
+    "status" (M,) 문자열 ("ok" | "h_min" | "max_steps")
+    """
+    m = np.asarray(masses, float)
+    S = np.array(S0, float, copy=True)
+    M = S.shape[0]
+    f = lambda s: rhs_batch(0.0, s, G, m)
+    n_steps = int(round(t_max / dt))
+    every = save_every if save_every > 0 else n_steps
+    t_out = np.append(np.arange(0, n_steps, max(every, 1)) * dt, t_max) if n_steps else np.zeros(1)
+    snaps = np.full((t_out.size, M, S.shape[1]), np.nan)
+    snaps[0] = S
+
+    F = f(S)
+    h = _initial_step_batch(f, S, F, rtol, atol)
+    t = np.zeros(M)
+    nxt = np.ones(M, dtype=np.int64)   # 다음에 채울 스냅샷 인덱스
+    steps = np.zeros(M, dtype=np.int64)
+    rejected = np.zeros(M, dtype=np.int64)
+    status = np.full(M, "ok", dtype=object)
+    active = np.flatnonzero(nxt < t_out.size)
+    nfev = 2 * M
+    while active.size:
+        a = active
+        y, ta, ha = S[a], t[a], h[a]
+        left = t_out[nxt[a]] - ta
+        hit = ha >= left
+        he = np.where(hit, left, ha)[:, None]
+        K = [F[a]]
+        for row in _DP_A[1:]:
+            K.append(f(y + he * sum(c * k for c, k in zip(row, K))))
+        y_new = y + he * sum(c * k for c, k in zip(_DP_B, K) if c)
+        K.append(f(y_new))
+        nfev += 6 * a.size
+        scale = atol + rtol * np.maximum(np.abs(y), np.abs(y_new))
+        err = _rms(he * sum(c * k for c, k in zip(_DP_E, K) if c) / scale)
+        err = np.where(np.isfinite(err), err, np.inf)
+        ok = err <= 1.0
+        factor = np.clip(0.9 * np.maximum(err, 1e-10) ** -0.2, 0.2, 10.0)
+        he = he[:, 0]
+
+        acc = a[ok]
+        S[acc], F[acc] = y_new[ok], K[-1][ok]
+        t[acc] = np.where(hit[ok], t_out[nxt[acc]], ta[ok] + he[ok])
+        got = acc[hit[ok]]
+        snaps[nxt[got], got] = S[got]
+        nxt[got] += 1
+        # 출력 시각에 맞춰 자른 스텝은 원래 제안 스텝을 잃지 않게
+        h[a] = np.where(ok & hit, np.maximum(he * factor, ha), he * factor)
+        steps[a] += ok
+        rejected[a] += ~ok
+
+        tiny = h[a] < 1e-14 * np.maximum(1.0, np.abs(t[a]))
+        status[a[tiny]] = "h_min"
+        over = steps[a] + rejected[a] > max_steps
+        status[a[over & ~tiny]] = "max_steps"
+        active = a[(nxt[a] < t_out.size) & ~tiny & ~over]
+    count("ensemble.accepted_steps", int(steps.sum()))
+    count("ensemble.rejected_steps", int(rejected.sum()))
+    count("rhs_evals", int(nfev))
+    return t_out, snaps, {"steps": steps, "rejected": rejected, "status": status.astype(str)}
+
+def ensemble_stream(S0, t_max, dt, G=1.0, masses=(1.0,1.0,1.0), chunk=256, delta0=1e-8):
+    """고정 스텝 RK4 배치 적분을 청크 단위로 흘려보내는 생성기 (dt 격자 샘플이 필요한 폐루프용).
+
+    각 계에 δ0만큼 떨어진 그림자 궤적을 함께 적분하고 매 스텝 재규격화해(Benettin)
+    유한 시간 Lyapunov 지수를 누적한다. 청크마다 (t (n,), drift (M,n), lyap (M,n)) 를 낸다:
+    drift = (E − E₀)/|E₀|, lyap = Σ log(d/δ0) / t (t까지의 추정치).
+    """
+    m = np.asarray(masses, float)
+    S = np.array(S0, float, copy=True)
+    M = S.shape[0]
+    # 그림자: 위치 첫 성분만 δ0 이동 (방향은 곧 최대 성장 방향으로 정렬됨)
+    S = np.concatenate([S, S])
+    S[M:, 0] += delta0
+    E0 = ensemble_energy(S[:M], G, m)
+    n_steps = int(round(t_max / dt))
+    f = lambda s: rhs_batch(0.0, s, G, m)
+    log_sum = np.zeros(M)
+    n = 0
+    while n < n_steps:
+        k = min(chunk, n_steps - n)
+        snaps = np.empty((k, M, S.shape[1]))
+        lyap = np.empty((M, k))
+        for j in range(k):
+            k1 = f(S)
+            k2 = f(S + 0.5 * dt * k1)
+            k3 = f(S + 0.5 * dt * k2)
+            k4 = f(S + dt * k3)
+            S += (dt / 6.0) * (k1 + 2.0 * k2 + 2.0 * k3 + k4)
+            d = S[M:] - S[:M]
+            dist = np.sqrt(np.einsum("ij,ij->i", d, d)) + 1e-300
+            log_sum += np.log(dist / delta0)
+            S[M:] = S[:M] + d * (delta0 / dist)[:, None]
+            snaps[j] = S[:M]
+            lyap[:, j] = log_sum / ((n + j + 1) * dt)
+        E = ensemble_energy(snaps.reshape(k * M, -1), G, m).reshape(k, M).T
+        count("ensemble.steps", k)
+        t = (n + 1 + np.arange(k)) * dt
+        n += k
+        yield t, (E - E0[:, None]) / (np.abs(E0[:, None]) + 1e-15), lyap
+
+# ---------------- 궤적 진단 ----------------
+def total_energy_batch(Y, G=1.0, masses=(1.0,1.0,1.0), chunk=4096, invariants=False,
+                       eps=EPS):
+    """(6N, T) 궤적 전체의 에너지를 청크 단위로 계산 → (T,)
+
+    청크당 메모리는 O(N²·chunk)로 고정 (N > DIRECT_BLOCK 이면 퍼텐셜은 샘플별
+    블록 계산으로 O(N·block)). invariants=True면 같은 패스에서
+    각운동량 L (T,3)과 질량중심 com (T,3)도 함께 반환한다: (E, L, com)
+    """
+    m = np.asarray(masses, float)
+    N = m.size
+    Y = np.asarray(Y, float)
+    if Y.ndim != 2 or Y.shape[0] != 6 * N:
+        raise ValueError(f"trajectory must have shape (6N, T) = ({6*N}, T), got {Y.shape}")
+    T = Y.shape[1]
+    if N > DIRECT_BLOCK:
+        chunk = min(chunk, 64)
+    else:
+        iu = np.triu_indices(N, k=1)
+        mm = m[iu[0]] * m[iu[1]]
+    E = np.empty(T)
+    if invariants:
+        L = np.empty((T, 3)); com = np.empty((T, 3))
+    for a in range(0, T, chunk):
+        b = min(a + chunk, T)
+        pos = Y[:3*N, a:b].reshape(N, 3, b - a)
+        vel = Y[3*N:, a:b].reshape(N, 3, b - a)
+        K = 0.5 * np.einsum("j,jkt,jkt->t", m, vel, vel)
+        if N > DIRECT_BLOCK:
+            U = np.array([potential_energy(pos[:, :, i].T, G, m, eps) for i in range(b - a)])
+        else:
+            dr = pos[iu[0]] - pos[iu[1]]  # (pairs,3,c)
+            r = np.sqrt(np.einsum("pkt,pkt->pt", dr, dr) + eps)
+            U = -G * np.einsum("p,pt->t", mm, 1.0 / r)
+        E[a:b] = K + U
+        if invariants:
+            L[a:b] = np.einsum("j,jkt->tk", m, np.cross(pos, vel, axis=1))
+            com[a:b] = np.einsum("j,jkt->tk", m, pos) / m.sum()
+    return (E, L, com) if invariants else E
+
+def drift_diagnostics(Y, G=1.0, masses=(1.0,1.0,1.0), t=None, chunk=4096, eps=EPS):
+    """에너지 상대 드리프트 + 각운동량/질량중심 드리프트 (한 번의 패스)
+
+    t가 주어지면 초기 총운동량에 의한 질량중심의 등속 이동을 빼고 비교한다.
+    """
+    m = np.asarray(masses, float)
+    E, L, com = total_energy_batch(Y, G, m, chunk, invariants=True, eps=eps)
+    v_com = _com_velocity(Y[:, 0], m) if t is not None else None
+    return _drifts(E, L, com, v_com, t)
+
+def _com_velocity(s, masses):
+    N = masses.size
+    return np.einsum("j,jk->k", masses, np.asarray(s[3*N:], float).reshape(N, 3)) / masses.sum()
+
+def _drifts(E, L, com, v_com=None, t=None):
+    L0 = L[0]
+    com_ref = np.broadcast_to(com[0], com.shape)
+    if v_com is not None:
+        com_ref = com[0] + np.asarray(t, float)[:, None] * v_com
+    return {
+        "energy": (E - E[0]) / (abs(E[0]) + 1e-15),
+        "angular_momentum": np.linalg.norm(L - L0, axis=1) / (np.linalg.norm(L0) + 1e-15),
+        "com": np.linalg.norm(com - com_ref, axis=1),
+    }
+
+DIAG_KEYS = ("energy", "angular_momentum", "com")
+
+# ---------------- 스트리밍 출력 ----------------
+CSV_MAX_VALUES = 2_000_000  # output="auto": 샘플×상태 값 수가 이보다 크면 .npy 스트리밍
+
+def integrate_chunks(s0, t_max, dt, G=1.0, masses=(1.0,1.0,1.0), integrator="dop853",
+                     force=None, chunk=4096, dense=False, tol=None, events=None, encounter=None):
+    """[0, t_max]의 dt 격자를 chunk 샘플씩 나눠 적분하는 생성기 → (t0, t_seg, Y_seg, sol)
+
+    첫 청크는 t=0 샘플을 포함하고, 이후 청크는 앞 청크 끝 상태에서 이어 적분한다.
+    t0는 청크 적분의 시작 시각 (sol.t_events는 이 기준), sol은 t_max=0이면 None.
+    tol: {"rtol", "atol"} — 소비 쪽이 도중에 바꾸면 다음 청크부터 적용된다.
+    """
+    tol = {"rtol": 1e-9, "atol": 1e-12} if tol is None else tol
+    m = np.asarray(masses, float)
+    n_samples = int(round(t_max / dt)) + 1
+    s = np.asarray(s0, float)
+    k = 0  # 지금까지 낸 스텝 인덱스
+    while k < n_samples:
+        last = min(k + chunk, n_samples) - 1  # 이번 청크의 마지막 스텝
+        t0 = max(k - 1, 0) * dt
+        sol = None
+        if k == 0:
+            t_seg, Y_seg = np.array([0.0]), s[:, None]
+            if last > 0:
+                sol = integrate(s, last * dt, dt, G, m, integrator=integrator, force=force,
+                                dense=dense, events=events, encounter=encounter, **tol)
+                t_seg, Y_seg = sol.t, sol.y
+        else:
+            sol = integrate(s, (last - k + 1) * dt, dt, G, m, integrator=integrator, force=force,
+                            dense=dense, events=events, encounter=encounter, **tol)
+            t_seg, Y_seg = sol.t[1:] + t0, sol.y[:, 1:]
+        yield t0, t_seg, Y_seg, sol
+        s = Y_seg[:, -1].copy()
+        k = last + 1
+
+def _observe(observer, E, E0, t_seg, tol=None, tighten=0.1):
+    """청크 에너지 E를 상대 드리프트로 바꿔 DTG 관측기에 넘김. θ가 bounds를 처음 벗어나면
+    tol(rtol/atol)에 tighten을 곱해 이후 청크 적분을 조인다 (tol이 없으면 θ만 갱신)"""
+    if observer.update((E - E0) / (abs(E0) + 1e-15), t=t_seg) and tol is not None and tighten:
+        tol["rtol"], tol["atol"] = max(tol["rtol"] * tighten, 1e-14), max(tol["atol"] * tighten, 1e-16)
+        print(f"[DTG] θ left {observer.bounds} at t={observer.t_cross:.4f} "
+              f"→ rtol={tol['rtol']:.1e}, atol={tol['atol']:.1e}")
+
+def stream_trajectory(s0, t_max, dt, path, G=1.0, masses=(1.0,1.0,1.0),
+                      integrator="dop853", force=None, eps=EPS,
+                      float32=False, decimate=1, chunk=4096, meta=None,
+                      dense=False, rtol=1e-9, atol=1e-12, encounter=None, observer=None,
+                      tighten=0.1):
+    """궤적을 chunk 샘플 단위로 적분하며 .npy memmap에 바로 기록.
+
+    전체 sol.y를 메모리에 두지 않고, 드리프트 진단(에너지/각운동량/질량중심)은
+    각 청크에서 전체 해상도로 누적한다. 반환: (t, diag)
+    observer(DTGObserver)가 있으면 청크마다 에너지 드리프트를 넘겨 θ를 실시간 갱신하고,
+    θ가 bounds를 벗어나면 이후 청크의 rtol/atol에 tighten을 곱한다 (dop853).
+    """
+    from trajectory_io import TrajectoryWriter
+    m = np.asarray(masses, float)
+    n_samples = int(round(t_max / dt)) + 1
+    meta = dict(meta or {}, masses=m.tolist(), dt=dt, t_max=t_max, integrator=integrator)
+    Es, Ls, coms = [], [], []
+    s = np.asarray(s0, float)
+    v_com = _com_velocity(s, m)
+    tol = {"rtol": rtol, "atol": atol}
+    with TrajectoryWriter(path, n_samples, s.size, np.float32 if float32 else np.float64,
+                          decimate, meta) as w:
+        for _, t_seg, Y_seg, _ in integrate_chunks(s, t_max, dt, G, m, integrator, force, chunk,
+                                                   dense, tol, encounter=encounter):
+            with timer("stream.write"):
+                w.write(t_seg, Y_seg)
+            with timer("run.diagnostics"):
+                E, L, com = total_energy_batch(Y_seg, G, m, invariants=True, eps=eps)
+            Es.append(E); Ls.append(L); coms.append(com)
+            if observer is not None:
+                _observe(observer, E, Es[0][0], t_seg, tol, tighten)
+    t = np.arange(n_samples) * dt
+    return t, _drifts(np.concatenate(Es), np.concatenate(Ls), np.concatenate(coms), v_com, t)
 
 # ---------------- 초기조건 ----------------
 def make_ic(mode="exp1", alpha=1.0):
@@ -79,10 +1085,51 @@ def make_ic(mode="exp1", alpha=1.0):
     vel *= alpha
     return pack_state(pos, vel)
 
+def make_cluster(n_bodies=1000, alpha=1.0, seed=0, r_max=10.0):
+    """Plummer 구 IC (Hénon 단위: G=1, 총질량 1) → (s0, masses)"""
+    rng = np.random.default_rng(seed)
+    N = int(n_bodies)
+    r = np.empty(0)
+    while r.size < N:
+        u = rng.uniform(1e-10, 1.0, size=2 * N)
+        cand = 1.0 / np.sqrt(u ** (-2.0 / 3.0) - 1.0)
+        r = np.concatenate([r, cand[cand < r_max]])
+    r = r[:N]
+    def iso(n):
+        c = rng.uniform(-1.0, 1.0, n); ph = rng.uniform(0.0, 2*np.pi, n)
+        sn = np.sqrt(1.0 - c * c)
+        return np.vstack([sn * np.cos(ph), sn * np.sin(ph), c])
+    # 속도 크기: g(q) = q²(1-q²)^3.5 에서 기각 샘플링
+    q = np.empty(0)
+    while q.size < N:
+        x = rng.uniform(0.0, 1.0, 2 * N); y = rng.uniform(0.0, 0.1, 2 * N)
+        q = np.concatenate([q, x[y < x * x * (1.0 - x * x) ** 3.5]])
+    v = q[:N] * np.sqrt(2.0) * (1.0 + r * r) ** (-0.25)
+    pos = iso(N) * r * (3 * np.pi / 16)
+    vel = iso(N) * v / np.sqrt(3 * np.pi / 16)
+    masses = np.full(N, 1.0 / N)
+    pos -= (pos @ masses)[:, None]
+    vel -= (vel @ masses)[:, None]
+    return pack_state(pos, vel * alpha), masses
+
+def make_system(mode="exp1", alpha=1.0, n_bodies=None, seed=0):
+    """IC + 질량: 3체 모드는 질량 1, 'plummer'는 N체 클러스터 → (s0, masses)"""
+    if mode == "plummer":
+        return make_cluster(n_bodies or 1000, alpha, seed)
+    return make_ic(mode, alpha), np.array([1.0,1.0,1.0])
+
+def make_ic_ensemble(modes, alphas):
+    """(mode × alpha) 격자 IC 배치 생성 → (labels, (M, 6N))"""
+    labels = [(mode, float(a)) for mode in modes for a in alphas]
+    S0 = np.stack([make_ic(mode, a) for mode, a in labels])
+    return labels, S0
+
 # ---------------- 좌표 추출 ----------------
-def positions_from_sol(sol, N=3):
-    """sol.y에서 위치만 안전하게 추출"""
+def positions_from_sol(sol, N=None):
+    """sol.y에서 위치만 안전하게 추출 → x, y, z 각각 (N, T)"""
     Y = np.asarray(sol.y, float)
+    if N is None:
+        N = Y.shape[0] // 6
     rows = np.arange(N)
     x_rows = 3*rows + 0
     y_rows = 3*rows + 1
@@ -90,108 +1137,553 @@ def positions_from_sol(sol, N=3):
     return Y[x_rows], Y[y_rows], Y[z_rows]
 
 # ---------------- 실행 ----------------
-def run(ic_mode, alpha, t_max, dt, out_root):
-    masses = np.array([1.0,1.0,1.0])
-    s0 = make_ic(ic_mode, alpha)
-    t_eval = np.arange(0.0, t_max + 1e-12, dt)
+def run(ic_mode, alpha, t_max, dt, out_root, integrator="dop853",
+        n_bodies=None, force="direct", theta=0.5, eps=EPS,
+        output="auto", float32=False, decimate=1, dense=False, rtol=1e-9, atol=1e-12,
+        plot="inline", plot_points=LOD_POINTS, cache=None,
+        encounter_radius=ENCOUNTER_RADIUS, escape_radius=ESCAPE_RADIUS,
+        terminate=False, collision_radius=COLLISION_RADIUS, drift_tol=DRIFT_TOL,
+        observer=None):
+    """단일 실행. output: csv | npy(스트리밍 memmap) | auto(큰 실행은 npy)
 
-    sol = solve_ivp(lambda t,s: rhs(t,s,1.0,masses),
-                    (0.0, t_max), s0, t_eval=t_eval,
-                    method="DOP853", rtol=1e-9, atol=1e-12)
+    dense=True면 dop853이 채택 스텝만 저장하고 dt 격자로 보간한다(dt는 출력 간격).
+    plot: inline(바로 렌더) | defer(.fig.npz만 저장, render_queue.py로 나중에) | off
+    plot_points: 그림용 시계열당 최대 점 수 (min/max 보존 다운샘플)
+    cache: SimCache면 같은 파라미터 + KERNEL_VERSION 결과를 재사용 (궤적 + 진단)
+    encounter_radius / escape_radius: 근접 조우·탈출 통계 기준 (dop853은 solve_ivp 이벤트로도 검출)
+    terminate=True면 탈출/충돌/드리프트(collision_radius, drift_tol)에서 적분을 멈추고
+    결과 분류를 출력한다 (csv 출력만, dense 무시).
+    고정 스텝 적분(FIXED_STEP_SCHEMES)은 최대 드리프트가 drift_tol을 넘으면 경고한다 (dt가 너무 큼).
+    반환: (t, drift, (결과, 종료 시각)) — terminate가 아니면 결과는 항상 ("bound", t_max)
+    force="bh" + dop853은 rtol을 BH_RTOL 이상으로 올린다 (트리 근사 오차가 정확도를 정함).
+    observer: DTGObserver면 적분 청크마다 에너지 드리프트로 θ를 갱신 (bounds를 벗어나면 이후
+    청크의 dop853 허용오차 강화). 예외: terminate + dop853(종료 이벤트로 한 번에 적분)은 적분 직후,
+    캐시 적중은 저장된 드리프트로 한 번에 갱신
+    """
+    s0, masses = make_system(ic_mode, alpha, n_bodies)
+    N = masses.size
+    f = resolve_force(force, theta, eps)
+    if force == "bh" and integrator == "dop853" and rtol < BH_RTOL:
+        print(f"[NOTE] --force bh: rtol {rtol:g} → {BH_RTOL:g}, atol {atol:g} → {max(atol, BH_RTOL * 1e-3):g} "
+              f"(tree force error dominates; tighter tolerances only reject steps)")
+        rtol, atol = BH_RTOL, max(atol, BH_RTOL * 1e-3)
+    label = ic_mode if ic_mode != "plummer" else f"plummer{N}"
+    if terminate:
+        if output == "npy":
+            raise ValueError("terminate needs csv output (npy streaming fixes the sample count)")
+        output = "csv"
+    if output == "auto":
+        n_values = (int(round(t_max / dt)) + 1) * 6 * N
+        output = "csv" if n_values <= CSV_MAX_VALUES else "npy"
+
+    data_path = os.path.join(out_root, "data", f"threebody3d_{label}_a{alpha}.npy")
+    enc = EncounterStats(masses, encounter_radius, escape_radius)
+    key = hit = None
+    outcome = ("bound", float(t_max))
+    if cache is not None:
+        key = cache_key("three_body_3d.run", {
+            "ic": ic_mode, "alpha": alpha, "n_bodies": N, "t_max": t_max, "dt": dt,
+            "integrator": integrator, "force": force, "theta": theta if force == "bh" else None,
+            "eps": eps, "dense": dense, "rtol": rtol, "atol": atol, "output": output,
+            "float32": float32 if output == "npy" else False,
+            "decimate": decimate if output == "npy" else 1,
+            "terminate": [escape_radius, collision_radius, drift_tol] if terminate else None,
+        }, KERNEL_VERSION)
+        hit = cache.get(key)
+        count("cache.hits" if hit is not None else "cache.misses")
+
+    if hit is not None:
+        # 캐시 적중: 적분 생략, 저장된 궤적 행 [t, 상태]와 드리프트 진단 사용
+        traj, t = hit["traj"], hit["t"]
+        diag = {k: hit[k] for k in DIAG_KEYS}
+        if output == "npy":
+            from trajectory_io import TrajectoryWriter, open_trajectory
+            with TrajectoryWriter(data_path, traj.shape[0], traj.shape[1] - 1, traj.dtype, 1,
+                                  dict(hit["meta"], cached=True)) as w:
+                w.write(traj[:, 0], traj[:, 1:].T)
+            sol = open_trajectory(data_path)
+        else:
+            sol = IntegrationResult(traj[:, 0], traj[:, 1:].T, 0, integrator)
+        outcome = tuple(hit["meta"].get("outcome", outcome))
+        print(f"[CACHE] hit {key[:12]}")
+    elif output == "npy":
+        # 청크 스트리밍 → memmap 리더로 다시 열어 플롯
+        from trajectory_io import open_trajectory
+        t, diag = stream_trajectory(s0, t_max, dt, data_path, 1.0, masses, integrator, f, eps,
+                                    float32, decimate,
+                                    meta={"ic": ic_mode, "alpha": alpha, "N": N},
+                                    dense=dense, rtol=rtol, atol=atol, encounter=enc,
+                                    observer=observer)
+        sol = open_trajectory(data_path)
+    elif terminate:
+        sol, *outcome = integrate_until(s0, t_max, dt, 1.0, masses, integrator, rtol, atol, f,
+                                        escape_radius, collision_radius, drift_tol, encounter=enc,
+                                        observer=observer)
+        t = sol.t
+        with timer("run.diagnostics"):
+            diag = drift_diagnostics(sol.y, 1.0, masses, t=sol.t, eps=eps)
+    else:
+        ev_names, events = ([], None)
+        if integrator == "dop853" and enc.active:
+            ev_names, events = encounter_events(masses, encounter_radius, escape_radius)
+        # npy 스트리밍과 같은 청크 적분을 메모리에 모음 → DTG 관측기는 청크마다 실시간 갱신
+        ts, Ys, nfev, E0 = [], [], 0, None
+        tol = {"rtol": rtol, "atol": atol}
+        for t0, t_seg, Y_seg, part in integrate_chunks(s0, t_max, dt, 1.0, masses, integrator,
+                                                       f, dense=dense, tol=tol,
+                                                       events=events or None, encounter=enc):
+            if part is not None:
+                nfev += int(part.nfev)
+                enc.record_events(ev_names, getattr(part, "t_events", None), t0)
+            if observer is not None:
+                with timer("run.diagnostics"):
+                    E = total_energy_batch(Y_seg, 1.0, masses, eps=eps)
+                E0 = E[0] if E0 is None else E0
+                _observe(observer, E, E0, t_seg, tol)
+            ts.append(t_seg); Ys.append(Y_seg)
+        sol = IntegrationResult(np.concatenate(ts), np.concatenate(Ys, axis=1), nfev, integrator)
+        t = sol.t
+        with timer("run.diagnostics"):
+            diag = drift_diagnostics(sol.y, 1.0, masses, t=sol.t, eps=eps)
+
+    if key is not None and hit is None:
+        traj = sol.data[:sol.t.size] if output == "npy" else np.column_stack([sol.t, sol.y.T])
+        with timer("run.cache_put"):
+            cache.put(key, meta={"ic": ic_mode, "alpha": alpha, "N": N, "masses": masses.tolist(),
+                                 "dt": dt, "t_max": t_max, "integrator": integrator,
+                                 "outcome": list(outcome)},
+                      traj=traj, t=t, **{k: diag[k] for k in DIAG_KEYS})
+
+    if observer is not None and hit is not None:   # 캐시 적중: 적분이 없으므로 저장된 드리프트를 한 번에
+        observer.update(diag["energy"], t=t)
 
     # 위치 추출
-    x, y, z = positions_from_sol(sol, N=3)
-    x1,y1,z1 = x[0], y[0], z[0]
-    x2,y2,z2 = x[1], y[1], z[1]
-    x3,y3,z3 = x[2], y[2], z[2]
-
-    # CSV 저장
-    df = pd.DataFrame({"t": sol.t,
-                       "x1": x1,"y1": y1,"z1": z1,
-                       "x2": x2,"y2": y2,"z2": z2,
-                       "x3": x3,"y3": y3,"z3": z3})
-    csv_path = os.path.join(out_root, "data", f"threebody3d_{ic_mode}_a{alpha}.csv")
-    os.makedirs(os.path.dirname(csv_path), exist_ok=True)
-    df.to_csv(csv_path, index=False)
+    x, y, z = positions_from_sol(sol, N=N)
+
+    if output != "npy":
+        # CSV 저장 (decimate 적용)
+        sl = slice(None, None, max(1, int(decimate)))
+        cols = {"t": sol.t[sl]}
+        for i in range(N):
+            cols[f"x{i+1}"], cols[f"y{i+1}"], cols[f"z{i+1}"] = x[i][sl], y[i][sl], z[i][sl]
+        import pandas as pd
+        df = pd.DataFrame(cols)
+        data_path = os.path.join(out_root, "data", f"threebody3d_{label}_a{alpha}.csv")
+        os.makedirs(os.path.dirname(data_path), exist_ok=True)
+        with timer("run.write_csv"):
+            df.to_csv(data_path, index=False)
+    count_bytes(data_path)
+    count("samples", int(t.size))
 
-    # 3D 경로 플롯
+    # 3D 경로 플롯 (큰 N은 앞쪽 MAX_PLOT_BODIES개만) + 에너지 드리프트 (+ 각운동량/질량중심)
+    k = min(N, MAX_PLOT_BODIES)
+    drift = diag["energy"]
+    # 그림에는 min/max 보존 LOD만 넘김 (전체 해상도는 위 CSV/.npy에 저장됨)
+    ip = lod_indices(np.concatenate([x[:k], y[:k], z[:k]]), plot_points)
+    idr = lod_indices(drift, plot_points)
+    fig_path = os.path.join(out_root, "figures", f"threebody3d_{label}_a{alpha}.png")
+    drift_path = os.path.join(out_root, "figures", f"energy_drift_{label}_a{alpha}.png")
+    title = f"3D {'Three' if N == 3 else N}-Body (ic={ic_mode}, α={alpha})"
+    with timer("run.plots"):
+        fig_out = submit("three_body_3d:render_trajectory3d", fig_path, plot,
+                         meta={"title": title}, x=x[:k, ip], y=y[:k, ip], z=z[:k, ip])
+        drift_out = submit("three_body_3d:render_drift", drift_path, plot,
+                           t=t[idr], drift=drift[idr])
+
+    print(f"[OK] {output.upper():<5}: {data_path}")
+    if plot != "off":
+        print(f"[OK] FIG  : {fig_out or fig_path + ' (unchanged)'}")
+        print(f"[OK] DRIFT: {drift_out or drift_path + ' (unchanged)'}")
+    print(f"[DIAG] |ΔE/E|max={np.max(np.abs(drift)):.3e}  "
+          f"|ΔL|/|L|max={np.max(diag['angular_momentum']):.3e}  "
+          f"|Δcom|max={np.max(diag['com']):.3e}")
+    if integrator in FIXED_STEP_SCHEMES and drift_tol and np.max(np.abs(drift)) > drift_tol:
+        count("warn.fixed_step_drift")
+        print(f"[WARN] fixed-step {integrator} at dt={dt:g}: |ΔE/E|max={np.max(np.abs(drift)):.1e} "
+              f"> drift_tol={drift_tol:g} — dt too large for this IC's close encounters; "
+              f"reduce --dt or use --integrator dop853")
+    if enc.active and enc.steps:
+        e = enc.to_dict()
+        enc.publish()
+        print(f"[ENC] steps={e['steps']}  in-encounter={e['encounter_steps']} "
+              f"({e['encounter_step_frac']:.1%}, {e['encounters']} encounter(s), "
+              f"t={e['encounter_time']:.3f})  r_min={e['r_min'] or float('nan'):.3e}  "
+              f"escape t={e['t_escape']}")
+    if terminate:
+        print(f"[OUTCOME] {outcome[0]} at t={outcome[1]:.4f} (t_max={t_max})")
+    return t, drift, tuple(outcome)
+
+def render_trajectory3d(out_path, x, y, z, title=""):
+    """x, y, z (k, T) → 3D 경로 그림"""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
     fig = plt.figure(figsize=(7,6))
     ax = fig.add_subplot(111, projection="3d")
-    ax.plot(x1,y1,z1,label="Body 1")
-    ax.plot(x2,y2,z2,label="Body 2")
-    ax.plot(x3,y3,z3,label="Body 3")
+    for i in range(x.shape[0]):
+        ax.plot(x[i], y[i], z[i], label=f"Body {i+1}")
     ax.set_xlabel("X"); ax.set_ylabel("Y"); ax.set_zlabel("Z")
-    ax.set_title(f"3D Three-Body (ic={ic_mode}, α={alpha})")
+    ax.set_title(title)
     ax.legend()
-    fig_path = os.path.join(out_root, "figures", f"threebody3d_{ic_mode}_a{alpha}.png")
-    os.makedirs(os.path.dirname(fig_path), exist_ok=True)
-    fig.savefig(fig_path, dpi=160)
+    fig.savefig(out_path, dpi=160)
     plt.close(fig)
 
-    # 에너지 드리프트
-    E0 = total_energy(sol.y[:,0], 1.0, masses)
-    E  = np.array([total_energy(sol.y[:,i], 1.0, masses)
-                   for i in range(sol.y.shape[1])])
-    drift = (E - E0) / (abs(E0) + 1e-15)
+def render_drift(out_path, t, drift):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
     plt.figure(figsize=(7,4))
-    plt.plot(sol.t, drift)
+    plt.plot(t, drift)
     plt.xlabel("Time"); plt.ylabel("Relative Energy Drift")
     plt.title("Total Energy Drift (lower is better)")
-    drift_path = os.path.join(out_root, "figures", f"energy_drift_{ic_mode}_a{alpha}.png")
-    os.makedirs(os.path.dirname(drift_path), exist_ok=True)
-    plt.savefig(drift_path, dpi=160)
+    plt.savefig(out_path, dpi=160)
     plt.close()
 
-    print(f"[OK] CSV  : {csv_path}")
-    print(f"[OK] FIG  : {fig_path}")
-    print(f"[OK] DRIFT: {drift_path}")
-    return sol.t, drift
+def run_ensemble(ic_modes, alphas, t_max, dt, out_root, rtol=1e-9, atol=1e-12,
+                 drift_tol=DRIFT_TOL):
+    """IC × alpha 격자 전체를 한 번의 배치 적분으로 실행하고 요약 CSV 저장
+
+    계마다 정확도 점검을 CSV에 남긴다: 채택/기각 스텝 수, 적분 상태(status), 최종 에너지
+    드리프트. 적분이 t_max에 못 미쳤거나 |ΔE/E₀| > drift_tol이면 flagged=True + 경고.
+    """
+    masses = np.array([1.0,1.0,1.0])
+    labels, S0 = make_ic_ensemble(ic_modes, alphas)
+    with timer("ensemble.integrate"):
+        t, Y, info = integrate_ensemble(S0, t_max, dt, 1.0, masses, rtol=rtol, atol=atol)
+
+    E0 = ensemble_energy(Y[0], 1.0, masses)
+    E1 = ensemble_energy(np.nan_to_num(Y[-1]), 1.0, masses)
+    drift = np.where(info["status"] == "ok", (E1 - E0) / (np.abs(E0) + 1e-15), np.nan)
+    flagged = (info["status"] != "ok") | (np.abs(drift) > drift_tol if drift_tol else False)
+
+    import pandas as pd
+    df = pd.DataFrame({"ic": [l[0] for l in labels],
+                       "alpha": [l[1] for l in labels],
+                       "E0": E0, "E_final": np.where(info["status"] == "ok", E1, np.nan),
+                       "drift_final": drift, "steps": info["steps"],
+                       "rejected": info["rejected"], "status": info["status"],
+                       "flagged": flagged})
+    csv_path = os.path.join(out_root, "data", f"ensemble_M{len(labels)}_t{t_max}_dt{dt}.csv")
+    os.makedirs(os.path.dirname(csv_path), exist_ok=True)
+    df.to_csv(csv_path, index=False)
+
+    print(f"[OK] ENSEMBLE: M={len(labels)}, steps={int(info['steps'].sum())} "
+          f"(max {int(info['steps'].max())}/system) → {csv_path}")
+    if flagged.any():
+        bad = ", ".join(f"{ic}/α={a:g}({s})" for (ic, a), s, fl
+                        in zip(labels, info["status"], flagged) if fl)
+        print(f"[WARN] {int(flagged.sum())}/{len(labels)} system(s) over tolerance "
+              f"(status≠ok or |ΔE/E|>{drift_tol:g}): {bad}")
+    return labels, drift
 
 # ---------------- Lyapunov ----------------
 def lyapunov_estimate(s0, rhs, tmax=20.0, dt=0.01, delta0=1e-8,
-                      G=1.0, masses=(1.0,1.0,1.0)):
+                      G=1.0, masses=(1.0,1.0,1.0), integrator="dop853", force=None,
+                      dense=False):
+    if force is not None:
+        rhs_ = rhs
+        rhs = lambda t,s,G,m: rhs_(t,s,G,m,force)
     rng = np.random.default_rng(0)
     v = rng.normal(size=s0.size); v /= np.linalg.norm(v)
     s1, s2 = s0.copy(), s0 + delta0 * v
     t_eval = np.arange(0.0, tmax + 1e-12, dt)
-    sol1 = solve_ivp(lambda t,s: rhs(t,s,G,masses),
-                     (0,tmax), s1, t_eval=t_eval, method="DOP853")
-    sol2 = solve_ivp(lambda t,s: rhs(t,s,G,masses),
-                     (0,tmax), s2, t_eval=t_eval, method="DOP853")
-    deltas = np.linalg.norm(sol2.y - sol1.y, axis=0)
+    from scipy.integrate import solve_ivp
+    with timer("lyapunov.integrate"):
+        if integrator == "dop853" and dense:
+            # 두 궤적을 각자 채택 스텝으로 적분하고 같은 격자에서 보간 비교
+            sol1 = solve_ivp(lambda t,s: rhs(t,s,G,masses), (0,tmax), s1,
+                             dense_output=True, method=_counting_dop853())
+            sol2 = solve_ivp(lambda t,s: rhs(t,s,G,masses), (0,tmax), s2,
+                             dense_output=True, method=_counting_dop853())
+            Y1, Y2 = sol1.sol(t_eval), sol2.sol(t_eval)
+        elif integrator == "dop853":
+            sol1 = solve_ivp(lambda t,s: rhs(t,s,G,masses),
+                             (0,tmax), s1, t_eval=t_eval, method=_counting_dop853())
+            sol2 = solve_ivp(lambda t,s: rhs(t,s,G,masses),
+                             (0,tmax), s2, t_eval=t_eval, method=_counting_dop853())
+            Y1, Y2 = sol1.y, sol2.y
+        else:
+            sol1 = integrate(s1, tmax, dt, G, masses, integrator=integrator, force=force)
+            sol2 = integrate(s2, tmax, dt, G, masses, integrator=integrator, force=force)
+            n = min(sol1.t.size, sol2.t.size)
+            t_eval, Y1, Y2 = sol1.t[:n], sol1.y[:, :n], sol2.y[:, :n]
+    if integrator == "dop853":   # 나머지는 integrate()가 이미 셈
+        count("rhs_evals", int(sol1.nfev + sol2.nfev))
+    deltas = np.linalg.norm(Y2 - Y1, axis=0)
     return np.polyfit(t_eval[1:], np.log(deltas[1:] + 1e-30), 1)[0]
 
+def lyapunov_benettin(s0, tmax=20.0, tau=1.0, delta0=1e-8,
+                      G=1.0, masses=(1.0,1.0,1.0), rtol=1e-9, atol=1e-12, force=None):
+    """Benettin 재규격화 추정: 기준/교란 궤적을 하나의 증강 상태로 적분하고
+    τ마다 교란 거리를 δ₀로 되돌리며 log 성장률을 누적한다.
+
+    반환: (λ_max, t_k, λ_k) — λ_k는 재규격화 시점별 누적 추정치(수렴 확인용)
+    """
+    from scipy.integrate import solve_ivp
+    m = np.asarray(masses, float)
+    n = s0.size
+    rng = np.random.default_rng(0)
+    v = rng.normal(size=n); v /= np.linalg.norm(v)
+    y = np.concatenate([s0, s0 + delta0 * v])
+
+    def f(t, y):
+        return np.concatenate([rhs(t, y[:n], G, m, force), rhs(t, y[n:], G, m, force)])
+
+    n_seg = max(1, int(round(tmax / tau)))
+    log_sum, ts, lams = 0.0, [], []
+    for k in range(n_seg):
+        sol = solve_ivp(f, (k*tau, (k+1)*tau), y, method="DOP853", rtol=rtol, atol=atol)
+        y = sol.y[:, -1]
+        d = y[n:] - y[:n]
+        dist = np.linalg.norm(d)
+        log_sum += np.log(dist / delta0 + 1e-300)
+        y[n:] = y[:n] + d * (delta0 / dist)
+        ts.append((k+1)*tau); lams.append(log_sum / ((k+1)*tau))
+    return lams[-1], np.array(ts), np.array(lams)
+
+def lyapunov_spectrum(s0, tmax=20.0, tau=1.0, G=1.0, masses=(1.0,1.0,1.0),
+                      n_exp=None, rtol=1e-9, atol=1e-12):
+    """변분 방정식 + QR 재직교화로 Lyapunov 스펙트럼 계산.
+
+    상태와 접공간 기저 Q(6N×p)를 하나의 증강 시스템으로 적분한다:
+    δx' = δv, δv' = (∂a/∂x) δx. τ마다 QR 분해로 log|R_ii|를 누적.
+    반환: 내림차순 지수 배열 (p = n_exp, 기본 6N)
+    """
+    from scipy.integrate import solve_ivp
+    m = np.asarray(masses, float)
+    N = m.size
+    n = 6 * N
+    p = n if n_exp is None else int(n_exp)
+
+    def f(t, y):
+        pos, vel = unpack_state(y[:n], N=N)
+        acc = accelerations(pos, G, m)
+        Q = y[n:].reshape(n, p)
+        J = acceleration_jacobian(pos, G, m)
+        dQ = np.concatenate([Q[3*N:], J @ Q[:3*N]])
+        return np.concatenate([pack_state(vel, acc), dQ.ravel()])
+
+    y = np.concatenate([np.asarray(s0, float), np.eye(n)[:, :p].ravel()])
+    n_seg = max(1, int(round(tmax / tau)))
+    log_sum = np.zeros(p)
+    for k in range(n_seg):
+        sol = solve_ivp(f, (k*tau, (k+1)*tau), y, method="DOP853", rtol=rtol, atol=atol)
+        y = sol.y[:, -1].copy()
+        Q, R = np.linalg.qr(y[n:].reshape(n, p))
+        d = np.diag(R)
+        log_sum += np.log(np.abs(d) + 1e-300)
+        y[n:] = (Q * np.sign(d)).ravel()
+    return np.sort(log_sum / (n_seg * tau))[::-1]
+
 # ---------------- DTG ----------------
 def dtg_update(V_0, alpha, beta, lambda_, b, E_t, I_t, theta_t):
     return (1 - lambda_) * theta_t + lambda_ * (b + alpha * E_t - beta * I_t)
 
+class DTGObserver:
+    """온라인 DTG 임계값 관측기: θ ← (1−λ)θ + λ(b + α·E − β·I) 를 청크 단위로 갱신.
+
+    적분기가 내놓는 드리프트 청크 E (..., K) (와 Lyapunov 추정 I, 스칼라 또는 E에 브로드캐스트
+    되는 배열)를 받아 선형 점화식을 닫힌 꼴로 한 번에 진행한다:
+    θ_K = c^K θ₀ + λ Σ c^(K−1−j) u_j, c = 1−λ. dtg_update를 샘플마다 부르는 것과 같은 값이다.
+    앞쪽 축은 배치 (예: (ic, alpha) 쌍 M개 → E (M, K), θ (M,)).
+
+    bounds=(lo, hi)가 있으면 청크 안의 θ 궤적 전체를 (lfilter로) 계산해 처음 벗어난 시각을
+    t_cross에 남기고, update()가 그 청크에서 True를 반환한다 → 호출 쪽이 허용오차를 조인다.
+    record=True면 θ 궤적을 모두 보관한다 (.trace()).
+    """
+    def __init__(self, V_0=1.0, alpha=0.7, beta=0.5, lambda_=0.1, b=0.0, I=0.0,
+                 bounds=None, record=False):
+        self.theta = float(V_0)
+        self.alpha, self.beta, self.lambda_, self.b = alpha, beta, lambda_, b
+        self.I = I
+        self.bounds = bounds
+        self.record = record
+        self.t_cross = None
+        self.n = 0
+        self._trace = []
+
+    def _drive(self, E, I):
+        E = np.atleast_1d(np.asarray(E, float))
+        u = self.b + self.alpha * E - self.beta * np.asarray(self.I if I is None else I, float)
+        return np.broadcast_to(u, E.shape)
+
+    def series(self, E, I=None):
+        """청크 하나 진행하고 청크 안의 θ 궤적 (..., K) 반환"""
+        return self._series_u(self._drive(E, I))
+
+    def _series_u(self, u):
+        """이미 구동된 입력 u = b + αE − βI (..., K)로 θ 진행 (lfilter)"""
+        from scipy.signal import lfilter
+        c = 1.0 - self.lambda_
+        zi = np.broadcast_to(c * np.asarray(self.theta, float), u.shape[:-1])[..., None]
+        th, _ = lfilter([self.lambda_], [1.0, -c], u, axis=-1, zi=zi)
+        if self.record:
+            self._trace.append(th)
+        self.theta = th[..., -1]
+        self.n += u.shape[-1]
+        return th
+
+    def update(self, E, I=None, t=None):
+        """드리프트 청크 하나 반영. 반환: 이 청크에서 θ가 bounds를 처음 벗어났는지"""
+        u = self._drive(E, I)
+        K = u.shape[-1]
+        if K == 0:
+            return False
+        with timer("dtg.observer"):
+            if self.bounds is None and not self.record:
+                c = 1.0 - self.lambda_
+                w = c ** np.arange(K - 1, -1, -1)
+                self.theta = c ** K * self.theta + self.lambda_ * (u @ w)
+                self.n += K
+                return False
+            n0 = self.n
+            th = self._series_u(u)
+            if self.bounds is None or self.t_cross is not None:
+                return False
+            out = (th < self.bounds[0]) | (th > self.bounds[1])
+            out = out.reshape(-1, K).any(axis=0)
+            if not out.any():
+                return False
+            i = int(np.argmax(out))
+            self.t_cross = float(t[i]) if t is not None else n0 + i
+            return True
+
+    def trace(self):
+        return np.concatenate(self._trace, axis=-1) if self._trace else np.empty(0)
+
 # ---------------- 메인 ----------------
 def main():
     ap = argparse.ArgumentParser()
-    ap.add_argument("--ic", choices=["exp1","exp2","exp3","figure8"], default="exp1")
+    ap.add_argument("--ic", choices=["exp1","exp2","exp3","figure8","plummer"], default="exp1")
+    ap.add_argument("--n-bodies", type=int, default=1000, help="--ic plummer 일 때 입자 수 N")
+    ap.add_argument("--force", choices=FORCE_BACKENDS, default="direct",
+                    help="가속도 백엔드: direct(직접합) | bh(Barnes–Hut)")
+    ap.add_argument("--theta", type=float, default=0.5, help="Barnes–Hut 열림각 θ")
+    ap.add_argument("--eps", type=float, default=EPS, help="연화(softening) 길이²")
     ap.add_argument("--alpha", type=float, default=1.0)
     ap.add_argument("--tmax", type=float, default=10.0)
     ap.add_argument("--dt", type=float, default=0.01)
     ap.add_argument("--out", default=".")
     ap.add_argument("--lyap", action="store_true")
+    ap.add_argument("--output", choices=["auto","csv","npy"], default="auto",
+                    help="궤적 저장 형식 (auto: 큰 실행은 .npy 청크 스트리밍)")
+    ap.add_argument("--dense", action="store_true",
+                    help="dop853 dense output: 채택 스텝만 저장, dt는 출력/플롯 격자 간격")
+    ap.add_argument("--rtol", type=float, default=1e-9, help="dop853·앙상블 상대 허용오차 (정확도)")
+    ap.add_argument("--atol", type=float, default=1e-12, help="dop853·앙상블 절대 허용오차 (정확도)")
+    ap.add_argument("--float32", action="store_true", help=".npy 궤적을 float32로 저장")
+    ap.add_argument("--decimate", type=int, default=1, help="k 샘플마다 1개만 저장")
+    ap.add_argument("--lyap-method", choices=["fit","benettin","variational"], default="fit",
+                    help="fit: 두 궤적 log 거리 회귀 / benettin: τ 재규격화 / variational: QR 스펙트럼")
+    ap.add_argument("--tau", type=float, default=1.0, help="재규격화 간격 τ")
+    ap.add_argument("--delta0", type=float, default=1e-8, help="초기 교란 크기 δ₀")
+    add_backend_arg(ap, help="커널 백엔드 (기본: SIM_BACKEND 환경변수, 없으면 auto)")
+    ap.add_argument("--integrator", choices=INTEGRATORS, default="dop853",
+                    help="dop853(적응), 고정 스텝 심플렉틱 verlet/yoshida4/yoshida6/pefrl(dt = 스텝 크기, "
+                         "근접 조우가 있는 IC는 작은 dt 필요 — 드리프트가 --drift-tol을 넘으면 경고), "
+                         "logh/logh4(시간변환 정규화, dt = 첫 스텝)")
+    ap.add_argument("--ensemble", action="store_true",
+                    help="--ics × --alphas 격자를 배치 적분 (계별 적응 Dormand–Prince 5(4), "
+                         "--rtol/--atol, 허용오차 초과 계는 CSV flagged + 경고)")
+    ap.add_argument("--ics", default=None, help="앙상블용 IC 목록 (쉼표구분, 기본: --ic)")
+    ap.add_argument("--alphas", default=None, help="앙상블용 alpha 목록 (쉼표구분, 기본: --alpha)")
+    ap.add_argument("--encounter-radius", type=float, default=ENCOUNTER_RADIUS,
+                    help="근접 조우 판정 최소 쌍 거리 (0이면 통계 끔)")
+    ap.add_argument("--escape-radius", type=float, default=ESCAPE_RADIUS,
+                    help="탈출 판정 질량중심 거리 (0이면 끔)")
+    ap.add_argument("--terminate", action="store_true",
+                    help="탈출/충돌/드리프트 초과 시 적분 조기 종료 + 결과 분류")
+    ap.add_argument("--collision-radius", type=float, default=COLLISION_RADIUS,
+                    help="--terminate 충돌 판정 최소 쌍 거리 (0이면 끔)")
+    ap.add_argument("--drift-tol", type=float, default=DRIFT_TOL,
+                    help="에너지 드리프트 한도 |ΔE/E₀|: --terminate 중단 / 고정 스텝 경고 / 앙상블 flag "
+                         "(0이면 끔)")
+    ap.add_argument("--dtg-bounds", default=None,
+                    help="DTG θ 허용 구간 'lo,hi' — 적분 청크마다 검사, 벗어나면 알림 + 이후 청크의 dop853 "
+                         "허용오차 강화 (--terminate + dop853은 적분 후 검사만)")
+    add_plot_args(ap)
+    ap.add_argument("--plot-points", type=int, default=LOD_POINTS,
+                    help="그림용 천체당 최대 점 수 (min/max 보존 다운샘플, 0이면 전체)")
+    add_cache_args(ap)
+    add_profile_arg(ap)
     args = ap.parse_args()
 
-    t, drift = run(args.ic, args.alpha, args.tmax, args.dt, args.out)
+    # 실행별 metrics JSON (+ --profile 덤프) 은 데이터 옆에
+    label = args.ic if args.ic != "plummer" else f"plummer{args.n_bodies}"
+    tag = "ensemble" if args.ensemble else f"{label}_a{args.alpha}"
+    with profiled(args.profile, os.path.join(args.out, "data", f"profile_{tag}")):
+        _main(args)
+    path = METRICS.write(os.path.join(args.out, "data", f"metrics_{tag}.json"), args=vars(args))
+    print(f"[OK] METRICS: {path}  ({METRICS.summary(4)})")
 
+def _main(args):
+    print(f"[BACKEND] {set_backend(args.backend)}")
+    cache = cache_from_args(args)
+
+    if args.ensemble:
+        ics = args.ics.split(",") if args.ics else [args.ic]
+        alphas = [float(a) for a in args.alphas.split(",")] if args.alphas else [args.alpha]
+        run_ensemble(ics, alphas, args.tmax, args.dt, args.out, args.rtol, args.atol,
+                     args.drift_tol)
+        return
+
+    # Lyapunov 추정을 먼저 구해 DTG 관측기 입력 I로 (θ는 적분 중 드리프트로 갱신)
     lam = 0.0
     if args.lyap:
-        masses = np.array([1.0,1.0,1.0])
-        s0 = make_ic(args.ic, args.alpha)
-        lam = lyapunov_estimate(s0, rhs,
-                                min(40.0, args.tmax), args.dt, G=1.0, masses=masses)
+        with timer("lyapunov"):
+            lam = _lyapunov(args, cache)
         print(f"[Lyapunov ≈] {lam:.6f}  (양수면 혼돈 경향)")
+    obs = DTGObserver(V_0=1.0, alpha=0.7, beta=0.5, lambda_=0.1, b=0.0, I=lam,
+                      bounds=_floats_pair(args.dtg_bounds) if args.dtg_bounds else None)
+
+    run(args.ic, args.alpha, args.tmax, args.dt, args.out,
+        integrator=args.integrator, n_bodies=args.n_bodies,
+        force=args.force, theta=args.theta, eps=args.eps,
+        output=args.output, float32=args.float32, decimate=args.decimate,
+        dense=args.dense, rtol=args.rtol, atol=args.atol, plot=plot_mode(args),
+        plot_points=args.plot_points, cache=cache,
+        encounter_radius=args.encounter_radius, escape_radius=args.escape_radius,
+        terminate=args.terminate, collision_radius=args.collision_radius,
+        drift_tol=args.drift_tol, observer=obs)
+    if obs.t_cross is not None:
+        print(f"[DTG] θ left bounds {obs.bounds} at t={obs.t_cross:.4f}")
+    print(f"[DTG Final Theta]: {obs.theta:.6f}")
 
-    # DTG 업데이트 (예시)
-    V_0, alpha_dtg, beta, lambda_, b = 1.0, 0.7, 0.5, 0.1, 0.0
-    theta_t = V_0
-    for i in range(len(drift)):
-        theta_t = dtg_update(V_0, alpha_dtg, beta, lambda_, b, drift[i], lam, theta_t)
-    print(f"[DTG Final Theta]: {theta_t:.6f}")
+def _floats_pair(s):
+    lo, hi = (float(x) for x in s.split(","))
+    return lo, hi
+
+def _lyapunov(args, cache):
+    """--lyap: 선택한 방법으로 최대 Lyapunov 지수 (캐시 사용)"""
+    s0, masses = make_system(args.ic, args.alpha, args.n_bodies)
+    f = resolve_force(args.force, args.theta, args.eps)
+    t_lyap = min(40.0, args.tmax)
+    key = cache_key("three_body_3d.lyap", {
+        "ic": args.ic, "alpha": args.alpha, "n_bodies": masses.size, "t_lyap": t_lyap,
+        "method": args.lyap_method, "tau": args.tau, "delta0": args.delta0, "dt": args.dt,
+        "integrator": args.integrator, "dense": args.dense, "force": args.force,
+        "theta": args.theta if args.force == "bh" else None, "eps": args.eps,
+    }, KERNEL_VERSION)
+    hit = cache.get(key)
+    if hit is not None:
+        lam = float(hit["lam"])
+        print(f"[CACHE] hit {key[:12]}")
+        if args.lyap_method == "variational":
+            print("[Lyapunov spectrum] " + " ".join(f"{x:+.4f}" for x in hit["spec"]))
+    elif args.lyap_method == "benettin":
+        lam, _, _ = lyapunov_benettin(s0, t_lyap, args.tau, args.delta0, G=1.0, masses=masses,
+                                      force=f)
+    elif args.lyap_method == "variational":
+        spec = lyapunov_spectrum(s0, t_lyap, args.tau, G=1.0, masses=masses)
+        lam = float(spec[0])
+        print("[Lyapunov spectrum] " + " ".join(f"{x:+.4f}" for x in spec))
+    else:
+        lam = lyapunov_estimate(s0, rhs, t_lyap, args.dt, args.delta0,
+                                G=1.0, masses=masses, integrator=args.integrator, force=f,
+                                dense=args.dense)
+    if hit is None:
+        cache.put(key, lam=lam, spec=spec if args.lyap_method == "variational" else [lam])
+    return lam
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+# three_body_sweep.py — (ic, alpha, dt, δ₀, τ) 격자 병렬 스윕 + 재시작 가능한 결과 저장소
+#
+#   python three_body_sweep.py run  --ics exp2 --dts 0.02,0.01,0.005 \
+#          --delta0s 1e-10,1e-9,1e-8,1e-7 --taus 0.5,1,2,3 --tmax 20
+#   python three_body_sweep.py plot --ics exp2             # 저장소에서 exp2 점만 그림 (필터)
+#   python three_body_sweep.py run  --ics exp2 --refresh   # 저장소에 있는 점도 다시 계산
+#   python three_body_sweep.py all --kinds outcome --ics exp1,exp2,exp3 --alphas 0.3:2.0:200 --tmax 100
+#
+# 격자는 세 종류의 작업으로 분해된다:
+#   drift   — (ic, alpha, tmax, dt, integrator) : 에너지 드리프트 (dt 스캔)
+#   lyap    — (ic, alpha, tmax, delta0, tau)    : Benettin λ (δ₀×τ 히트맵)
+#   outcome — (ic, alpha, tmax, dt, integrator) : 탈출/충돌/드리프트(LogH는 스텝 예산 소진)에서 조기 종료 → 안정성 지도
+# 드리프트는 δ₀/τ에, Benettin λ는 출력 dt에 의존하지 않으므로 전체 곱집합을
+# 돌리는 대신 각 작업을 한 번씩만 계산한다.
+# 저장소 키는 파라미터 + three_body_3d.KERNEL_VERSION 해시라, 커널이 바뀌면 이전 점은
+# 다시 계산되고 plot에서도 빠진다.
+import argparse, hashlib, itertools, json, os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+
+import three_body_3d as tb
+from sim_cache import SimCache, add_cache_args, cache_key
+
+DEFAULT_STORE = os.path.join("data", "sweep_store.jsonl")
+
+# ---------------- 키 / 저장소 ----------------
+def point_key(params, kernel=None):
+    """정규화된 파라미터 JSON + 커널 버전(기본: tb.KERNEL_VERSION)의 해시 (저장소 키)"""
+    canon = json.dumps({"params": params, "kernel": str(kernel or tb.KERNEL_VERSION)},
+                       sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(canon.encode("utf-8")).hexdigest()
+
+def load_store(path):
+    """저장소를 읽어 {key: record}로 반환 (끝이 잘린 마지막 줄은 무시)"""
+    out = {}
+    if not os.path.exists(path):
+        return out
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            out[rec["key"]] = rec
+    return out
+
+def append_record(path, rec):
+    """레코드 한 줄 추가 (append-only, 줄 단위 flush)"""
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+# ---------------- 작업 ----------------
+KINDS = ("drift", "lyap", "outcome")
+
+def build_tasks(ics, alphas, dts, delta0s, taus, tmax, integrator="dop853",
+                kinds=("drift", "lyap"), terminate=None):
+    """terminate: outcome 작업의 종료 기준 {"r_esc", "r_coll", "drift_tol"} (기본: three_body_3d 값)"""
+    term = terminate or {"r_esc": tb.ESCAPE_RADIUS, "r_coll": tb.COLLISION_RADIUS,
+                         "drift_tol": tb.DRIFT_TOL}
+    tasks = []
+    for ic, a in itertools.product(ics, alphas):
+        for dt in dts:
+            if "drift" in kinds:
+                tasks.append({"kind": "drift", "ic": ic, "alpha": a, "tmax": tmax,
+                              "dt": dt, "integrator": integrator})
+            if "outcome" in kinds:
+                tasks.append({"kind": "outcome", "ic": ic, "alpha": a, "tmax": tmax,
+                              "dt": dt, "integrator": integrator, **term})
+        if "lyap" in kinds:
+            for d0, tau in itertools.product(delta0s, taus):
+                tasks.append({"kind": "lyap", "ic": ic, "alpha": a, "tmax": tmax,
+                              "delta0": d0, "tau": tau})
+    return tasks
+
+def compute_point(params, use_cache=True, refresh=False):
+    """격자점 하나 계산 (워커 프로세스에서 실행). 결과 캐시(sim_cache)를 먼저 조회"""
+    cache = SimCache(enabled=use_cache, refresh=refresh)
+    key = cache_key("three_body_sweep.point", params, tb.KERNEL_VERSION)
+    hit = cache.get(key)
+    if hit is not None:
+        return hit["meta"]
+    result = _compute_point(params)
+    cache.put(key, meta=result)
+    return result
+
+def _compute_point(params):
+    masses = np.array([1.0, 1.0, 1.0])
+    s0 = tb.make_ic(params["ic"], params["alpha"])
+    if params["kind"] == "drift":
+        sol = tb.integrate(s0, params["tmax"], params["dt"], 1.0, masses,
+                           integrator=params["integrator"])
+        drift = tb.drift_diagnostics(sol.y, 1.0, masses)["energy"]
+        return {"n_steps": int(sol.t.size), "nfev": int(sol.nfev),
+                "drift_final": float(drift[-1]),
+                "drift_rms": float(np.sqrt(np.mean(drift ** 2))),
+                "drift_max": float(np.max(np.abs(drift)))}
+    if params["kind"] == "outcome":
+        sol, outcome, t_out = tb.integrate_until(
+            s0, params["tmax"], params["dt"], 1.0, masses, integrator=params["integrator"],
+            r_esc=params["r_esc"], r_coll=params["r_coll"], drift_tol=params["drift_tol"])
+        return {"outcome": outcome, "t_outcome": t_out, "nfev": int(sol.nfev)}
+    lam, _, _ = tb.lyapunov_benettin(s0, params["tmax"], params["tau"],
+                                     params["delta0"], G=1.0, masses=masses)
+    return {"lyapunov": float(lam)}
+
+def run_sweep(tasks, store_path=DEFAULT_STORE, jobs=None, use_cache=True, refresh=False):
+    """미계산 작업만 프로세스 풀로 분배하고 완료 순서대로 저장소에 기록
+
+    refresh=True면 저장소에 있는 점도 다시 계산한다 (append-only라 새 레코드가 이전 것을 덮음).
+    """
+    os.makedirs(os.path.dirname(store_path) or ".", exist_ok=True)
+    done = {} if refresh else load_store(store_path)
+    todo = [p for p in tasks if point_key(p) not in done]
+    print(f"[SWEEP] total={len(tasks)}, cached={len(tasks) - len(todo)}, todo={len(todo)}")
+    if not todo:
+        return 0
+    with ProcessPoolExecutor(max_workers=jobs or os.cpu_count()) as ex:
+        futs = {ex.submit(compute_point, p, use_cache, refresh): p for p in todo}
+        for i, fut in enumerate(as_completed(futs), 1):
+            p = futs[fut]
+            append_record(store_path, {"key": point_key(p), "kernel": tb.KERNEL_VERSION,
+                                       "params": p, "result": fut.result()})
+            print(f"[{i}/{len(todo)}] {p}")
+    return len(todo)
+
+# ---------------- 렌더링 (저장소만 읽음) ----------------
+def select(store, ics=None, alphas=None, tmax=None, dts=None, integrator=None, kinds=None):
+    """필터에 맞는 레코드만 남긴 저장소 (None = 그 항목은 거르지 않음).
+
+    dt/integrator는 그 파라미터가 있는 작업(drift, outcome)에만 적용된다.
+    """
+    want = {"ic": ics, "alpha": alphas, "dt": dts, "kind": kinds,
+            "tmax": None if tmax is None else [tmax],
+            "integrator": None if integrator is None else [integrator]}
+    want = {k: {_norm(v) for v in vs} for k, vs in want.items() if vs is not None}
+    return {key: r for key, r in store.items()
+            if all(k not in r["params"] or _norm(r["params"][k]) in vs for k, vs in want.items())}
+
+def _norm(v):
+    return round(v, 10) if isinstance(v, float) else v
+
+def records_by_kind(store, kind, **match):
+    return [r for r in store.values()
+            if r["params"]["kind"] == kind
+            and all(r["params"].get(k) == v for k, v in match.items())]
+
+def render_lyap_heatmap(store, ic, alpha, tmax, out_root="."):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    recs = records_by_kind(store, "lyap", ic=ic, alpha=alpha, tmax=tmax)
+    if not recs:
+        return None
+    d0s = sorted({r["params"]["delta0"] for r in recs})
+    taus = sorted({r["params"]["tau"] for r in recs})
+    Z = np.full((len(taus), len(d0s)), np.nan)
+    for r in recs:
+        Z[taus.index(r["params"]["tau"]), d0s.index(r["params"]["delta0"])] = r["result"]["lyapunov"]
+    X, Yg = np.meshgrid(np.log10(d0s), taus)
+    fig, ax = plt.subplots(figsize=(7, 5))
+    pc = ax.pcolormesh(X, Yg, Z, shading="nearest", cmap="viridis")
+    if len(d0s) > 1 and len(taus) > 1:
+        cs = ax.contour(X, Yg, Z, colors="w", linewidths=0.8)
+        ax.clabel(cs, fontsize=7)
+    fig.colorbar(pc, ax=ax, label="λ (Benettin)")
+    ax.set_xlabel("log10 δ₀"); ax.set_ylabel("τ")
+    ax.set_title(f"Lyapunov heatmap (ic={ic}, α={alpha}, t={tmax})")
+    path = os.path.join(out_root, "figures", f"lyap_heatmap_{ic}_a{alpha}_t{tmax}.png")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fig.savefig(path, dpi=160)
+    plt.close(fig)
+    return path
+
+def render_dt_scan(store, ic, alpha, tmax, out_root="."):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    recs = records_by_kind(store, "drift", ic=ic, alpha=alpha, tmax=tmax)
+    if not recs:
+        return None
+    fig, ax = plt.subplots(figsize=(7, 4))
+    for integ in sorted({r["params"]["integrator"] for r in recs}):
+        rr = sorted((r for r in recs if r["params"]["integrator"] == integ),
+                    key=lambda r: r["params"]["dt"])
+        ax.loglog([r["params"]["dt"] for r in rr],
+                  [r["result"]["drift_max"] + 1e-18 for r in rr], marker="o", label=integ)
+    ax.set_xlabel("dt"); ax.set_ylabel("max |relative energy drift|")
+    ax.set_title(f"dt scan (ic={ic}, α={alpha}, t={tmax})")
+    ax.legend()
+    path = os.path.join(out_root, "figures", f"dt_scan_drift_{ic}_a{alpha}_t{tmax}.png")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fig.savefig(path, dpi=160)
+    plt.close(fig)
+    return path
+
+def stability_table(store, tmax, dt, integrator, ics=None, alphas=None):
+    """outcome 작업 → (ics, alphas, 결과 인덱스 행렬, 종료 시각 행렬). ics/alphas: 행/열 필터"""
+    recs = records_by_kind(select(store, ics, alphas), "outcome", tmax=tmax, dt=dt,
+                           integrator=integrator)
+    ics = sorted({r["params"]["ic"] for r in recs})
+    alphas = sorted({r["params"]["alpha"] for r in recs})
+    C = np.full((len(ics), len(alphas)), np.nan)
+    T = np.full_like(C, np.nan)
+    for r in recs:
+        i, j = ics.index(r["params"]["ic"]), alphas.index(r["params"]["alpha"])
+        C[i, j] = tb.OUTCOMES.index(r["result"]["outcome"])
+        T[i, j] = r["result"]["t_outcome"]
+    return ics, alphas, C, T
+
+def render_stability_map(store, tmax, dt, integrator, out_root=".", ics=None, alphas=None):
+    """ic × alpha 안정성 지도: 색 = 결과 분류, 명도 = 종료 시각/tmax (+ CSV)"""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    from matplotlib.colors import ListedColormap
+    ics, alphas, C, T = stability_table(store, tmax, dt, integrator, ics, alphas)
+    if not ics:
+        return None
+    stem = f"stability_map_t{tmax}_dt{dt}_{integrator}"
+    csv_path = os.path.join(out_root, "data", stem + ".csv")
+    os.makedirs(os.path.dirname(csv_path), exist_ok=True)
+    with open(csv_path, "w", encoding="utf-8") as f:
+        f.write("ic,alpha,outcome,t_outcome\n")
+        for i, ic in enumerate(ics):
+            for j, a in enumerate(alphas):
+                if not np.isnan(C[i, j]):
+                    f.write(f"{ic},{a},{tb.OUTCOMES[int(C[i, j])]},{T[i, j]}\n")
+
+    colors = ["#2ca02c", "#d62728", "#9467bd", "#7f7f7f", "#ff7f0e"]   # OUTCOMES 순서
+    fig, ax = plt.subplots(figsize=(max(6, 0.04 * len(alphas) + 4), 1.0 + 0.6 * len(ics)))
+    ax.imshow(C, aspect="auto", interpolation="nearest", vmin=0, vmax=len(colors) - 1,
+              cmap=ListedColormap(colors), extent=(-0.5, len(alphas) - 0.5, len(ics) - 0.5, -0.5))
+    # 일찍 끝난 점일수록 진하게: 종료 시각 비율만큼 흰색을 덮음
+    ax.imshow(np.where(C == 0, np.nan, T / tmax), aspect="auto", interpolation="nearest",
+              cmap="Greys_r", vmin=0, vmax=1, alpha=0.45,
+              extent=(-0.5, len(alphas) - 0.5, len(ics) - 0.5, -0.5))
+    ax.set_yticks(range(len(ics)), ics)
+    step = max(1, len(alphas) // 8)
+    ax.set_xticks(range(0, len(alphas), step), [f"{a:.3g}" for a in alphas[::step]])
+    ax.set_xlabel("α")
+    ax.set_title(f"Stability map (t_max={tmax}, dt={dt}, {integrator})")
+    ax.legend(handles=[plt.Rectangle((0, 0), 1, 1, color=c) for c in colors],
+              labels=list(tb.OUTCOMES), loc="upper left", bbox_to_anchor=(1.01, 1.0), fontsize=8)
+    fig.tight_layout()
+    path = os.path.join(out_root, "figures", stem + ".png")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fig.savefig(path, dpi=160)
+    plt.close(fig)
+    print(f"[OK] CSV  : {csv_path}")
+    return path
+
+def render_all(store_path=DEFAULT_STORE, out_root=".", ics=None, alphas=None, tmax=None,
+               dts=None, integrator=None, kinds=None):
+    """저장소의 (필터에 맞는, 현재 KERNEL_VERSION) 점으로 모든 그림 생성 — 필터는 select 참고"""
+    store = load_store(store_path)
+    stale = sum(r.get("kernel") != tb.KERNEL_VERSION for r in store.values())
+    if stale:
+        print(f"[SKIP] {stale} record(s) from another kernel version (rerun to refresh)")
+    store = select({k: r for k, r in store.items() if r.get("kernel") == tb.KERNEL_VERSION},
+                   ics, alphas, tmax, dts, integrator, kinds)
+    groups = {(r["params"]["ic"], r["params"]["alpha"], r["params"]["tmax"])
+              for r in store.values() if r["params"]["kind"] != "outcome"}
+    for ic, a, tmax in sorted(groups):
+        for path in (render_lyap_heatmap(store, ic, a, tmax, out_root),
+                     render_dt_scan(store, ic, a, tmax, out_root)):
+            if path:
+                print(f"[OK] FIG  : {path}")
+    maps = {(r["params"]["tmax"], r["params"]["dt"], r["params"]["integrator"])
+            for r in store.values() if r["params"]["kind"] == "outcome"}
+    for tmax, dt, integ in sorted(maps):
+        path = render_stability_map(store, tmax, dt, integ, out_root, ics, alphas)
+        if path:
+            print(f"[OK] FIG  : {path}")
+
+# ---------------- 메인 ----------------
+def _floats(s):
+    """쉼표구분 목록, 또는 "시작:끝:개수" (linspace, 양 끝 포함)"""
+    if s.count(":") == 2:
+        a, b, n = s.split(":")
+        return [round(float(x), 10) for x in np.linspace(float(a), float(b), int(n))]
+    return [float(x) for x in s.split(",") if x.strip()]
+
+RUN_DEFAULTS = {"ics": "exp2", "alphas": "1.0", "dts": "0.02,0.01,0.005", "tmax": 20.0,
+                "integrator": "dop853", "kinds": "drift,lyap"}
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("cmd", choices=["run", "plot", "all"])
+    # ics/alphas/dts/tmax/integrator/kinds: run은 격자 (없으면 RUN_DEFAULTS), plot은 필터 (없으면 전체)
+    ap.add_argument("--ics", default=None, help=f"IC 목록 (run 기본: {RUN_DEFAULTS['ics']})")
+    ap.add_argument("--alphas", default=None, help=f"alpha 목록 (run 기본: {RUN_DEFAULTS['alphas']})")
+    ap.add_argument("--dts", default=None, help=f"dt 목록 (run 기본: {RUN_DEFAULTS['dts']})")
+    ap.add_argument("--delta0s", default="1e-10,1e-9,1e-8,1e-7")
+    ap.add_argument("--taus", default="0.5,1.0,2.0,3.0")
+    ap.add_argument("--tmax", type=float, default=None, help=f"run 기본: {RUN_DEFAULTS['tmax']}")
+    ap.add_argument("--integrator", choices=tb.INTEGRATORS, default=None,
+                    help=f"run 기본: {RUN_DEFAULTS['integrator']}")
+    ap.add_argument("--kinds", default=None,
+                    help=f"작업 종류 (쉼표구분: {','.join(KINDS)}, run 기본: {RUN_DEFAULTS['kinds']})")
+    ap.add_argument("--escape-radius", type=float, default=tb.ESCAPE_RADIUS)
+    ap.add_argument("--collision-radius", type=float, default=tb.COLLISION_RADIUS)
+    ap.add_argument("--drift-tol", type=float, default=tb.DRIFT_TOL)
+    ap.add_argument("--jobs", type=int, default=None, help="워커 수 (기본: 전체 코어)")
+    ap.add_argument("--store", default=None, help=f"결과 저장소 (기본: <out>/{DEFAULT_STORE})")
+    ap.add_argument("--out", default=".")
+    add_cache_args(ap)
+    args = ap.parse_args()
+    if args.kinds is not None:
+        kinds = [k for k in args.kinds.split(",") if k]
+        bad = sorted(set(kinds) - set(KINDS))
+        if bad or not kinds:
+            ap.error(f"--kinds: unknown kind(s) {','.join(bad) or '(empty)'} "
+                     f"(choose from {','.join(KINDS)})")
+
+    store_path = args.store or os.path.join(args.out, DEFAULT_STORE)
+    if args.cmd in ("run", "all"):
+        g = {k: RUN_DEFAULTS[k] if getattr(args, k) is None else getattr(args, k)
+             for k in RUN_DEFAULTS}
+        tasks = build_tasks(g["ics"].split(","), _floats(g["alphas"]), _floats(g["dts"]),
+                            _floats(args.delta0s), _floats(args.taus), g["tmax"],
+                            g["integrator"], g["kinds"].split(","),
+                            {"r_esc": args.escape_radius, "r_coll": args.collision_radius,
+                             "drift_tol": args.drift_tol})
+        run_sweep(tasks, store_path, args.jobs, not args.no_cache, args.refresh)
+    if args.cmd in ("plot", "all"):
+        split = lambda s, f=str: None if s is None else [f(x) for x in s.split(",") if x]
+        render_all(store_path, args.out, ics=split(args.ics),
+                   alphas=None if args.alphas is None else _floats(args.alphas),
+                   tmax=args.tmax, dts=None if args.dts is None else _floats(args.dts),
+                   integrator=args.integrator, kinds=split(args.kinds))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# trajectory_io.py — 궤적 스트리밍 저장(.npy memmap) / 메모리 매핑 읽기
+#
+# 파일 레이아웃: (T, 1+6N) 행렬, 각 행 = [t, 상태벡터(body-major)]
+# 옆에 같은 이름의 .json 사이드카에 메타(N, masses, dt, decimate, dtype 등)를 둔다.
+import json, os
+import numpy as np
+
+class TrajectoryWriter:
+    """샘플 수를 미리 알고 있는 궤적을 청크 단위로 .npy memmap에 기록
+
+    decimate=k 이면 k번째 샘플마다 하나씩만 저장한다(첫 샘플 포함).
+    """
+    def __init__(self, path, n_samples, n_state, dtype=np.float64, decimate=1, meta=None):
+        self.path = path
+        self.decimate = max(1, int(decimate))
+        self.n_out = (int(n_samples) - 1) // self.decimate + 1
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._mm = np.lib.format.open_memmap(path, mode="w+", dtype=dtype,
+                                             shape=(self.n_out, 1 + int(n_state)))
+        self._seen = 0   # 지금까지 받은 (decimate 전) 샘플 수
+        self._row = 0
+        self.meta = dict(meta or {})
+        self.meta.update({"n_samples": int(n_samples), "n_state": int(n_state),
+                          "decimate": self.decimate, "dtype": np.dtype(dtype).name})
+
+    def write(self, t, Y):
+        """t (c,), Y (6N, c) 청크 추가"""
+        t = np.asarray(t)
+        first = (-self._seen) % self.decimate
+        idx = np.arange(first, t.size, self.decimate)
+        idx = idx[: self.n_out - self._row]
+        if idx.size:
+            rows = slice(self._row, self._row + idx.size)
+            self._mm[rows, 0] = t[idx]
+            self._mm[rows, 1:] = np.asarray(Y)[:, idx].T
+            self._row += idx.size
+        self._seen += t.size
+
+    def close(self):
+        self._mm.flush()
+        del self._mm
+        with open(os.path.splitext(self.path)[0] + ".json", "w") as f:
+            json.dump(dict(self.meta, rows=self._row), f, indent=2, ensure_ascii=False)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class Trajectory:
+    """memmap으로 연 궤적: .t (T,), .y (6N, T) 뷰 — solve_ivp 결과처럼 쓸 수 있다"""
+    def __init__(self, path):
+        self.path = path
+        self.data = np.load(path, mmap_mode="r")
+        side = os.path.splitext(path)[0] + ".json"
+        self.meta = {}
+        if os.path.exists(side):
+            with open(side) as f:
+                self.meta = json.load(f)
+        rows = self.meta.get("rows", self.data.shape[0])
+        self.t = self.data[:rows, 0]
+        self.y = self.data[:rows, 1:].T
+
+    @property
+    def n_bodies(self):
+        return self.y.shape[0] // 6
+
+def open_trajectory(path):
+    return Trajectory(path)